@@ -1,168 +1,989 @@
 import numpy as np
 import pyaudio
-import time
 import threading
+import time
+from SaoMeoLatency import PROFILES, AdaptiveBuffer
+from SaoMeoPitch import FREQS, NUM_NOTES, notes, note_ids
+from SaoMeoWavetable import WavetableBank
+from SaoMeoEvents import EventRing, NOTE_ON, NOTE_OFF, GAIN, BUS_GAIN, BUS_PAN, PITCH_BEND, VIBRATO, bus_key
+from SaoMeoReverb import ConvolutionReverb, synthetic_ir
+from SaoMeoRecorder import SessionRecorder
+from SaoMeoStats import CallbackStats, STAGE_EVENTS, STAGE_ENVELOPE, STAGE_OSCILLATOR, STAGE_MODULATION, STAGE_REVERB, STAGE_MASTER
+
+UFUNC_BUFSIZE = 128
+
+STEAL_POLICIES = ('oldest', 'quietest', 'releasing')
+
+def _voice_limit(max_voices):
+    # None = unlimited; a cap has to leave room for at least one voice
+    if max_voices is not None and max_voices < 1:
+        raise ValueError(f"max_voices must be at least 1 (or None for no limit), got {max_voices}")
+    return max_voices
+
+class Bus:
+    # One mixer channel: timbre (None = the engine's harmonics), level,
+    # stereo position (-1 left .. 1 right) and an optional voice limit
+    def __init__(self, name, harmonics=None, gain=1.0, pan=0.0, max_voices=None):
+        self.name = name
+        self.harmonics = None if harmonics is None else tuple(harmonics)
+        self.gain = gain
+        self.pan = pan
+        self.max_voices = _voice_limit(max_voices)
 
 class SaoMeoEngine:
-    def __init__(self):
-        self.sample_rate = 48000
-        self.p = pyaudio.PyAudio()
+    # Timbre: (harmonic number, amplitude) pairs summed per voice
+    harmonics = ((1, 0.6), (2, 0.2), (3, 0.55), (5, 0.15))
+
+    # Reed "scoop" at note start: freq + depth * exp(-t * decay)
+    pitch_bend_depth = -8.0
+    pitch_bend_decay = 25.0
+
+    # Vibrato LFO, faded in after vibrato_delay seconds (None = no fade)
+    vibrato_rate = 2.5
+    vibrato_depth = 0.012
+    vibrato_delay = 0.4
+    vibrato_fade_rate = 2.0
+    lfo_rate = 3.5
+
+    # Slow breath swell, scaled by the same vibrato fade
+    swell_depth = 0.1
+    swell_rate = 3.0
+
+    # Master soft clip: tanh(signal * drive)
+    drive = 1.2
+
+    # Level of the synthetic reverb built for reverb=<seconds>
+    reverb_wet = 0.25
+
+    # Envelope ramps in seconds, converted to samples at the stream's rate
+    attack_time = 0.1
+    release_time = 0.2
+
+    # Anti-click fade of a stolen voice, and how many may fade at once
+    steal_time = 0.005
+    steal_reserve = 4
+
+    # The control-rate path has a fixed per-block cost (grid, upsampling)
+    # that only pays off with this many voices; fewer render at audio rate
+    control_rate_min_voices = 16
+
+    def __init__(self, start_stream=True, oscillator='wavetable', control_period=32,
+                 latency='safe', sample_rate=None, frames_per_buffer=None,
+                 max_voices=32, steal_policy='releasing', buses=None, channels=2, reverb=None,
+                 control_only=False):
+        # Named profile (SaoMeoLatency.PROFILES); explicit sample_rate /
+        # frames_per_buffer override it
+        if latency not in PROFILES:
+            raise ValueError(f"Unknown latency profile: {latency}")
+        profile_rate, profile_frames, adaptive = PROFILES[latency]
+        self.latency = latency
+        self.sample_rate = sample_rate or profile_rate
+        self.frames_per_buffer = frames_per_buffer or profile_frames
         self.volume = 0.6
-        
-        self.target_freqs = set()
-        self.envelopes = {} 
-        self.phases = {}
-        self.note_counters = {} 
+
+        # 'adaptive': the callback counts overruns, a watcher thread grows
+        # frames_per_buffer when there are too many (see open_stream)
+        self.adaptive = AdaptiveBuffer(self.frames_per_buffer) if adaptive else None
+        self._watcher = None
+        self._watch_stop = threading.Event()
+
+        # Polyphony cap (None = unlimited). A note-on with max_voices
+        # already sounding steals one, picked by steal_policy:
+        #   'oldest':    longest since its note-on
+        #   'quietest':  lowest envelope * gain
+        #   'releasing': quietest voice in release, held voices only if
+        #                none is releasing
+        # The stolen voice fades over steal_time; with steal_reserve fades
+        # already running the quietest of them is cut, so a block never
+        # renders more than max_voices + steal_reserve voices.
+        if steal_policy not in STEAL_POLICIES:
+            raise ValueError(f"Unknown steal policy: {steal_policy}")
+        self.max_voices = _voice_limit(max_voices)
+        self.steal_policy = steal_policy
+        self.stolen_voices = 0      # total stolen so far (metric)
+        self.stealing = 0           # stolen voices still fading
+
+        # Mixer buses (see Bus), rendered together in one vectorised pass
+        # and summed into the master (stereo, or mono with channels=1).
+        # Every voice belongs to one bus; its key is bus_key(bus, note).
+        self.buses = list(buses) if buses else [Bus('main')]
+        self.bus_names = {bus.name: index for index, bus in enumerate(self.buses)}
+        self.bus_targets = [set() for _ in self.buses]
+        self.bus_max_voices = [bus.max_voices for bus in self.buses]
+        self._bus_voices = [0] * len(self.buses)    # voices per bus, stolen ones excluded
+        self.channels = channels
+        self._bus_gain = np.zeros(len(self.buses), dtype=np.float32)
+        self._bus_pan = np.zeros(len(self.buses), dtype=np.float32)
+        self._bus_weights = np.zeros((len(self.buses), 2), dtype=np.float32)
+        for index, bus in enumerate(self.buses):
+            self._set_bus_mix(index, bus.gain, bus.pan)
+        # Pitch wheel per bus, as a frequency ratio (PITCH_BEND events);
+        # _bent skips it entirely while every wheel is centred
+        self._bus_bend = np.ones(len(self.buses), dtype=np.float32)
+        self._bent = False
+
+        # Control thread -> audio callback. update_notes() / set_bus() only
+        # push note-on/off events; the callback applies them at block start,
+        # so neither side ever waits on a lock. bus_targets is the control
+        # thread's view of what it asked for.
+        self.events = EventRing(4096)
+        self.recorder = None
+        self._sequencer = None
+        self.p = None
+        self.stream = None
+
+        # control_only: just that control side, for an engine that renders
+        # in another process (SaoMeoProcess.py); no voice bank, wavetables
+        # or reverb are built
+        if control_only:
+            return
+
+        # Optional master reverb: seconds of synthetic_ir(), or a ready
+        # ConvolutionReverb. Built here, off the audio thread; assigning
+        # engine.reverb later swaps it in at the next block.
+        if reverb is not None and not isinstance(reverb, ConvolutionReverb):
+            reverb = ConvolutionReverb(synthetic_ir(reverb, self.sample_rate, channels), wet=self.reverb_wet)
+        if reverb is not None and reverb.channels != channels:
+            raise ValueError(f"Reverb has {reverb.channels} channel(s), the engine {channels}")
+        self.reverb = reverb
+
+        # Pitch bend / vibrato / swell are a few Hz: evaluate them every
+        # control_period samples and interpolate (from control_rate_min_voices
+        # voices up). None (or 0) = every sample.
+        self.control_period = control_period
+
+        # 'wavetable': band-limited table lookup (SaoMeoWavetable.py)
+        # 'additive':  one np.sin per harmonic per voice
+        self.oscillator = oscillator
+        self.wavetable = None
+        self._pending_timbre = None
+
+        # Opt-in callback instrumentation (SaoMeoStats.py), see enable_stats()
+        self.stats = None
+
+        # self.recorder: optional SaoMeoRecorder.SessionRecorder
+        # (start_recording); the callback hands it every finished block and
+        # applied note event. _event_offset is the frame within the block
+        # events apply at.
+        self._event_offset = 0
+
+        # Voice bank: per-voice state in contiguous arrays, active voices
+        # packed into slots [0, num_voices). voice_keys[slot] is the key
+        # the caller used (bus_key(bus, note) for live notes, a tuple for
+        # sequencer voices), voice_slots maps it back to the slot.
+        self.num_voices = 0
+        self.voice_keys = []
+        self.voice_slots = {}
+        self._note_voices = [0] * NUM_NOTES     # voices per note, on any bus
+        # With a cap the bank never has to grow inside the callback
+        capacity = 16 if max_voices is None else max_voices + self.steal_reserve
+        self._allocate_voices(capacity)
+        self._allocate_scratch(capacity, self.frames_per_buffer)
         
         self.lfo_phase = 0 
-        self.lock = threading.Lock()
+        self._build_timbres([bus.harmonics or self.harmonics for bus in self.buses])
+        self._apply_pending_timbre()
         
-        self.attack_samples = int(self.sample_rate * 0.1)
-        self.release_samples = int(self.sample_rate * 0.2)
+        self.attack_samples = max(1, int(round(self.sample_rate * self.attack_time)))
+        self.release_samples = max(1, int(round(self.sample_rate * self.release_time)))
+        self.steal_samples = max(1, int(round(self.sample_rate * self.steal_time)))
         
+        # start_stream=False leaves the engine device-free: audio is pulled by
+        # calling callback() directly (see SaoMeoRender.py).
+        if start_stream:
+            self.open_stream()
+
+    def open_stream(self, callback=None):
+        # callback defaults to self.callback; SaoMeoProcess.py wraps it to
+        # report per-block telemetry back to the parent process
+        self._stream_callback = callback or self.callback
+        self.p = pyaudio.PyAudio()
+        self._open_output()
+        if self.adaptive is not None:
+            self._watch_stop.clear()
+            self._watcher = threading.Thread(target=self._watch_latency, name="SaoMeoLatency", daemon=True)
+            self._watcher.start()
+
+    def _open_output(self):
         self.stream = self.p.open(
             format = pyaudio.paFloat32,
-            channels = 1,
+            channels = self.channels,
             rate = self.sample_rate,
             output = True,
-            stream_callback = self.callback,
-            frames_per_buffer = 1024
+            stream_callback = self._stream_callback,
+            frames_per_buffer = self.frames_per_buffer
         )
         self.stream.start_stream()
+        if self.adaptive is not None:
+            self.adaptive.restart()
+
+    def set_buffer_size(self, frames):
+        # Control thread. Reopens the stream with the new block size;
+        # voices, events and the sequencer carry over (a short gap only).
+        self.frames_per_buffer = frames
+        if self.stream is None:
+            return
+        # stop_stream() returns once the running callback has finished
+        self.stream.stop_stream()
+        self.stream.close()
+        # Grow the scratch buffers here, not in the first bigger callback
+        self._ensure_scratch(frames)
+        self._open_output()
+
+    def _watch_latency(self, interval=0.25):
+        while not self._watch_stop.wait(interval):
+            frames = self.adaptive.poll()
+            if frames is not None:
+                self.set_buffer_size(frames)
+
+    @property
+    def sequencer(self):
+        # Optional SaoMeoSequencer.Sequencer (or SaoMeoMidi.MidiPlayer),
+        # advanced sample-accurately inside the callback alongside the
+        # live notes
+        return self._sequencer
+
+    @sequencer.setter
+    def sequencer(self, sequencer):
+        # Control thread: prepare() resolves buses / timing for this engine
+        # here, so a bad mapping raises now and not in every callback
+        if sequencer is not None:
+            sequencer.prepare(self)
+        self._sequencer = sequencer
+
+    def enable_stats(self):
+        if self.stats is None:
+            self.stats = CallbackStats(self.sample_rate)
+        return self.stats
+
+    def disable_stats(self):
+        self.stats = None
+
+    def start_recording(self, path, **recorder_kwargs):
+        # '.wav' or raw float32 (see SaoMeoRecorder); control thread only
+        self.stop_recording()
+        recorder = SessionRecorder(path, self.sample_rate, self.channels, **recorder_kwargs)
+        self.recorder = recorder
+        return recorder
+
+    def stop_recording(self):
+        recorder = self.recorder
+        if recorder is None:
+            return None
+        self.recorder = None
+        # A callback already running may still hand it its block
+        if self.stream is not None:
+            time.sleep(2 * self.frames_per_buffer / self.sample_rate)
+        recorder.close()
+        return recorder.stats()
+
+    def set_timbre(self, harmonics, bus=0):
+        pending = self._pending_timbre
+        timbres = list(pending[0] if pending is not None else self.bus_harmonics)
+        timbres[self.bus_index(bus)] = tuple(harmonics)
+        self._build_timbres(timbres)
+
+    def _build_timbres(self, timbres):
+        # Tables are built here on the control thread; the callback picks
+        # them up at the start of its next block.
+        timbres = tuple(tuple(harmonics) for harmonics in timbres)
+        wavetable = None
+        if self.oscillator == 'wavetable':
+            wavetable = WavetableBank(timbres, self.sample_rate)
+        elif self.oscillator != 'additive':
+            raise ValueError(f"Unknown oscillator: {self.oscillator}")
+        self._pending_timbre = (timbres, wavetable)
+
+    def _apply_pending_timbre(self):
+        timbres, wavetable = self._pending_timbre
+        self._pending_timbre = None
+        self.bus_harmonics = timbres
+        self.harmonics = timbres[0]
+        self.wavetable = wavetable
+
+        # Additive oscillator: every harmonic number any bus uses, with a
+        # per-bus amplitude column (0 where the bus does not have it)
+        numbers = sorted({harmonic for harmonics in timbres for harmonic, _ in harmonics})
+        amps = np.zeros((len(numbers), len(timbres)), dtype=np.float32)
+        for bus, harmonics in enumerate(timbres):
+            for harmonic, amp in harmonics:
+                amps[numbers.index(harmonic), bus] += amp
+        self._partials = tuple(zip(numbers, amps))
+
+        if wavetable is not None:
+            n = self.num_voices
+            self.voice_tables[:n] = wavetable.table_offset(self.voice_freqs[:n], self.voice_bus[:n])
+
+    def _set_bus_mix(self, bus, gain, pan):
+        # Balance law: the centre keeps full gain on both sides, so a
+        # centred bus is as loud in stereo as in mono
+        self._bus_gain[bus] = gain
+        self._bus_pan[bus] = pan
+        self._bus_weights[bus, 0] = gain * min(1.0, 1.0 - pan)
+        self._bus_weights[bus, 1] = gain * min(1.0, 1.0 + pan)
+
+    def _allocate_voices(self, capacity):
+        n = self.num_voices
+        old = getattr(self, 'voice_freqs', None)
+        new_freqs = np.zeros(capacity, dtype=np.float32)
+        new_phases = np.zeros(capacity, dtype=np.uint32)
+        new_envs = np.zeros(capacity, dtype=np.float32)
+        new_counters = np.zeros(capacity, dtype=np.int64)
+        new_gains = np.ones(capacity, dtype=np.float32)
+        new_targets = np.zeros(capacity, dtype=bool)
+        new_tables = np.zeros(capacity, dtype=np.int64)
+        new_release = np.zeros(capacity, dtype=np.float32)
+        new_stolen = np.zeros(capacity, dtype=bool)
+        new_bus = np.zeros(capacity, dtype=np.int64)
+        new_notes = np.zeros(capacity, dtype=np.int64)
+        if old is not None:
+            new_freqs[:n] = self.voice_freqs[:n]
+            new_phases[:n] = self.voice_phases[:n]
+            new_envs[:n] = self.voice_envs[:n]
+            new_counters[:n] = self.voice_counters[:n]
+            new_gains[:n] = self.voice_gains[:n]
+            new_targets[:n] = self.voice_targets[:n]
+            new_tables[:n] = self.voice_tables[:n]
+            new_release[:n] = self.voice_release[:n]
+            new_stolen[:n] = self.voice_stolen[:n]
+            new_bus[:n] = self.voice_bus[:n]
+            new_notes[:n] = self.voice_notes[:n]
+        self.voice_freqs = new_freqs
+        self.voice_phases = new_phases
+        self.voice_envs = new_envs
+        self.voice_counters = new_counters
+        self.voice_gains = new_gains
+        self.voice_targets = new_targets
+        self.voice_tables = new_tables
+        # Per-sample release step: 1 / release_samples, 1 / steal_samples once stolen
+        self.voice_release = new_release
+        self.voice_stolen = new_stolen
+        self.voice_bus = new_bus
+        self.voice_notes = new_notes
+
+    def _add_voice_unsafe(self, key, bus, note):
+        freq = FREQS[note]
+        phase = 0
+        if self._note_voices[note]:
+            # The pitch already sounds (on another bus, or under another
+            # key): start in phase with it, so the two sum like one louder
+            # voice rather than at an arbitrary phase offset
+            for other in range(self.num_voices):
+                if self.voice_notes[other] == note:
+                    phase = self.voice_phases[other]
+                    break
+        if self.num_voices == len(self.voice_freqs):
+            self._allocate_voices(2 * len(self.voice_freqs))
+        slot = self.num_voices
+        self.num_voices += 1
+        self.voice_keys.append(key)
+        self.voice_slots[key] = slot
+        self.voice_freqs[slot] = freq
+        self.voice_phases[slot] = phase
+        self.voice_envs[slot] = 0.0
+        self.voice_counters[slot] = 0
+        self.voice_gains[slot] = 1.0
+        self.voice_targets[slot] = False
+        self.voice_tables[slot] = self.wavetable.table_offset(freq, bus) if self.wavetable is not None else 0
+        self.voice_release[slot] = 1.0 / self.release_samples
+        self.voice_stolen[slot] = False
+        self.voice_bus[slot] = bus
+        self.voice_notes[slot] = note
+        self._bus_voices[bus] += 1
+        self._note_voices[note] += 1
+        return slot
+
+    def _remove_voice_unsafe(self, slot):
+        # Swap the last active voice into the freed slot to keep the bank packed
+        last = self.num_voices - 1
+        del self.voice_slots[self.voice_keys[slot]]
+        if self.voice_stolen[slot]:
+            self.stealing -= 1
+        else:
+            self._bus_voices[self.voice_bus[slot]] -= 1
+        self._note_voices[self.voice_notes[slot]] -= 1
+        if slot != last:
+            moved = self.voice_keys[last]
+            self.voice_keys[slot] = moved
+            self.voice_slots[moved] = slot
+            self.voice_freqs[slot] = self.voice_freqs[last]
+            self.voice_phases[slot] = self.voice_phases[last]
+            self.voice_envs[slot] = self.voice_envs[last]
+            self.voice_counters[slot] = self.voice_counters[last]
+            self.voice_gains[slot] = self.voice_gains[last]
+            self.voice_targets[slot] = self.voice_targets[last]
+            self.voice_tables[slot] = self.voice_tables[last]
+            self.voice_release[slot] = self.voice_release[last]
+            self.voice_stolen[slot] = self.voice_stolen[last]
+            self.voice_bus[slot] = self.voice_bus[last]
+            self.voice_notes[slot] = self.voice_notes[last]
+        self.voice_keys.pop()
+        self.num_voices = last
+
+    def _allocate_scratch(self, capacity, frames):
+        # Work buffers for the hot loop, reused every block. Each (voices,
+        # frames) buffer is flat so block views stay contiguous for any
+        # frame_count; they only grow (voice bank growth or a longer block).
+        # Buffers that receive control-rate upsampling are padded to a
+        # whole number of control periods.
+        period = self.control_period or 1
+        points = -(-frames // period)
+        padded = points * period
+        size = capacity * frames
+        self._scratch_shape = (capacity, frames)
+        self._env = np.zeros(size, dtype=np.float32)
+        self._time = np.zeros(size, dtype=np.float32)
+        self._fade = np.zeros(size, dtype=np.float32)
+        self._tmp = np.zeros(size, dtype=np.float32)
+        self._work = np.zeros(capacity * padded, dtype=np.float32)
+        self._mod = np.zeros(capacity * padded, dtype=np.float32)
+        self._wave = np.zeros(size, dtype=np.float32)
+        self._phase_inc = np.zeros(size, dtype=np.uint32)
+        self._phase = np.zeros(size, dtype=np.uint32)
+        self._index = np.zeros(size, dtype=np.int64)
+
+        self._voice_f32 = np.zeros(capacity, dtype=np.float32)
+        self._voice_bool = np.zeros(capacity, dtype=bool)
+        self._voice_mask = np.zeros(capacity, dtype=bool)
+        self._voice_weights = np.zeros((capacity, 2), dtype=np.float32)
+
+        # Cached ramps: steps = 0..frames-1, ramp = 1..frames. The attack /
+        # release curves are ramp * (1 / attack_samples) and
+        # ramp * (-1 / release_samples), scaled per voice.
+        self._steps = np.arange(frames, dtype=np.float32)
+        self._ramp = self._steps + 1.0
+        self._lfo = np.zeros(frames + 1, dtype=np.float32)
+        self._out = np.zeros((frames, self.channels) if self.channels > 1 else frames, dtype=np.float32)
+
+        # Control-rate grid: modulators are evaluated at sample offsets
+        # 0, P, 2P, ... and linearly interpolated with weights k / P. Each
+        # segment is start + slope * frac: one (voices * points, 2) @ (2, P)
+        # product into a (voices, points, P) view of the padded buffer, so
+        # the cost grows linearly with the block. (A broadcast ufunc over
+        # that view runs its inner loop P samples at a time and is slower.)
+        ctrl_size = capacity * (points + 1)
+        self._ctrl_offsets = np.arange(points + 1, dtype=np.float32) * period
+        self._ctrl_ramp = self._ctrl_offsets + 1.0
+        frac = np.arange(period, dtype=np.float32) / period
+        self._ctrl_weights = np.stack((np.ones(period, dtype=np.float32), frac))
+        self._ctrl_segments = np.zeros(capacity * points * 2, dtype=np.float32)
+        self._ctrl_env = np.zeros(ctrl_size, dtype=np.float32)
+        self._ctrl_time = np.zeros(ctrl_size, dtype=np.float32)
+        self._ctrl_bend = np.zeros(ctrl_size, dtype=np.float32)
+        self._ctrl_mod = np.zeros(ctrl_size, dtype=np.float32)
+        self._ctrl_fade = np.zeros(ctrl_size, dtype=np.float32)
+        self._ctrl_tmp = np.zeros(ctrl_size, dtype=np.float32)
+
+    def _ensure_scratch(self, frame_count):
+        # True if the buffers were reallocated (views into them are stale)
+        capacity, frames = self._scratch_shape
+        if frame_count > frames or len(self.voice_freqs) > capacity:
+            self._allocate_scratch(len(self.voice_freqs), max(frame_count, frames))
+            return True
+        return False
+
+    def _eval_modulators(self, offsets, times, bend, mod, fade, tmp):
+        """
+        Evaluate the slow modulators on any time grid:
+            offsets: (m,) sample offsets into the block (for the shared LFO)
+            times:   (n, m) seconds since each voice's note-on
+        Writes the pitch bend in Hz to `bend` (if pitch_bend_depth) and the
+        combined vibrato * swell gain to `mod`. fade / tmp are scratch.
+        """
+        dt = 1.0 / self.sample_rate
+
+        if self.pitch_bend_depth:
+            np.multiply(times, -self.pitch_bend_decay, out=bend)
+            np.exp(bend, out=bend)
+            bend *= self.pitch_bend_depth
+
+        if self.vibrato_delay is None:
+            vibrato_fade_in = 1.0
+        else:
+            vibrato_fade_in = fade
+            np.subtract(times, self.vibrato_delay, out=vibrato_fade_in)
+            vibrato_fade_in *= self.vibrato_fade_rate
+            np.clip(vibrato_fade_in, 0.0, 1.0, out=vibrato_fade_in)
+
+        lfo_val = self._lfo[:len(offsets)]
+        np.multiply(offsets, 2 * np.pi * self.vibrato_rate * dt, out=lfo_val)
+        lfo_val += self.lfo_phase
+        np.sin(lfo_val, out=lfo_val)
+
+        np.multiply(lfo_val, self.vibrato_depth, out=mod)
+        mod *= vibrato_fade_in
+        mod += 1.0
+
+        if self.swell_depth:
+            swell = tmp
+            np.multiply(times, self.swell_rate, out=swell)
+            np.sin(swell, out=swell)
+            swell *= vibrato_fade_in
+            swell *= self.swell_depth
+            swell += 1.0
+            mod *= swell
+
+    def _upsample(self, points, out, n, frame_count):
+        """
+        Linear interpolation of control points (n, K + 1), taken every
+        control_period samples, into `out` (flat, padded). Returns the
+        (n, frame_count) audio-rate view.
+        """
+        k = points.shape[1] - 1
+        period = self.control_period
+        segments = self._ctrl_segments[:n * k * 2].reshape(n, k, 2)
+        np.copyto(segments[:, :, 0], points[:, :-1])
+        np.subtract(points[:, 1:], points[:, :-1], out=segments[:, :, 1])
+        up = out[:n * k * period].reshape(n * k, period)
+        np.dot(segments.reshape(n * k, 2), self._ctrl_weights, out=up)
+        return up.reshape(n, k * period)[:, :frame_count]
+
+    def _wheel_freqs(self, n):
+        # Voice frequencies with their bus's pitch wheel applied. Uses
+        # _voice_f32 as scratch: call once the envelope is done with it.
+        if not self._bent:
+            return self.voice_freqs[:n]
+        freqs = self._voice_f32[:n]
+        np.take(self._bus_bend, self.voice_bus[:n], out=freqs, mode='clip')
+        freqs *= self.voice_freqs[:n]
+        return freqs
+
+    def _render_voices(self, n, frame_count, stats=None, out=None):
+        """
+        Render voices [0, n) for one block as a single (n, frame_count)
+        computation and advance their state. All math runs in place on
+        the preallocated float32 scratch buffers. Returns the master mix of
+        every bus, (frame_count, channels) or (frame_count,) when mono,
+        written to `out` (default: a view of self._out).
+
+        With control_period set and at least control_rate_min_voices
+        voices, envelope, pitch bend, vibrato and swell are evaluated once
+        every control_period samples; only the final phase increment and
+        the combined gain are interpolated up to audio rate.
+        """
+        dt = 1.0 / self.sample_rate
+        block = (n, frame_count)
+        size = n * frame_count
+        voice_f32 = self._voice_f32[:n]
+
+        # Envelope: linear attack towards 1 for held notes, release towards 0
+        env_step = voice_f32
+        np.negative(self.voice_release[:n], out=env_step)
+        np.copyto(env_step, 1.0 / self.attack_samples, where=self.voice_targets[:n])
+
+        if self.control_period and n >= self.control_rate_min_voices:
+            points = -(-frame_count // self.control_period) + 1
+            grid = (n, points)
+            offsets = self._ctrl_offsets[:points]
+
+            env_curve = self._ctrl_env[:n * points].reshape(grid)
+            np.multiply(self._ctrl_ramp[:points], env_step[:, None], out=env_curve)
+            env_curve += self.voice_envs[:n, None]
+            np.clip(env_curve, 0.0, 1.0, out=env_curve)
+            # Exact end-of-block value, whatever the grid
+            env_step *= frame_count
+            self.voice_envs[:n] += env_step
+            np.clip(self.voice_envs[:n], 0.0, 1.0, out=self.voice_envs[:n])
+
+            note_time_seconds = self._ctrl_time[:n * points].reshape(grid)
+            np.copyto(voice_f32, self.voice_counters[:n], casting='unsafe')
+            np.add(voice_f32[:, None], offsets, out=note_time_seconds)
+            note_time_seconds *= dt
+            self.voice_counters[:n] += frame_count
+            if stats is not None: stats.stage(STAGE_ENVELOPE)
+
+            bend = self._ctrl_bend[:n * points].reshape(grid)
+            gain = self._ctrl_mod[:n * points].reshape(grid)
+            self._eval_modulators(offsets, note_time_seconds, bend, gain,
+                                  self._ctrl_fade[:n * points].reshape(grid),
+                                  self._ctrl_tmp[:n * points].reshape(grid))
+            gain *= env_curve
+            gain = self._upsample(gain, self._mod, n, frame_count)
+
+            freqs = self._wheel_freqs(n)
+            if self.pitch_bend_depth:
+                bend += freqs[:, None]
+                bend *= 2 ** 32 * dt
+                current_freq_array = self._upsample(bend, self._work, n, frame_count)
+            else:
+                # Constant pitch: nothing to interpolate
+                current_freq_array = self._work[:size].reshape(block)
+                np.copyto(current_freq_array, freqs[:, None])
+                current_freq_array *= 2 ** 32 * dt
+        else:
+            env_curve = self._env[:size].reshape(block)
+            np.multiply(self._ramp[:frame_count], env_step[:, None], out=env_curve)
+            env_curve += self.voice_envs[:n, None]
+            np.clip(env_curve, 0.0, 1.0, out=env_curve)
+            self.voice_envs[:n] = env_curve[:, -1]
+
+            offsets = self._steps[:frame_count]
+            note_time_seconds = self._time[:size].reshape(block)
+            np.copyto(voice_f32, self.voice_counters[:n], casting='unsafe')
+            np.add(voice_f32[:, None], offsets, out=note_time_seconds)
+            note_time_seconds *= dt
+            self.voice_counters[:n] += frame_count
+            if stats is not None: stats.stage(STAGE_ENVELOPE)
+
+            current_freq_array = self._work[:size].reshape(block)
+            gain = self._mod[:size].reshape(block)
+            self._eval_modulators(offsets, note_time_seconds, current_freq_array, gain,
+                                  self._fade[:size].reshape(block), self._tmp[:size].reshape(block))
+            gain *= env_curve
+
+            freqs = self._wheel_freqs(n)
+            if self.pitch_bend_depth:
+                current_freq_array += freqs[:, None]
+            else:
+                np.copyto(current_freq_array, freqs[:, None])
+            current_freq_array *= 2 ** 32 * dt
+        if stats is not None: stats.stage(STAGE_MODULATION)
+
+        # Phase accumulator: uint32 where 2**32 is one cycle, so it wraps
+        # for free and sin() only ever sees arguments in [0, 2*pi)
+        phase_inc = self._phase_inc[:size].reshape(block)
+        np.copyto(phase_inc, current_freq_array, casting='unsafe')
+        chunk_phases = self._phase[:size].reshape(block)
+        np.cumsum(phase_inc, axis=1, dtype=np.uint32, out=chunk_phases)
+        chunk_phases += self.voice_phases[:n, None]
+        self.voice_phases[:n] = chunk_phases[:, -1]
+
+        wave = self._wave[:size].reshape(block)
+        work = self._work[:size].reshape(block)
+        if self.wavetable is not None:
+            index = self._index[:size].reshape(block)
+            self.wavetable.lookup(chunk_phases, self.voice_tables[:n], wave, index, work, phase_inc)
+        else:
+            cycle = self._fade[:size].reshape(block)
+            np.copyto(cycle, chunk_phases, casting='unsafe')
+            cycle *= 2 * np.pi / 2 ** 32
+            nyquist = self.sample_rate / 2
+            wave.fill(0.0)
+            for harmonic, amps in self._partials:
+                # Amplitude of this partial on each voice's bus, band-limited:
+                # dropped above Nyquist per voice
+                partial_amp = voice_f32
+                np.multiply(self.voice_freqs[:n], harmonic, out=partial_amp)
+                np.less(partial_amp, nyquist, out=self._voice_bool[:n])
+                np.take(amps, self.voice_bus[:n], out=partial_amp, mode='clip')
+                partial_amp *= self._voice_bool[:n]
+                np.multiply(cycle, harmonic, out=work)
+                np.sin(work, out=work)
+                work *= partial_amp[:, None]
+                wave += work
+        if stats is not None: stats.stage(STAGE_OSCILLATOR)
+
+        wave *= gain
+        if stats is not None: stats.stage(STAGE_MODULATION)
+
+        # Per-voice gain times its bus gain / pan, then the mix-down of all
+        # buses in one (frames x n) @ (n x channels) product
+        if out is None:
+            out = self._out[:frame_count]
+        if self.channels == 1:
+            weights = voice_f32
+            np.take(self._bus_gain, self.voice_bus[:n], out=weights, mode='clip')
+            weights *= self.voice_gains[:n]
+            return np.dot(weights, wave, out=out)
+        weights = self._voice_weights[:n]
+        np.take(self._bus_weights, self.voice_bus[:n], axis=0, out=weights, mode='clip')
+        weights *= self.voice_gains[:n, None]
+        return np.dot(wave.T, weights, out=out)
+
+    def _retire_voices_unsafe(self):
+        n = self.num_voices
+        finished = self._voice_bool[:n]
+        # Within half a release step of zero counts as silent: the float32
+        # ramp can leave a ~1e-6 residue that would hold the voice (and its
+        # render cost) for another block, more so at high sample rates
+        threshold = self._voice_f32[:n]
+        np.multiply(self.voice_release[:n], 0.5, out=threshold)
+        np.less_equal(self.voice_envs[:n], threshold, out=finished)
+        # finished and not held (for booleans a > b == a & ~b)
+        np.greater(finished, self.voice_targets[:n], out=finished)
+        if finished.any():
+            for slot in np.flatnonzero(finished)[::-1]:
+                self._remove_voice_unsafe(slot)
+
+    def _pick_victim_unsafe(self, bus=None):
+        n = self.num_voices
+        score = self._voice_f32[:n]
+        # Never stolen: a voice already fading out, or one on another bus
+        # when the bus's own limit is what was hit
+        excluded = self._voice_mask[:n]
+        if bus is None:
+            np.copyto(excluded, self.voice_stolen[:n])
+        else:
+            np.not_equal(self.voice_bus[:n], bus, out=excluded)
+            excluded |= self.voice_stolen[:n]
+        if self.steal_policy == 'oldest':
+            np.copyto(score, self.voice_counters[:n], casting='unsafe')
+            np.negative(score, out=score)
+        else:
+            np.multiply(self.voice_envs[:n], self.voice_gains[:n], out=score)
+            if self.steal_policy == 'releasing':
+                held = self._voice_bool[:n]
+                np.logical_or(self.voice_targets[:n], excluded, out=held)
+                if not held.all():
+                    np.copyto(score, np.inf, where=held)
+        np.copyto(score, np.inf, where=excluded)
+        return int(np.argmin(score))
+
+    def _steal_voice_unsafe(self, bus=None):
+        if self.stealing >= self.steal_reserve:
+            # No fade slot left: cut the fading voice closest to silence
+            n = self.num_voices
+            level = self._voice_f32[:n]
+            np.multiply(self.voice_envs[:n], self.voice_gains[:n], out=level)
+            fading = self._voice_bool[:n]
+            np.logical_not(self.voice_stolen[:n], out=fading)
+            np.copyto(level, np.inf, where=fading)
+            self._remove_voice_unsafe(int(np.argmin(level)))
+
+        slot = self._pick_victim_unsafe(bus)
+        # Detach the voice from its key: later events for that key (its
+        # note-off, or a new note-on) no longer reach the fading voice
+        del self.voice_slots[self.voice_keys[slot]]
+        placeholder = ('stolen', self.stolen_voices)
+        self.voice_keys[slot] = placeholder
+        self.voice_slots[placeholder] = slot
+        self.voice_targets[slot] = False
+        self.voice_release[slot] = 1.0 / self.steal_samples
+        self.voice_stolen[slot] = True
+        self._bus_voices[self.voice_bus[slot]] -= 1
+        self.stealing += 1
+        self.stolen_voices += 1
+
+    def _apply_event_unsafe(self, kind, key, value, timestamp, code=None):
+        # Audio thread only (events.drain at block start, or the sequencer).
+        # code is bus_key(bus, note) when key is not that number itself.
+        recorder = self.recorder
+        if recorder is not None:
+            # Sequencer keys are ('seq', code); the log gets the code
+            recorder.log_event(kind, key[-1] if isinstance(key, tuple) else key, value, self._event_offset)
+        if kind == PITCH_BEND:
+            bus = int(key)
+            if not 0 <= bus < len(self.buses):
+                return
+            self._bus_bend[bus] = 2.0 ** (value / 12.0)
+            self._bent = bool(np.any(self._bus_bend != 1.0))
+            return
+        if kind == VIBRATO:
+            self.vibrato_depth = value
+            return
+        if kind == BUS_GAIN or kind == BUS_PAN:
+            bus = int(key)
+            if not 0 <= bus < len(self.buses):
+                # Not a bus of this engine (another producer's bad input)
+                return
+            if kind == BUS_GAIN:
+                self._set_bus_mix(bus, value, self._bus_pan[bus])
+            else:
+                self._set_bus_mix(bus, self._bus_gain[bus], value)
+            return
+        slot = self.voice_slots.get(key)
+        if kind == NOTE_ON:
+            if slot is None:
+                bus, note = divmod(int(key) if code is None else code, NUM_NOTES)
+                if not 0 <= bus < len(self.buses) or note < 0:
+                    # Not a voice key of this engine (another producer's bad input)
+                    return
+                limit = self.bus_max_voices[bus]
+                if limit is not None and self._bus_voices[bus] >= limit:
+                    self._steal_voice_unsafe(bus)
+                elif self.max_voices is not None and self.num_voices - self.stealing >= self.max_voices:
+                    self._steal_voice_unsafe()
+                slot = self._add_voice_unsafe(key, bus, note)
+            self.voice_targets[slot] = True
+            self.voice_gains[slot] = value
+        elif slot is None:
+            return
+        elif kind == NOTE_OFF:
+            self.voice_targets[slot] = False
+        elif kind == GAIN:
+            self.voice_gains[slot] = value
 
     def callback(self, in_data, frame_count, time_info, status):
         dt = 1.0 / self.sample_rate
-        output_signal = np.zeros(frame_count, dtype=np.float32)
-        local_t_steps = np.arange(frame_count, dtype=np.float32)
-        
-        with self.lock:
-            processing_freqs = list(self.envelopes.keys())
-            
-            if not processing_freqs:
+        adaptive = self.adaptive
+        if adaptive is not None: start = time.perf_counter()
+        stats = self.stats
+        if stats is not None: stats.begin_block(status)
+
+        # Broadcasting ufuncs allocate an iteration buffer of bufsize
+        # elements per call; at the default 8192 that is a fresh 32-64 KB
+        # per operation. 128 keeps them small even for the narrow
+        # (voices, control points) grids, and is no slower here.
+        # The setting is per thread, so it is applied on the audio thread.
+        if np.getbufsize() != UFUNC_BUFSIZE:
+            np.setbufsize(UFUNC_BUFSIZE)
+
+        if self._pending_timbre is not None:
+            self._apply_pending_timbre()
+        recorder = self.recorder
+        self._event_offset = 0
+        self.events.drain(self._apply_event_unsafe)
+        if stats is not None: stats.stage(STAGE_EVENTS)
+
+        self._ensure_scratch(frame_count)
+        output_signal = self._out[:frame_count]
+        sequencer = self._sequencer
+
+        # Without a sequencer the block is rendered in one piece. With one,
+        # it is cut at every score step so notes start on their exact sample.
+        pos = 0
+        silent = True
+        while pos < frame_count:
+            segment = frame_count - pos
+            if sequencer is not None:
+                self._event_offset = pos
+                segment = sequencer.advance(self, segment)
+                if self._ensure_scratch(frame_count):
+                    # The step grew the voice bank: carry the rendered part over
+                    self._out[:pos] = output_signal[:pos]
+                    output_signal = self._out[:frame_count]
+                if stats is not None: stats.stage(STAGE_EVENTS)
+
+            n = self.num_voices
+            if n == 0:
                 self.lfo_phase = 0
-                return (output_signal, pyaudio.paContinue)
-
-            for freq in processing_freqs:
-                if freq not in self.note_counters: self.note_counters[freq] = 0
-                
-                start_sample = self.note_counters[freq]
-                note_time_samples = start_sample + local_t_steps
-                note_time_seconds = note_time_samples * dt
-                
-                self.note_counters[freq] += frame_count
-                
-                pitch_bend = -8.0 * np.exp(-note_time_seconds * 25.0)
-                current_freq_array = freq + pitch_bend
-                
-                current_env = self.envelopes[freq]
-                target_env = 1.0 if freq in self.target_freqs else 0.0
-                
-                env_curve = np.zeros(frame_count, dtype=np.float32)
-                if target_env > current_env: 
-                    step = 1.0 / self.attack_samples
-                    env_curve = np.minimum(current_env + np.arange(1,frame_count+1)*step, 1.0)
-                else: 
-                    step = 1.0 / self.release_samples
-                    env_curve = np.maximum(current_env - np.arange(1,frame_count+1)*step, 0.0)
-                self.envelopes[freq] = env_curve[-1]
-
-                if self.envelopes[freq] <= 0.0 and freq not in self.target_freqs:
-                    del self.envelopes[freq]
-                    if freq in self.phases: del self.phases[freq]
-                    if freq in self.note_counters: del self.note_counters[freq]
-                    continue 
-
-                if freq not in self.phases: self.phases[freq] = 0.0
-                
-                phase_inc = 2 * np.pi * current_freq_array * dt
-                chunk_phases = self.phases[freq] + np.cumsum(phase_inc)
-                
-                wave = 0.6 * np.sin(chunk_phases)
-                wave += 0.2 * np.sin(chunk_phases * 2)
-                wave += 0.55 * np.sin(chunk_phases * 3)
-                wave += 0.15 * np.sin(chunk_phases * 5)
-
-                vibrato_speed = 2.5
-                
-                delay_time = 0.4 
-                vibrato_fade_in = np.clip((note_time_seconds - delay_time) * 2.0, 0.0, 1.0)
-                
-                lfo_val = np.sin(self.lfo_phase + 2 * np.pi * vibrato_speed * local_t_steps * dt)
-                
-                vibrato_mod = 1.0 + (0.012 * vibrato_fade_in * lfo_val)
-                
-                wave *= vibrato_mod
-                wave *= env_curve
-                
-                swell = 1.0 + 0.1 * np.sin(note_time_seconds * 3.0) * vibrato_fade_in
-                wave *= swell
-                
-                output_signal += wave
-                self.phases[freq] = chunk_phases[-1] % (2 * np.pi)
-
-            self.lfo_phase += 2 * np.pi * 3.5 * (frame_count * dt)
-            self.lfo_phase %= 2 * np.pi
-
-        output_signal *= self.volume
-        output_signal = np.tanh(output_signal * 1.2)
+                output_signal[pos:pos + segment] = 0.0
+            else:
+                self._render_voices(n, segment, stats, out=output_signal[pos:pos + segment])
+                self._retire_voices_unsafe()
+                silent = False
+
+                self.lfo_phase += 2 * np.pi * self.lfo_rate * (segment * dt)
+                self.lfo_phase %= 2 * np.pi
+            pos += segment
+
+        reverb = self.reverb
+        if silent and (reverb is None or reverb.idle()):
+            if recorder is not None: recorder.record(output_signal)
+            if stats is not None: stats.end_block(frame_count)
+            if adaptive is not None:
+                adaptive.block((time.perf_counter() - start) * self.sample_rate / frame_count, status)
+            return (output_signal, pyaudio.paContinue)
+
+        # The returned buffer is reused next block; PyAudio copies it out
+        output_signal *= self.volume * self.drive
+        if reverb is not None:
+            # Runs on silent blocks too until the tail has died away
+            reverb.process(output_signal, silent)
+            if stats is not None: stats.stage(STAGE_REVERB)
+        np.tanh(output_signal, out=output_signal)
+        if recorder is not None: recorder.record(output_signal)
+        if stats is not None:
+            stats.stage(STAGE_MASTER)
+            stats.end_block(frame_count)
+        if adaptive is not None:
+            adaptive.block((time.perf_counter() - start) * self.sample_rate / frame_count, status)
         
-        return (output_signal.astype(np.float32), pyaudio.paContinue)
-
-    def update_notes(self, active_frequencies):
-        with self.lock:
-            self.target_freqs = set(active_frequencies)
-            for freq in self.target_freqs:
-                if freq not in self.envelopes:
-                    self.envelopes[freq] = 0.0
-                    self.note_counters[freq] = 0 
+        return (output_signal, pyaudio.paContinue)
+
+    def bus_index(self, bus):
+        # Bus name or index -> index. Control thread: a bus this engine
+        # does not have raises ValueError here, never in the callback
+        if isinstance(bus, str):
+            if bus not in self.bus_names:
+                raise ValueError(f"Unknown bus {bus!r}, expected one of {list(self.bus_names)}")
+            return self.bus_names[bus]
+        is_index = isinstance(bus, (int, np.integer)) and not isinstance(bus, (bool, np.bool_))
+        if not is_index or not 0 <= bus < len(self.buses):
+            raise ValueError(f"No bus {bus!r}: this engine has buses 0..{len(self.buses) - 1}")
+        return int(bus)
+
+    @property
+    def target_notes(self):
+        # Voice keys the control thread holds, over all buses
+        return {bus_key(bus, note) for bus, held in enumerate(self.bus_targets) for note in held}
+
+    def set_bus(self, bus, active_notes):
+        # Note IDs (SaoMeoPitch) held on one bus; names and Hz are
+        # converted, out-of-range IDs raise ValueError. Single control
+        # thread only (the event ring is single-producer). bus_targets
+        # only takes the changes whose event made it into the ring, so a
+        # note dropped by a full ring is sent again on the next call.
+        bus = self.bus_index(bus)
+        new_targets = note_ids(active_notes)
+        old_targets = self.bus_targets[bus]
+        targets = set(old_targets)
+        now = time.perf_counter()
+        for note in old_targets - new_targets:
+            if self.events.push(NOTE_OFF, bus_key(bus, note), 0.0, now):
+                targets.discard(note)
+        for note in new_targets - old_targets:
+            if self.events.push(NOTE_ON, bus_key(bus, note), 1.0, now):
+                targets.add(note)
+        self.bus_targets[bus] = targets
+
+    def set_bus_gain(self, bus, gain):
+        self.events.push(BUS_GAIN, self.bus_index(bus), gain, time.perf_counter())
+
+    def set_bus_pan(self, bus, pan):
+        # -1 hard left .. 0 centre .. 1 hard right
+        self.events.push(BUS_PAN, self.bus_index(bus), pan, time.perf_counter())
+
+    def set_pitch_bend(self, bus, semitones):
+        # Pitch wheel of one bus, on top of every note's scoop; the bus is
+        # checked here (bus_index), never on the audio thread
+        self.events.push(PITCH_BEND, self.bus_index(bus), semitones, time.perf_counter())
+
+    def set_vibrato(self, depth):
+        self.events.push(VIBRATO, 0.0, depth, time.perf_counter())
+
+    def update_notes(self, active_notes):
+        self.set_bus(0, active_notes)
+
+    def apply_step(self, *parts):
+        # One entry of a score: (notes, duration), or (part, part, ...,
+        # duration) with one part per bus -> set_bus(i, part)
+        for bus, part in enumerate(parts):
+            self.set_bus(bus, part)
         
     def close(self):
-        self.stream.stop_stream()
-        self.stream.close()
-        self.p.terminate()
+        self.stop_recording()
+        if self._watcher is not None:
+            self._watch_stop.set()
+            self._watcher.join()
+            self._watcher = None
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+        if self.p is not None:
+            self.p.terminate()
+            self.p = None
+
+
+# Beo Dat May Troi melody
+melody = [
+    ('C4', 0.9), ('Rest', 0.1), ('C4', 1), ('G4', 0.25), ('F4', 0.25), ('E4', 0.25), ('F4', 0.25), ('G4', 1), # Beo dat... may troi
+    ('A4', 0.5), ('G4', 0.5), ('G4', 1), # Chon xa xoi...
+    ('E4', 0.5), ('D4', 0.5), ('E4', 1), # Anh oi
+    ('E4', 0.25), ('D4', 0.25), ('E4', 0.25), ('G4', 0.25), ('C4', 0.5), ('E4', 0.5), ('D4', 0.5), ('C4', 0.5), ('G3', 2), # Em van doi...beo dat
+    ('G4', 0.5), ('F4', 0.5), ('E4', 0.5), ('F4', 0.5), ('G4', 1), # May... troi
+    ('E4', 0.5), ('D4', 0.5), ('E4', 1), ('E4', 0.25), ('D4', 0.25), ('E4', 0.25), ('G4', 0.25), ('C4', 1), # Chim ca, tang tinh tinh...
+    ('C4', 0.25), ('E4', 0.25), ('D4', 0.25), ('C4', 0.25), ('G3', 2), # Ca loi...
+    ('A3', 0.5), ('C4', 0.5), ('C4', 0.5), ('D4', 0.25), ('E4', 0.25), ('E4', 1.5), # Ngam mot tin trong...
+    ('D4', 0.5), ('E4', 0.9), ('Rest', 0.1), ('E4', 0.5), ('E4', 0.25), ('D4', 0.25), ('C4', 0.75), # Hai tin doi...
+    ('D4', 0.25), ('E4', 0.25), ('D4', 0.25), ('E4', 0.25), ('G4', 0.25), ('C4', 0.5), ('A3', 1.0), # Ba bon tin cho...
+    ('C4', 0.5), ('A3', 0.5), ('C4', 0.5), ('E4', 0.5), ('E4', 0.25), ('D4', 0.25), ('C4', 2) # Sao chang thay dau...
+]
 
 if __name__ == "__main__":
-    notes = {
-        'Rest': 0,
-        'C2': 65.41, 'D2': 73.42, 'E2': 82.41, 'F2': 87.31, 'G2': 98.00, 'A2': 110.00, 'B2': 123.47,
-        'C3': 130.81, 'D3': 146.83, 'E3': 164.81, 'F3': 174.61, 'G3': 196.00, 'A3': 220.00, 'B3': 246.94,
-        'C4': 261.63, 'D4': 293.66, 'E4': 329.63, 'F4': 349.23, 'G4': 392.00, 'A4': 440.00, 'B4': 493.88,
-        'C5': 523.25, 'D5': 587.33, 'E5': 659.25, 'F5': 698.46, 'G5': 783.99, 'A5': 880.00, 'B5': 987.77,
-        'C6': 1046.50, 'D6': 1174.66, 'E6': 1318.51, 'F6': 1396.91, 'G6': 1567.98, 'A6': 1760.00, 'B6': 1975.53,
-        'C7': 2093.00, 'D7': 2349.32, 'E7': 2637.02, 'F7': 2793.83, 'G7': 3135.96, 'A7': 3520.00, 'B7': 3951.07,
-        'C8': 4186.01
-    }
-    
-    # Beo Dat May Troi melody
-    melody = [
-        ('C4', 0.9), ('Rest', 0.1), ('C4', 1), ('G4', 0.25), ('F4', 0.25), ('E4', 0.25), ('F4', 0.25), ('G4', 1), # Beo dat... may troi
-        ('A4', 0.5), ('G4', 0.5), ('G4', 1), # Chon xa xoi...
-        ('E4', 0.5), ('D4', 0.5), ('E4', 1), # Anh oi
-        ('E4', 0.25), ('D4', 0.25), ('E4', 0.25), ('G4', 0.25), ('C4', 0.5), ('E4', 0.5), ('D4', 0.5), ('C4', 0.5), ('G3', 2), # Em van doi...beo dat
-        ('G4', 0.5), ('F4', 0.5), ('E4', 0.5), ('F4', 0.5), ('G4', 1), # May... troi
-        ('E4', 0.5), ('D4', 0.5), ('E4', 1), ('E4', 0.25), ('D4', 0.25), ('E4', 0.25), ('G4', 0.25), ('C4', 1), # Chim ca, tang tinh tinh...
-        ('C4', 0.25), ('E4', 0.25), ('D4', 0.25), ('C4', 0.25), ('G3', 2), # Ca loi...
-        ('A3', 0.5), ('C4', 0.5), ('C4', 0.5), ('D4', 0.25), ('E4', 0.25), ('E4', 1.5), # Ngam mot tin trong...
-        ('D4', 0.5), ('E4', 0.9), ('Rest', 0.1), ('E4', 0.5), ('E4', 0.25), ('D4', 0.25), ('C4', 0.75), # Hai tin doi...
-        ('D4', 0.25), ('E4', 0.25), ('D4', 0.25), ('E4', 0.25), ('G4', 0.25), ('C4', 0.5), ('A3', 1.0), # Ba bon tin cho...
-        ('C4', 0.5), ('A3', 0.5), ('C4', 0.5), ('E4', 0.5), ('E4', 0.25), ('D4', 0.25), ('C4', 2) # Sao chang thay dau...
-    ]
-    
+    from SaoMeoSequencer import Sequencer
+
     print("Testing Sao Meo Engine...")
     engine = SaoMeoEngine()
     
     print("Playing Beo Dat May Troi...")
     try:
-        for note, duration in melody:
-            print(f"Playing: {note}")
-            freq = notes.get(note, 0)
-            
-            if freq > 0:
-                engine.update_notes([freq])
-            else:
-                engine.update_notes([])
-            
-            time.sleep(duration)
+        # Durations are beats; 60 BPM keeps the original one-second beat
+        sequencer = Sequencer(melody, tempo=60)
+        engine.sequencer = sequencer
+        sequencer.play()
+        time.sleep(sequencer.duration() + 1.0)
             
     except KeyboardInterrupt:
         print("Stopped.")
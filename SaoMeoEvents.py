@@ -0,0 +1,153 @@
+import numpy as np
+import threading
+import time
+from SaoMeoPitch import NUM_NOTES
+
+"""
+    Lock-free single-producer / single-consumer note-event ring.
+
+    The control thread (vision loop, sequencer, ...) pushes timestamped
+    events; the audio callback drains everything pending at the start of
+    each block. Neither side ever waits on the other:
+
+    - head is only written by the producer, tail only by the consumer.
+    - Both are monotonically increasing counters; the slot is counter & mask.
+    - The producer fills the slot first and publishes it by bumping head,
+      so the consumer never sees a half-written event.
+
+    If the ring is full, push() returns False and counts the event in
+    `dropped` instead of blocking the producer.
+
+    Only one thread may push. A thread that pushes on its own schedule
+    (e.g. SaoMeoMidi.MidiInput's dispatcher) claim()s the ring; pushes
+    from any other thread then raise RuntimeError instead of racing it
+    for the head.
+
+    The slots and the head/tail counters can live in a caller-supplied
+    buffer (e.g. multiprocessing.shared_memory) so the same ring works
+    across processes.
+"""
+
+NOTE_ON = 1     # key = voice key (bus_key(bus, note)), value = gain
+NOTE_OFF = 2    # key = voice key
+GAIN = 3        # key = voice key, value = new gain (no retrigger)
+BUS_GAIN = 4    # key = bus index, value = bus gain
+BUS_PAN = 5     # key = bus index, value = pan, -1 (left) .. 1 (right)
+PITCH_BEND = 6  # key = bus index, value = semitones (pitch wheel)
+VIBRATO = 7     # key unused, value = vibrato depth (mod wheel)
+
+def bus_key(bus, note):
+    # Voice key of a note on a mixer bus; bus 0 keys are plain note IDs
+    return bus * NUM_NOTES + note
+
+EVENT_DTYPE = np.dtype([
+    ('time', np.float64),
+    ('key', np.float64),
+    ('value', np.float32),
+    ('kind', np.int32),
+])
+
+class EventRing:
+    def __init__(self, capacity=4096, buffer=None):
+        if capacity & (capacity - 1):
+            raise ValueError(f"EventRing capacity must be a power of two, got {capacity}")
+        self.capacity = capacity
+        self.mask = capacity - 1
+
+        if buffer is None:
+            buffer = bytearray(self.nbytes(capacity))
+        # [head, tail] first, then the slots
+        self.counters = np.ndarray(2, dtype=np.int64, buffer=buffer)
+        self.slots = np.ndarray(capacity, dtype=EVENT_DTYPE, buffer=buffer, offset=16)
+        self.dropped = 0
+        self.producer = None    # thread ident that claimed the producer side
+
+    @staticmethod
+    def nbytes(capacity):
+        return 16 + capacity * EVENT_DTYPE.itemsize
+
+    @property
+    def pushed(self):
+        return int(self.counters[0])
+
+    @property
+    def consumed(self):
+        return int(self.counters[1])
+
+    def __len__(self):
+        return int(self.counters[0] - self.counters[1])
+
+    # --- producer side ---
+
+    def claim(self):
+        # Reserve the producer side for the calling thread until release()
+        ident = threading.get_ident()
+        if self.producer is not None and self.producer != ident:
+            raise RuntimeError("EventRing already has a producer thread")
+        self.producer = ident
+
+    def release(self):
+        self.producer = None
+
+    def _check_producer(self):
+        if self.producer is not None and self.producer != threading.get_ident():
+            raise RuntimeError("EventRing is claimed by another producer thread; push from that thread")
+
+    def push(self, kind, key, value=0.0, timestamp=None):
+        if self.producer is not None: self._check_producer()
+        head = int(self.counters[0])
+        if head - int(self.counters[1]) >= self.capacity:
+            self.dropped += 1
+            return False
+        slot = self.slots[head & self.mask]
+        slot['time'] = time.perf_counter() if timestamp is None else timestamp
+        slot['key'] = key
+        slot['value'] = value
+        slot['kind'] = kind
+        self.counters[0] = head + 1
+        return True
+
+    def push_many(self, kinds, keys, values, timestamp=None):
+        """
+        Push a batch (equal-length sequences) and publish it with a single
+        head update, so the consumer sees all of it or none. Events that
+        do not fit are counted in `dropped`. Returns how many were pushed.
+        """
+        if self.producer is not None: self._check_producer()
+        head = int(self.counters[0])
+        count = min(len(kinds), self.capacity - (head - int(self.counters[1])))
+        self.dropped += len(kinds) - max(count, 0)
+        if count <= 0:
+            return 0
+        start = head & self.mask
+        first = min(count, self.capacity - start)
+        slots = self.slots
+        for field, data in (('key', keys), ('value', values), ('kind', kinds)):
+            column = slots[field]
+            column[start:start + first] = data[:first]
+            column[:count - first] = data[first:count]
+        slots['time'][start:start + first] = time.perf_counter() if timestamp is None else timestamp
+        slots['time'][:count - first] = slots['time'][start]
+        self.counters[0] = head + count
+        return count
+
+    # --- consumer side ---
+
+    def drain(self, apply):
+        """
+        Call apply(kind, key, value, timestamp) for every pending event, in
+        order. Only events published before the call are taken.
+        Returns the number of events applied.
+
+        Each event is consumed before it is applied: if apply() raises,
+        that event is gone and the rest stay queued for the next drain,
+        so one bad event cannot jam the ring.
+        """
+        tail = int(self.counters[1])
+        head = int(self.counters[0])
+        counters = self.counters
+        for i in range(tail, head):
+            timestamp, key, value, kind = self.slots[i & self.mask].item()
+            counters[1] = i + 1
+            apply(kind, key, value, timestamp)
+        return head - tail
@@ -0,0 +1,122 @@
+import numpy as np
+from SaoMeoPitch import REST, notes
+
+"""
+    Hand landmarks -> notes, shared by main.py and the landmark replay
+    tools (SaoMeoLandmarks.py). No OpenCV / MediaPipe import: anything
+    with .landmark[i].x / .y in normalised image coordinates works.
+
+    Left hand:  thumb away from the ring-finger MCP = flat, each extended
+                finger (tip far from the wrist) = one octave up.
+    Right hand: number of extended fingers picks the note (C D E F, or
+                G A B C with the thumb out).
+
+    classify() makes that decision for many frames at once: each hand is
+    one (21, 3) array, all ten distances of a frame are one vectorised
+    step, and the note comes from the NOTE_NAMES / NOTE_IDS lookup
+    tables (note IDs as in SaoMeoPitch). hands_to_notes() is the live,
+    single-frame path main.py uses: the same five squared distances per
+    hand in plain arithmetic on the six landmarks involved (converting
+    all 21 to an array costs more than the decision itself), then the
+    same NOTE_NAMES lookup.
+"""
+
+CAM_WIDTH = 1280
+CAM_HEIGHT = 720
+thumb_threshold = (1 / 10) * CAM_WIDTH
+general_threshold = (1 / 5) * CAM_WIDTH
+
+HAND_LABELS = ('Left', 'Right')      # slot order in (hands, 21, ...) arrays
+NUM_LANDMARKS = 21
+WRIST, THUMB_TIP, RING_MCP = 0, 4, 13
+FINGER_TIPS = (8, 12, 16, 20)
+
+# Per hand, five distances in one gather: each fingertip to the wrist,
+# then the thumb tip to the ring-finger MCP
+_PAIRS = np.array((FINGER_TIPS + (RING_MCP,),
+                   (WRIST,) * len(FINGER_TIPS) + (THUMB_TIP,)))
+_THRESHOLDS2 = np.array((general_threshold ** 2,) * len(FINGER_TIPS) + (thumb_threshold ** 2,))
+_GENERAL2 = general_threshold ** 2
+_THUMB2 = thumb_threshold ** 2
+
+# Right hand: (thumb out, extended fingers) -> letter, octave offset
+LETTERS = (('', 'C', 'D', 'E', 'F'),
+           ('', 'G', 'A', 'B', 'C'))
+OCTAVE_OFFSET = ((0, 0, 0, 0, 0),
+                 (0, 0, 0, 0, 1))
+
+def _build_tables():
+    # NOTE_NAMES[thumb, fingers, left_octave, flat] -> note name ('' = none),
+    # NOTE_IDS[...] -> its note ID (REST = none)
+    shape = (2, len(FINGER_TIPS) + 1, len(FINGER_TIPS) + 1, 2)
+    names = np.empty(shape, dtype=object)
+    ids = np.full(shape, REST, dtype=np.int64)
+    for index in np.ndindex(shape):
+        thumb, fingers, octave, flat = index
+        name = LETTERS[thumb][fingers]
+        if fingers:
+            name += str(2 + OCTAVE_OFFSET[thumb][fingers] + octave) + ("b" if flat else "")
+        names[index] = name
+        ids[index] = notes.get(name, REST)
+    return names, ids
+
+NOTE_NAMES, NOTE_IDS = _build_tables()
+
+def hand_array(hand_landmarks):
+    # One (21, 3) float64 array per hand, converted once
+    return np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark], dtype=np.float64)
+
+def classify(landmarks, present, w, h):
+    """
+    Batch gesture decision.
+        landmarks: (frames, 2, 21, 2+) normalised x, y[, z]; slot 0 Left, 1 Right
+        present:   (frames, 2) bool
+    Returns (thumb, fingers, octave, flat), each (frames,), indexing
+    NOTE_NAMES / NOTE_IDS. Only frames with a right hand play a note.
+
+    Distances use the same truncated pixel coordinates as the original
+    per-landmark code and are compared squared, so the decisions match
+    it exactly.
+    """
+    # float64 like the Python floats MediaPipe hands out, then int() truncation
+    pixels = (landmarks[..., :2] * np.array((w, h), dtype=np.float64)).astype(np.int64)
+
+    ends = pixels[:, :, _PAIRS]
+    delta = ends[:, :, 0] - ends[:, :, 1]
+    delta *= delta
+    extended = delta[..., 0] + delta[..., 1] > _THRESHOLDS2
+
+    fingers = extended[..., :len(FINGER_TIPS)].sum(axis=-1)
+    thumb = extended[..., -1]
+
+    left, right = present[:, 0], present[:, 1]
+    octave = np.where(left, fingers[:, 0], 0)
+    flat = thumb[:, 0] & left
+    return thumb[:, 1].astype(np.int64), fingers[:, 1], octave, flat.astype(np.int64)
+
+def hand_state(hand_landmarks, w, h):
+    # One hand of one frame -> (extended fingers, thumb out), decided like classify()
+    lm = hand_landmarks.landmark
+    wrist = lm[WRIST]
+    wx, wy = int(wrist.x * w), int(wrist.y * h)
+    fingers = 0
+    for tip in FINGER_TIPS:
+        dx = int(lm[tip].x * w) - wx
+        dy = int(lm[tip].y * h) - wy
+        if dx * dx + dy * dy > _GENERAL2:
+            fingers += 1
+    thumb, mcp = lm[THUMB_TIP], lm[RING_MCP]
+    dx = int(mcp.x * w) - int(thumb.x * w)
+    dy = int(mcp.y * h) - int(thumb.y * h)
+    return fingers, int(dx * dx + dy * dy > _THUMB2)
+
+def hands_to_notes(current_hands, w, h):
+    # Single frame: {'Left': landmarks, 'Right': landmarks} -> [note] ([] without a right hand)
+    if "Right" not in current_hands:
+        return []
+    fingers, thumb = hand_state(current_hands["Right"], w, h)
+    octave, flat = hand_state(current_hands["Left"], w, h) if "Left" in current_hands else (0, 0)
+    return [NOTE_NAMES[thumb, fingers, octave, flat]]
+
+def notes_to_ids(current_notes):
+    return [notes[note] for note in current_notes if notes.get(note, REST) != REST]
@@ -0,0 +1,121 @@
+import cv2
+import numpy as np
+
+"""
+    Reduced-resolution, ROI-tracked MediaPipe hand inference.
+
+    main.py only needs a handful of landmark distances per hand, but feeds
+    the full 1280x720 frame to Hands.process every frame. HandTracker
+    instead
+    - runs MediaPipe on a copy downscaled by `scale`, and
+    - while hands are tracked, crops to the union of the previous frame's
+      hand boxes, grown by `roi_margin` (fraction of the box size) on
+      every side, so most frames see a small image.
+
+    It falls back to full-frame detection (still downscaled) when the ROI
+    loses every hand, and every `redetect_every` frames while fewer than
+    `max_hands` are tracked, so a hand entering the picture is picked up.
+
+    Returned landmarks are remapped in place to normalised full-frame
+    coordinates, so collect_hands / hands_to_notes / draw_landmarks work
+    unchanged. Two Hands instances are used (full frame and ROI) because
+    MediaPipe's own video-mode tracking assumes consistent framing.
+
+    scale=1.0 and roi=False is plain full-frame inference.
+"""
+
+class HandTracker:
+    def __init__(self, make_hands, scale=0.5, roi=True, roi_margin=0.3, min_roi=0.25,
+                 max_hands=2, redetect_every=15):
+        self.full_hands = make_hands()
+        self.roi_hands = make_hands() if roi else None
+        self.scale = scale
+        self.roi_margin = roi_margin
+        # Smallest ROI side, as a fraction of the frame's shorter side
+        self.min_roi = min_roi
+        self.max_hands = max_hands
+        self.redetect_every = redetect_every
+
+        self.roi = None                 # (x0, y0, x1, y1) pixels, or None
+        self.tracked = 0                # hands found in the last frame
+        self.since_full = 0
+        self.full_frames = 0
+        self.roi_frames = 0
+        self.lost = 0
+        self.last_mode = None
+
+    def _resize(self, img):
+        if self.scale == 1.0:
+            # ROI crops are views; MediaPipe wants contiguous images
+            return np.ascontiguousarray(img)
+        h, w = img.shape[:2]
+        size = (max(1, int(w * self.scale)), max(1, int(h * self.scale)))
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+    def _update_roi(self, results, w, h):
+        if self.roi_hands is None or not results.multi_hand_landmarks:
+            self.roi = None
+            return
+        xs = [lm.x for hand in results.multi_hand_landmarks for lm in hand.landmark]
+        ys = [lm.y for hand in results.multi_hand_landmarks for lm in hand.landmark]
+        x0, x1 = min(xs) * w, max(xs) * w
+        y0, y1 = min(ys) * h, max(ys) * h
+        margin = self.roi_margin * max(x1 - x0, y1 - y0)
+        half = max(max(x1 - x0, y1 - y0) / 2 + margin, self.min_roi * min(w, h) / 2)
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        roi = (max(0, int(cx - half)), max(0, int(cy - half)),
+               min(w, int(cx + half)), min(h, int(cy + half)))
+        # Hands leaving the frame can put the box outside it
+        self.roi = roi if roi[2] - roi[0] > 1 and roi[3] - roi[1] > 1 else None
+
+    def _process_roi(self, img):
+        x0, y0, x1, y1 = self.roi
+        h, w = img.shape[:2]
+        results = self.roi_hands.process(self._resize(img[y0:y1, x0:x1]))
+        if not results.multi_hand_landmarks:
+            return None
+        # Crop-normalised -> full-frame-normalised
+        sx, sy = (x1 - x0) / w, (y1 - y0) / h
+        ox, oy = x0 / w, y0 / h
+        for hand in results.multi_hand_landmarks:
+            for lm in hand.landmark:
+                lm.x = lm.x * sx + ox
+                lm.y = lm.y * sy + oy
+        return results
+
+    def process(self, img):
+        """img: full RGB frame. Returns MediaPipe results in full-frame coordinates."""
+        h, w = img.shape[:2]
+        results = None
+        redetect = self.tracked < self.max_hands and self.since_full >= self.redetect_every
+        if self.roi is not None and not redetect:
+            results = self._process_roi(img)
+            if results is None:
+                self.lost += 1
+            else:
+                self.roi_frames += 1
+                self.since_full += 1
+                self.last_mode = 'roi'
+
+        if results is None:
+            results = self.full_hands.process(self._resize(img))
+            self.full_frames += 1
+            self.since_full = 0
+            self.last_mode = 'full'
+
+        self.tracked = len(results.multi_hand_landmarks or ())
+        self._update_roi(results, w, h)
+        return results
+
+    def warm_up(self, height, width):
+        # The first process() of each graph loads the model; do it on a
+        # blank frame at start-up instead of on the first camera frame
+        blank = np.zeros((height, width, 3), dtype=np.uint8)
+        self.full_hands.process(self._resize(blank))
+        if self.roi_hands is not None:
+            self.roi_hands.process(self._resize(blank[:height // 2, :width // 2]))
+
+    def close(self):
+        self.full_hands.close()
+        if self.roi_hands is not None:
+            self.roi_hands.close()
@@ -0,0 +1,160 @@
+import argparse
+import numpy as np
+import sys
+import time
+from SaoMeoEngine import SaoMeoEngine
+from SaoMeoGestures import HAND_LABELS, NUM_LANDMARKS, NOTE_NAMES, classify, hand_array, hands_to_notes, notes_to_ids
+
+"""
+    Landmark recording and headless replay of the gesture pipeline.
+
+    main.py --record take.npz saves, per processed frame:
+        landmarks   (frames, 2, 21, 3) float32  normalised x, y, z
+        present     (frames, 2) bool            hand slot filled
+        times       (frames,) float64           perf_counter() at inference
+        notes       (frames,) str               note names main.py played, space separated
+        frame_size  (2,) int                    (w, h) the landmarks refer to
+    Hand slot 0 is MediaPipe's "Left", slot 1 "Right".
+
+    replay() feeds the recording back through hands_to_notes and
+    update_notes with no camera, no MediaPipe and no window, as fast as
+    the CPU allows, so the gesture logic can be benchmarked and
+    regression-tested offline:
+
+        python SaoMeoLandmarks.py take.npz
+
+    prints the replay FPS and exits non-zero if any frame's notes differ
+    from what was recorded live. --batch classifies every frame in one
+    SaoMeoGestures.classify() call instead of frame by frame.
+"""
+
+class Landmark:
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+class HandLandmarks:
+    # Stand-in for MediaPipe's NormalizedLandmarkList: .landmark[i].x / .y / .z
+    def __init__(self, points):
+        self.landmark = [Landmark(x, y, z) for x, y, z in points.tolist()]
+
+class LandmarkRecorder:
+    def __init__(self, capacity=4096):
+        self.frame_size = None
+        self.frames = 0
+        self.notes = []
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        landmarks = np.zeros((capacity, len(HAND_LABELS), NUM_LANDMARKS, 3), dtype=np.float32)
+        present = np.zeros((capacity, len(HAND_LABELS)), dtype=bool)
+        times = np.zeros(capacity, dtype=np.float64)
+        if self.frames:
+            landmarks[:self.frames] = self.landmarks[:self.frames]
+            present[:self.frames] = self.present[:self.frames]
+            times[:self.frames] = self.times[:self.frames]
+        self.landmarks, self.present, self.times = landmarks, present, times
+
+    def add(self, current_hands, w, h, timestamp=None, current_notes=()):
+        if self.frame_size is None:
+            self.frame_size = (w, h)
+        if self.frames == len(self.times):
+            self._allocate(2 * len(self.times))
+
+        i = self.frames
+        for slot, label in enumerate(HAND_LABELS):
+            hand = current_hands.get(label)
+            if hand is not None:
+                self.present[i, slot] = True
+                self.landmarks[i, slot] = hand_array(hand)
+        self.times[i] = time.perf_counter() if timestamp is None else timestamp
+        self.notes.append(" ".join(note for note in current_notes if note))
+        self.frames += 1
+
+    def save(self, path):
+        n = self.frames
+        np.savez_compressed(
+            path,
+            landmarks = self.landmarks[:n],
+            present = self.present[:n],
+            times = self.times[:n],
+            notes = np.array(self.notes, dtype=str),
+            frame_size = np.array(self.frame_size or (0, 0), dtype=np.int64),
+        )
+
+class LandmarkRecording:
+    def __init__(self, landmarks, present, times, frame_size, notes=None):
+        self.landmarks = landmarks
+        self.present = present
+        self.times = times
+        self.frame_size = tuple(int(v) for v in frame_size)
+        self.notes = notes
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            notes = [tuple(n.split()) for n in data['notes'].tolist()] if 'notes' in data else None
+            return cls(data['landmarks'], data['present'], data['times'], data['frame_size'], notes)
+
+    def __len__(self):
+        return len(self.times)
+
+    def hands_at(self, i):
+        return {label: HandLandmarks(self.landmarks[i, slot])
+                for slot, label in enumerate(HAND_LABELS) if self.present[i, slot]}
+
+def replay(recording, engine=None):
+    """
+    Run every recorded frame through hands_to_notes and, if given, the
+    engine's update_notes, at full speed. Pending engine events are
+    applied after each frame (no audio is rendered). Returns the per-frame
+    tuples of played note names and the frames per second achieved.
+    """
+    w, h = recording.frame_size
+    sequence = []
+    start = time.perf_counter()
+    for i in range(len(recording)):
+        current_notes = hands_to_notes(recording.hands_at(i), w, h)
+        if engine is not None:
+            engine.update_notes(notes_to_ids(current_notes))
+            engine.events.drain(engine._apply_event_unsafe)
+        sequence.append(tuple(note for note in current_notes if note))
+    elapsed = time.perf_counter() - start
+    return sequence, len(recording) / elapsed if elapsed > 0 else float('inf')
+
+def replay_batch(recording, engine=None):
+    """
+    Same result as replay(), but all frames are classified in one
+    vectorised call; only the engine updates stay per frame.
+    """
+    w, h = recording.frame_size
+    start = time.perf_counter()
+    names = NOTE_NAMES[classify(recording.landmarks, recording.present, w, h)]
+    right = recording.present[:, 1]
+    sequence = [(name,) if played and name else () for name, played in zip(names.tolist(), right.tolist())]
+    if engine is not None:
+        for current_notes in sequence:
+            engine.update_notes(notes_to_ids(current_notes))
+            engine.events.drain(engine._apply_event_unsafe)
+    elapsed = time.perf_counter() - start
+    return sequence, len(recording) / elapsed if elapsed > 0 else float('inf')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a main.py --record landmark file headless")
+    parser.add_argument("recording")
+    parser.add_argument("--no-engine", action="store_true", help="note mapping only, no engine updates")
+    parser.add_argument("--batch", action="store_true", help="classify all frames in one vectorised call")
+    args = parser.parse_args()
+
+    recording = LandmarkRecording.load(args.recording)
+    engine = None if args.no_engine else SaoMeoEngine(start_stream=False)
+    sequence, fps = (replay_batch if args.batch else replay)(recording, engine)
+    print(f"{len(recording)} frames at {recording.frame_size[0]}x{recording.frame_size[1]}: {fps:.0f} frames/s")
+
+    if recording.notes is not None:
+        mismatches = [i for i, (a, b) in enumerate(zip(sequence, recording.notes)) if a != b]
+        print(f"notes: {len(sequence) - len(mismatches)}/{len(sequence)} frames identical to the live run")
+        sys.exit(1 if mismatches else 0)
@@ -0,0 +1,80 @@
+import time
+from SaoMeoStats import XRUN_MASK
+
+"""
+    Stream latency profiles and adaptive buffer sizing for SaoMeoEngine.
+
+    Output latency is at least one buffer: frames_per_buffer / sample_rate
+    (1024 frames at 48 kHz = 21.3 ms, before the device's own buffering).
+    Profiles name the usual trade-offs:
+
+        SaoMeoEngine(latency='low')                     256 frames, 5.3 ms
+        SaoMeoEngine(latency='adaptive')                start at 128, grow on overruns
+        SaoMeoEngine(sample_rate=44100, frames_per_buffer=64)
+
+    Explicit sample_rate / frames_per_buffer override the profile.
+
+    'adaptive' attaches an AdaptiveBuffer. The callback only counts
+    overruns into it (PortAudio xrun flags, or a block whose render took
+    more than overrun_load of its period, i.e. one that nearly missed).
+    A watcher thread polls it; once more than `threshold` overruns land
+    within `window` seconds, the stream is reopened with the buffer
+    doubled, up to max_frames. The buffer never shrinks again: the aim is
+    the lowest size that stays clean on this machine.
+"""
+
+# name: (sample_rate, frames_per_buffer, adaptive)
+PROFILES = {
+    'safe':     (48000, 1024, False),   # historical default, ~21 ms
+    'balanced': (48000, 512, False),
+    'low':      (48000, 256, False),
+    'ultra':    (48000, 128, False),
+    'adaptive': (48000, 128, True),
+}
+
+class AdaptiveBuffer:
+    def __init__(self, frames=128, max_frames=2048, overrun_load=0.8, threshold=3, window=2.0, settle=0.5):
+        self.frames = frames
+        self.max_frames = max_frames
+        self.overrun_load = overrun_load
+        self.threshold = threshold
+        self.window = window
+        # Ignore the glitches of reopening the stream itself
+        self.settle = settle
+
+        self.overruns = 0       # written by the audio thread only
+        self.growths = []       # (perf_counter, new frames)
+        self._window_start = time.perf_counter()
+        self._window_overruns = 0
+
+    # --- audio thread ---
+
+    def block(self, load, status):
+        if load >= self.overrun_load or status & XRUN_MASK:
+            self.overruns += 1
+
+    # --- control thread ---
+
+    def restart(self, now=None):
+        # Start a fresh window (after the stream was (re)opened)
+        now = time.perf_counter() if now is None else now
+        self._window_start = now + self.settle
+        self._window_overruns = self.overruns
+
+    def poll(self, now=None):
+        """
+        Returns the new frames_per_buffer if the buffer should grow,
+        else None.
+        """
+        now = time.perf_counter() if now is None else now
+        if now < self._window_start:
+            self._window_overruns = self.overruns
+            return None
+        if self.overruns - self._window_overruns > self.threshold and self.frames < self.max_frames:
+            self.frames = min(2 * self.frames, self.max_frames)
+            self.growths.append((now, self.frames))
+            return self.frames
+        if now - self._window_start >= self.window:
+            self._window_start = now
+            self._window_overruns = self.overruns
+        return None
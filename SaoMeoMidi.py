@@ -0,0 +1,644 @@
+import select
+import socket
+import struct
+import threading
+import time
+import numpy as np
+from SaoMeoEvents import EventRing, NOTE_ON, NOTE_OFF, BUS_GAIN, BUS_PAN, PITCH_BEND, VIBRATO, bus_key
+from SaoMeoSequencer import PLAY, STOP, SEEK, LOOP
+
+"""
+    MIDI input: standard MIDI files, and live messages from a UDP socket
+    (raw MIDI bytes or OSC) or a local virtual MIDI port.
+
+    Channel messages become engine events:
+        note on / off      NOTE_ON (gain = velocity / 127) / NOTE_OFF
+        pitch bend         PITCH_BEND on the channel's bus, +-bend_range semitones
+        CC 1 (mod wheel)   VIBRATO, the engine's own vibrato_depth
+                           + wheel * vibrato_range
+        CC 7 / CC 10       BUS_GAIN / BUS_PAN of the channel's bus
+    Channel i plays on bus i by default (the last bus past the engine's
+    own); `buses` maps channels to bus names or indices instead.
+
+    Neither path costs the callback one event per MIDI message:
+
+    - MidiPlayer plays a file inside the callback, like a Sequencer
+      (player.attach(engine)). Note times are rounded to a grid of
+      `quantum` samples (the control period by default), and of the
+      note events on the same grid point only the last one per note is
+      kept, worked out once when the file is loaded; the block is cut
+      only where a note starts or stops. Controllers (bend, mod wheel,
+      volume, pan) never cut the block: at the start of each block the
+      newest value of each one due within it is applied, so a dense
+      bend curve costs a few events per block, not a block split per
+      message.
+    - MidiInput reads the live sources on one thread, keeps the newest
+      message per note / bus / controller, and once per audio block
+      period hands each engine the whole batch with one
+      EventRing.push_many (a single head update). A pitch-bend or
+      controller sweep of hundreds of messages per second reaches the
+      callback as one event per block. While it runs, its thread is the
+      only producer of those engines' event rings (EventRing.claim):
+      update_notes / set_bus / ... from another thread raise
+      RuntimeError rather than corrupting the single-producer ring.
+      Play notes through the MIDI input instead, or close() it first.
+
+    Events applied at the same point differ only in order, so keeping the
+    last of each changes nothing the engine would have played: a note on
+    and off within one block is silent either way.
+
+        player = MidiPlayer("song.mid")
+        player.attach(engine)       # engine.sequencer = player, which prepare()s it
+        player.play()
+
+        midi = MidiInput(engine, udp_port=9000)
+        midi.start()
+"""
+
+NOTE_OFF_STATUS = 0x80
+NOTE_ON_STATUS = 0x90
+CONTROL_STATUS = 0xB0
+BEND_STATUS = 0xE0
+MOD_WHEEL = 1
+VOLUME = 7
+PAN = 10
+
+# Bytes that follow each status (0xA0 aftertouch, 0xC0 program and 0xD0
+# channel pressure are read and ignored)
+DATA_BYTES = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+
+MESSAGE_DTYPE = np.dtype([
+    ('time', np.float64),       # seconds from the start of the file
+    ('status', np.uint8),
+    ('data1', np.uint8),
+    ('data2', np.uint8),
+])
+
+def _read_varlen(data, pos):
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, pos
+
+def _read_track(data, pos, end):
+    # (tick, order, status, data1, data2) channel messages and
+    # (tick, order, 'tempo', microseconds per beat)
+    tick = 0
+    running = None
+    events = []
+    while pos < end:
+        delta, pos = _read_varlen(data, pos)
+        tick += delta
+        status = data[pos]
+        if status == 0xFF:
+            kind = data[pos + 1]
+            length, pos = _read_varlen(data, pos + 2)
+            if kind == 0x51:
+                events.append((tick, len(events), 'tempo', int.from_bytes(data[pos:pos + 3], 'big'), 0))
+            pos += length
+            if kind == 0x2F:
+                break
+            continue
+        if status in (0xF0, 0xF7):
+            length, pos = _read_varlen(data, pos + 1)
+            pos += length
+            continue
+        if status & 0x80:
+            running = status
+            pos += 1
+        elif running is None:
+            raise ValueError(f"MIDI data byte without a status at offset {pos}")
+        count = DATA_BYTES[running & 0xF0]
+        data1 = data[pos]
+        data2 = data[pos + 1] if count == 2 else 0
+        pos += count
+        events.append((tick, len(events), running, data1, data2))
+    return events
+
+def read_midi(path):
+    """
+    Standard MIDI file (format 0 or 1) -> MESSAGE_DTYPE array of its
+    channel messages in time order, with the tempo map applied.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != b'MThd':
+        raise ValueError(f"{path} is not a standard MIDI file")
+    length = struct.unpack('>I', data[4:8])[0]
+    _, tracks, division = struct.unpack('>HHh', data[8:14])
+    pos = 8 + length
+
+    events = []
+    for track in range(tracks):
+        if data[pos:pos + 4] != b'MTrk':
+            raise ValueError(f"{path}: missing track chunk {track}")
+        size = struct.unpack('>I', data[pos + 4:pos + 8])[0]
+        events += [(tick, track, order, status, d1, d2)
+                   for tick, order, status, d1, d2 in _read_track(data, pos + 8, pos + 8 + size)]
+        pos += 8 + size
+    # Tempo changes go first among events on the same tick
+    events.sort(key=lambda e: (e[0], e[3] != 'tempo', e[1], e[2]))
+
+    if division < 0:
+        # SMPTE: frames per second x ticks per frame
+        seconds_per_tick = 1.0 / (-(division >> 8) * (division & 0xFF))
+        tempo_scale = None
+    else:
+        tempo_scale = 1e-6 / division       # x microseconds per beat
+        seconds_per_tick = 500000 * tempo_scale
+
+    messages = []
+    last_tick = 0
+    seconds = 0.0
+    for tick, _, _, status, d1, d2 in events:
+        seconds += (tick - last_tick) * seconds_per_tick
+        last_tick = tick
+        if status == 'tempo':
+            if tempo_scale is not None:
+                seconds_per_tick = d1 * tempo_scale
+        else:
+            messages.append((seconds, status, d1, d2))
+    return np.array(messages, dtype=MESSAGE_DTYPE)
+
+def translate(status, data1, data2, bend_range=2.0, vibrato_range=0.03):
+    """
+    One channel message -> (kind, channel, note or None, value), or None
+    for messages the engine has no use for. A mod wheel gives the
+    vibrato depth it adds (0 .. vibrato_range); the receiver adds its
+    engine's own vibrato_depth, which differs per engine class.
+    """
+    status, data1, data2 = int(status), int(data1), int(data2)
+    kind = status & 0xF0
+    channel = status & 0x0F
+    if kind == NOTE_ON_STATUS and data2 > 0:
+        return NOTE_ON, channel, data1, data2 / 127.0
+    if kind == NOTE_ON_STATUS or kind == NOTE_OFF_STATUS:
+        return NOTE_OFF, channel, data1, 0.0
+    if kind == BEND_STATUS:
+        return PITCH_BEND, channel, None, ((data2 << 7 | data1) - 8192) / 8192.0 * bend_range
+    if kind == CONTROL_STATUS:
+        if data1 == MOD_WHEEL:
+            return VIBRATO, channel, None, data2 / 127.0 * vibrato_range
+        if data1 == VOLUME:
+            return BUS_GAIN, channel, None, data2 / 127.0
+        if data1 == PAN:
+            return BUS_PAN, channel, None, max(-1.0, (data2 - 64) / 63.0)
+    return None
+
+def channel_buses(engine, buses=None):
+    # Bus index of each of the 16 MIDI channels
+    if buses is None:
+        return [min(channel, len(engine.buses) - 1) for channel in range(16)]
+    mapping = dict(enumerate(buses)) if isinstance(buses, (list, tuple)) else dict(buses)
+    return [engine.bus_index(mapping.get(channel, 0)) for channel in range(16)]
+
+def _slot(kind, bus, note):
+    # What a later event replaces: the note's state, or the bus / engine control
+    if kind == NOTE_ON or kind == NOTE_OFF:
+        return (NOTE_ON, bus, note)
+    return (kind, 0 if kind == VIBRATO else bus, None)
+
+class MidiPlayer:
+    def __init__(self, midi, loop=False, buses=None, quantum=32, bend_range=2.0, vibrato_range=0.03):
+        """
+        midi:    path of a standard MIDI file, or a MESSAGE_DTYPE array
+        buses:   channel -> bus name / index (dict, or list by channel)
+        quantum: grid in samples note times are rounded to; None = the
+                 engine's control_period
+        """
+        self.messages = read_midi(midi) if isinstance(midi, str) else np.asarray(midi, dtype=MESSAGE_DTYPE)
+        self.length = float(self.messages['time'][-1]) if len(self.messages) else 0.0
+        self.buses = buses
+        self.quantum = quantum
+        self.loop = loop
+        self._translated = [translate(m['status'], m['data1'], m['data2'], bend_range, vibrato_range)
+                            for m in self.messages]
+
+        self.commands = EventRing(256)
+
+        # Audio-thread state
+        self.playing = False
+        self.position = 0       # samples since the start of the file
+        self.index = 0          # next note batch
+        self.control_index = 0  # next controller event
+        self._generation = 0
+        self.active = set()     # keys of sounding player voices
+        self._prepared = None   # (engine, sample_rate) the batches below are for
+        self.unprepared_blocks = 0  # blocks advance() skipped for lack of prepare()
+        self._engine = None
+
+    def duration(self):
+        return self.length
+
+    # --- control thread ---
+
+    def play(self):
+        self.commands.push(PLAY, 0.0)
+
+    def stop(self):
+        self.commands.push(STOP, 0.0)
+
+    def seek(self, seconds):
+        self.commands.push(SEEK, seconds)
+
+    def set_loop(self, loop):
+        self.commands.push(LOOP, 1.0 if loop else 0.0)
+
+    def attach(self, engine):
+        # Make this player the engine's sequencer; the engine's setter
+        # calls prepare() here on the control thread
+        engine.sequencer = self
+
+    def prepare(self, engine):
+        """
+        Convert every message for this engine's rate and buses: notes
+        gridded, keeping the last event per note on each grid point;
+        controllers in time order, with a small slot number each for the
+        per-block coalescing. Control thread: setting engine.sequencer
+        = player (or attach()) calls it; advance() stays silent
+        for an engine it was not prepared for rather than doing this
+        work on the audio thread. The mod wheel adds to the engine's
+        vibrato_depth as it is now.
+        """
+        quantum = self.quantum or engine.control_period or 1
+        vibrato_base = engine.vibrato_depth
+        bus_of = channel_buses(engine, self.buses)
+        batches = {}
+        slots = {}
+        control_samples = []
+        self.controls = []
+        for message, event in zip(self.messages, self._translated):
+            if event is None:
+                continue
+            kind, channel, note, value = event
+            bus = bus_of[channel]
+            if note is None:
+                slot = slots.setdefault(_slot(kind, bus, note), len(slots))
+                if kind == VIBRATO:
+                    value += vibrato_base
+                control_samples.append(int(round(message['time'] * engine.sample_rate)))
+                self.controls.append((slot, kind, 0.0 if kind == VIBRATO else float(bus), value))
+                continue
+            point = int(round(message['time'] * engine.sample_rate / quantum)) * quantum
+            batch = batches.setdefault(point, {})
+            code = bus_key(bus, note)
+            # Re-inserted so the batch keeps the order of the last events
+            batch.pop(code, None)
+            batch[code] = (kind, ('midi', code), value, code)
+        self.points = np.array(sorted(batches), dtype=np.int64)
+        self.batches = [list(batches[point].values()) for point in self.points]
+        self.control_samples = np.array(control_samples, dtype=np.int64)
+        self._seen = [0] * len(slots)
+        self.end = int(round(self.length * engine.sample_rate))
+        self._prepared = (engine, engine.sample_rate)
+
+    # --- audio thread ---
+
+    def _all_off(self, engine):
+        now = time.perf_counter()
+        for key in self.active:
+            engine._apply_event_unsafe(NOTE_OFF, key, 0.0, now)
+        self.active = set()
+
+    def _seek(self, seconds, sample_rate):
+        self.position = int(round(seconds * sample_rate))
+        self.index = int(np.searchsorted(self.points, self.position))
+        self.control_index = int(np.searchsorted(self.control_samples, self.position))
+
+    def _apply_command(self, kind, key, value, timestamp):
+        engine = self._engine
+        if kind == PLAY:
+            if not self.playing and self.index >= len(self.points) and self.position >= self.end:
+                self._seek(0.0, engine.sample_rate)
+            self.playing = True
+        elif kind == STOP:
+            self.playing = False
+            self._all_off(engine)
+        elif kind == SEEK:
+            self._all_off(engine)
+            self._seek(key % self.length if self.length else 0.0, engine.sample_rate)
+        elif kind == LOOP:
+            self.loop = bool(key)
+
+    def _apply_batch(self, engine, batch):
+        now = time.perf_counter()
+        active = self.active
+        for kind, key, value, code in batch:
+            if kind == NOTE_ON:
+                active.add(key)
+            elif kind == NOTE_OFF:
+                active.discard(key)
+            engine._apply_event_unsafe(kind, key, value, now, code=code)
+
+    def _apply_controls(self, engine, end):
+        # Newest value of each controller due before sample `end`; walks
+        # the due events backwards and skips slots already set
+        start = self.control_index
+        stop = int(np.searchsorted(self.control_samples, end))
+        if stop <= start:
+            return
+        self._generation += 1
+        generation = self._generation
+        seen = self._seen
+        now = time.perf_counter()
+        for i in range(stop - 1, start - 1, -1):
+            slot, kind, key, value = self.controls[i]
+            if seen[slot] != generation:
+                seen[slot] = generation
+                engine._apply_event_unsafe(kind, key, value, now)
+        self.control_index = stop
+
+    def advance(self, engine, max_frames):
+        """
+        Called by the engine callback (Sequencer interface): applies the
+        batch due at the current sample and returns how many frames can
+        be rendered before the next one.
+        """
+        if self._prepared is None or self._prepared[0] is not engine or self._prepared[1] != engine.sample_rate:
+            # Not prepared for this engine: play nothing (see attach())
+            self.unprepared_blocks += 1
+            return max_frames
+        self._engine = engine
+        self.commands.drain(self._apply_command)
+        if not self.playing:
+            return max_frames
+
+        self._apply_controls(engine, self.position + max_frames)
+        points = self.points
+        while True:
+            if self.index < len(points):
+                if points[self.index] > self.position:
+                    boundary = int(points[self.index])
+                    break
+                self._apply_batch(engine, self.batches[self.index])
+                self.index += 1
+                continue
+            if self.end > self.position:
+                boundary = self.end
+                break
+            if self.loop and self.end > 0:
+                self._all_off(engine)
+                self.position = 0
+                self.index = 0
+                self.control_index = 0
+                continue
+            self._all_off(engine)
+            self.playing = False
+            return max_frames
+
+        frames = min(max_frames, boundary - self.position)
+        self.position += frames
+        return frames
+
+def _osc_string(data, pos):
+    end = data.index(b'\0', pos)
+    return data[pos:end].decode('ascii', 'replace'), (end + 4) & ~3
+
+def parse_osc(data):
+    """
+    OSC packet (message or bundle) -> list of (status, data1, data2).
+    Addresses: /note_on ch note vel, /note_off ch note, /pitch_bend ch
+    value (int -8192..8191, or float -1..1), /cc ch controller value,
+    /midi with one 'm' (MIDI message) argument.
+    """
+    if data.startswith(b'#bundle\0'):
+        out = []
+        pos = 16
+        while pos + 4 <= len(data):
+            size = struct.unpack('>i', data[pos:pos + 4])[0]
+            out += parse_osc(data[pos + 4:pos + 4 + size])
+            pos += 4 + size
+        return out
+    address, pos = _osc_string(data, 0)
+    tags, pos = _osc_string(data, pos)
+    args = []
+    for tag in tags[1:]:
+        if tag == 'i':
+            args.append(struct.unpack('>i', data[pos:pos + 4])[0])
+        elif tag == 'f':
+            args.append(struct.unpack('>f', data[pos:pos + 4])[0])
+        elif tag == 'm':
+            args.append(tuple(data[pos + 1:pos + 4]))
+        else:
+            return []
+        pos += 4
+    if address == '/midi' and args:
+        return [args[0]]
+    channel = int(args[0]) & 0x0F if args else 0
+    if address == '/note_on' and len(args) >= 3:
+        return [(NOTE_ON_STATUS | channel, int(args[1]), int(args[2]))]
+    if address == '/note_off' and len(args) >= 2:
+        return [(NOTE_OFF_STATUS | channel, int(args[1]), 0)]
+    if address == '/pitch_bend' and len(args) >= 2:
+        value = args[1] * 8192 if isinstance(args[1], float) else args[1]
+        value = min(16383, max(0, int(value) + 8192))
+        return [(BEND_STATUS | channel, value & 0x7F, value >> 7)]
+    if address == '/cc' and len(args) >= 3:
+        return [(CONTROL_STATUS | channel, int(args[1]), int(args[2]))]
+    return []
+
+def parse_bytes(data):
+    # Raw MIDI stream (running status allowed) -> list of (status, data1, data2)
+    out = []
+    running = None
+    pos = 0
+    while pos < len(data):
+        byte = data[pos]
+        if byte & 0x80:
+            if byte >= 0xF0:
+                # System messages: no channel, nothing to play
+                pos += 1
+                continue
+            running = byte
+            pos += 1
+        if running is None:
+            pos += 1
+            continue
+        count = DATA_BYTES[running & 0xF0]
+        if pos + count > len(data):
+            break
+        out.append((running, data[pos], data[pos + 1] if count == 2 else 0))
+        pos += count
+    return out
+
+class MidiInput:
+    def __init__(self, engines, udp_port=None, udp_host='127.0.0.1', port_name=None, buses=None,
+                 interval=None, bend_range=2.0, vibrato_range=0.03):
+        """
+        engines:   an engine, or a list; with several, channel i drives
+                   engines[i % len(engines)] on its bus 0 unless `buses`
+                   is given, as channel -> (engine index, bus)
+        udp_port:  listen for raw MIDI or OSC datagrams on this port
+        port_name: open a virtual MIDI input port of this name (needs
+                   the optional mido + python-rtmidi packages)
+        interval:  seconds between flushes; default one audio block of
+                   the first engine
+        """
+        self.engines = list(engines) if isinstance(engines, (list, tuple)) else [engines]
+        first = self.engines[0]
+        self.interval = interval or first.frames_per_buffer / first.sample_rate
+        self.bend_range = bend_range
+        self.vibrato_range = vibrato_range
+        # Mod wheel base per engine: its vibrato_depth before any wheel move
+        self.vibrato_base = [engine.vibrato_depth for engine in self.engines]
+        # channel -> (engine index, bus index)
+        if len(self.engines) == 1:
+            self.routes = [(0, bus) for bus in channel_buses(first, buses)]
+        else:
+            mapping = dict(buses or {})
+            self.routes = []
+            for channel in range(16):
+                engine, bus = mapping.get(channel, (channel % len(self.engines), 0))
+                self.routes.append((engine, self.engines[engine].bus_index(bus)))
+
+        # Newest event per (engine, note / control), in arrival order of
+        # the last update. Only the dispatcher thread touches it.
+        self.pending = {}
+        self.received = 0
+        self.flushed = 0
+        self.dropped = 0
+
+        self.sock = None
+        if udp_port is not None:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.bind((udp_host, udp_port))
+            self.sock.setblocking(False)
+        self.port = None
+        if port_name is not None:
+            try:
+                import mido
+            except ImportError as error:
+                raise RuntimeError("A virtual MIDI port needs the mido and python-rtmidi packages") from error
+            self.port = mido.open_input(port_name, virtual=True)
+        self._thread = None
+        self._running = False
+
+    def feed(self, status, data1, data2):
+        # One channel message into the pending batch (dispatcher thread)
+        self.received += 1
+        event = translate(status, data1, data2, self.bend_range, self.vibrato_range)
+        if event is None:
+            return
+        kind, channel, note, value = event
+        engine, bus = self.routes[channel]
+        if kind == VIBRATO:
+            value += self.vibrato_base[engine]
+        slot = (engine, _slot(kind, bus, note))
+        key = float(bus_key(bus, note)) if note is not None else (0.0 if kind == VIBRATO else float(bus))
+        self.pending.pop(slot, None)
+        self.pending[slot] = (kind, key, value)
+
+    def feed_packet(self, data):
+        messages = parse_osc(data) if data[:1] in (b'/', b'#') else parse_bytes(data)
+        for status, data1, data2 in messages:
+            self.feed(status, data1, data2)
+
+    def flush(self):
+        """
+        Hand every engine its share of the pending batch with one
+        push_many each. Returns the number of events pushed.
+        """
+        if not self.pending:
+            return 0
+        per_engine = [([], [], []) for _ in self.engines]
+        for (engine, _), (kind, key, value) in self.pending.items():
+            kinds, keys, values = per_engine[engine]
+            kinds.append(kind)
+            keys.append(key)
+            values.append(value)
+        self.pending.clear()
+        now = time.perf_counter()
+        pushed = 0
+        for engine, (kinds, keys, values) in zip(self.engines, per_engine):
+            if kinds:
+                count = engine.events.push_many(kinds, keys, values, now)
+                pushed += count
+                self.dropped += len(kinds) - count
+        self.flushed += pushed
+        return pushed
+
+    def poll(self, timeout=0.0):
+        # Read whatever the sources have (waiting up to `timeout` on the socket)
+        if self.sock is not None:
+            ready, _, _ = select.select([self.sock], [], [], timeout)
+            while ready:
+                try:
+                    data = self.sock.recv(65536)
+                except BlockingIOError:
+                    break
+                self.feed_packet(data)
+        elif timeout > 0:
+            time.sleep(timeout)
+        if self.port is not None:
+            for message in self.port.iter_pending():
+                raw = message.bytes()
+                if len(raw) >= 2 and raw[0] < 0xF0:
+                    self.feed(raw[0], raw[1], raw[2] if len(raw) > 2 else 0)
+
+    def _run(self):
+        for engine in self.engines:
+            engine.events.claim()
+        deadline = time.perf_counter() + self.interval
+        while self._running:
+            self.poll(max(0.0, deadline - time.perf_counter()))
+            now = time.perf_counter()
+            if now >= deadline:
+                self.flush()
+                deadline = max(deadline + self.interval, now)
+
+    def start(self):
+        # From here until close() this thread is the engines' only event producer
+        for engine in self.engines:
+            if engine.events.producer is not None:
+                raise RuntimeError("The engine's event ring already has a producer thread")
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="SaoMeoMidi", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            for engine in self.engines:
+                engine.events.release()
+        self.flush()
+        if self.sock is not None:
+            self.sock.close()
+        if self.port is not None:
+            self.port.close()
+
+if __name__ == "__main__":
+    import argparse
+    from SaoMeoMixer import SaoMeoMixer
+
+    parser = argparse.ArgumentParser(description="Play a MIDI file, or live MIDI from UDP / a virtual port")
+    parser.add_argument("file", nargs="?", help="standard MIDI file to play")
+    parser.add_argument("--udp", type=int, metavar="PORT", help="listen for raw MIDI / OSC datagrams")
+    parser.add_argument("--port", metavar="NAME", help="open a virtual MIDI input port")
+    parser.add_argument("--loop", action="store_true")
+    args = parser.parse_args()
+
+    engine = SaoMeoMixer(max_voices=32)
+    if args.file:
+        player = MidiPlayer(args.file, loop=args.loop)
+        player.attach(engine)
+        player.play()
+    live = None
+    if args.udp is not None or args.port:
+        live = MidiInput(engine, udp_port=args.udp, port_name=args.port)
+        live.start()
+    try:
+        if args.file and not args.loop and live is None:
+            time.sleep(player.duration() + 1.0)
+        else:
+            while True:
+                time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    if live is not None:
+        live.close()
+    engine.close()
@@ -0,0 +1,264 @@
+import signal
+import sys
+import threading
+import time
+
+"""
+    Pipelined capture -> inference -> display for main.py (--pipeline).
+
+    The serial loop pays cap.read + flip + cvtColor + hands.process +
+    note mapping + drawing + imshow/waitKey before the next note update,
+    and a slow stage makes frames queue up in the camera driver. Here
+    every stage runs at its own pace and only ever sees the newest item:
+
+        CaptureThread ──LatestSlot──> InferenceWorker ──LatestSlot──> display (main thread)
+                                           │
+                                           └─> engine.update_notes() as soon as landmarks arrive
+
+    A LatestSlot holds a single item; put() overwrites whatever the
+    consumer has not taken yet and counts it as dropped, so no stage ever
+    works on a stale frame. imshow / waitKey stay on the main thread
+    (required by some GUI backends).
+
+    PipelineStats keeps per-stage FPS and latency for both the serial and
+    the pipelined loop, so the two can be compared at 1280x720.
+
+    DisplayThrottle picks which processed frames are drawn and shown
+    (main.py --display): every one ('full'), at most N per second
+    ('throttled'), or none ('headless'). Landmarks -> notes has already
+    run for every frame by then, so a skipped frame costs the inference
+    loop nothing. Headless runs are stopped through StopControl instead
+    of the window's 'q' key.
+"""
+
+DISPLAY_MODES = ('full', 'throttled', 'headless')
+
+class LatestSlot:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        with self._cond:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        # Newest item, or None on timeout / close
+        with self._cond:
+            if self._item is None and not self.closed:
+                self._cond.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+class StageStats:
+    def __init__(self, window=1.0):
+        self.window = window
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+        self.fps = 0.0
+        self._window_start = time.perf_counter()
+        self._window_count = 0
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        self.max = max(self.max, seconds)
+
+        self._window_count += 1
+        now = time.perf_counter()
+        if now - self._window_start >= self.window:
+            self.fps = self._window_count / (now - self._window_start)
+            self._window_start = now
+            self._window_count = 0
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+class PipelineStats:
+    """
+    capture:   cap.read + flip
+    inference: cvtColor + hands.process + note mapping
+    display:   drawing + imshow + waitKey
+    latency:   frame captured -> update_notes() called (gesture to engine)
+    """
+    STAGES = ('capture', 'inference', 'display', 'latency')
+
+    def __init__(self):
+        self.stages = {name: StageStats() for name in self.STAGES}
+        # LatestSlots whose overwritten (skipped) frames are reported
+        self.slots = []
+
+    @property
+    def dropped(self):
+        return sum(slot.dropped for slot in self.slots)
+
+    def record(self, name, seconds):
+        self.stages[name].record(seconds)
+
+    def snapshot(self):
+        return {
+            name: {'fps': s.fps, 'mean_ms': s.mean * 1e3, 'last_ms': s.last * 1e3, 'max_ms': s.max * 1e3}
+            for name, s in self.stages.items()
+        }
+
+    def lines(self):
+        out = [f"{name}: {s['fps']:.0f} fps  {s['mean_ms']:.1f} ms"
+               for name, s in self.snapshot().items() if name != 'latency']
+        latency = self.stages['latency']
+        out.append(f"gesture->engine: {latency.last * 1e3:.1f} ms (mean {latency.mean * 1e3:.1f})  dropped: {self.dropped}")
+        return out
+
+    def summary(self):
+        return "\n".join(
+            f"{name:>9}: {s['fps']:5.1f} fps  mean {s['mean_ms']:6.1f} ms  max {s['max_ms']:6.1f} ms"
+            for name, s in self.snapshot().items()
+        ) + f"\n  dropped: {self.dropped} frames"
+
+class CaptureThread(threading.Thread):
+    """
+    Reads the camera as fast as it delivers and publishes (frame,
+    time the read returned) into `slot`, newest only. transform (e.g. flip) runs on
+    this thread.
+    """
+    def __init__(self, cap, slot, stats, transform=None):
+        super().__init__(name="capture", daemon=True)
+        self.cap = cap
+        self.slot = slot
+        self.stats = stats
+        self.transform = transform
+        self.failed = False
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            start = time.perf_counter()
+            success, img = self.cap.read()
+            captured = time.perf_counter()
+            if not success:
+                self.failed = True
+                break
+            if self.transform is not None:
+                img = self.transform(img)
+            self.stats.record('capture', time.perf_counter() - start)
+            self.slot.put((img, captured))
+        self.slot.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+class InferenceWorker(threading.Thread):
+    """
+    Takes the newest captured frame, runs process(img) -> result (which is
+    expected to push note updates itself), and publishes
+    (img, result, capture_time) for display.
+    """
+    def __init__(self, source, sink, process, stats):
+        super().__init__(name="inference", daemon=True)
+        self.source = source
+        self.sink = sink
+        self.process = process
+        self.stats = stats
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            item = self.source.get(timeout=0.1)
+            if item is None:
+                if self.source.closed:
+                    break
+                continue
+            img, captured = item
+            start = time.perf_counter()
+            result = self.process(img)
+            done = time.perf_counter()
+            self.stats.record('inference', done - start)
+            self.stats.record('latency', done - captured)
+            self.sink.put((img, result, captured))
+        self.sink.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+class DisplayThrottle:
+    def __init__(self, mode='full', fps=15.0):
+        if mode not in DISPLAY_MODES:
+            raise ValueError(f"Unknown display mode {mode!r}, expected one of {DISPLAY_MODES}")
+        self.mode = mode
+        self.period = 1.0 / fps if mode == 'throttled' else 0.0
+        self._next = 0.0
+        self.shown = 0
+        self.skipped = 0
+
+    def due(self):
+        # True when this frame should be drawn and shown
+        if self.mode == 'full':
+            show = True
+        elif self.mode == 'headless':
+            show = False
+        else:
+            now = time.perf_counter()
+            show = now >= self._next
+            if show:
+                # On the period grid, without catching up after a stall
+                self._next = max(self._next + self.period, now)
+        if show:
+            self.shown += 1
+        else:
+            self.skipped += 1
+        return show
+
+    def wait(self, stop=None):
+        # Sleep until the next frame is due (pipelined display loop)
+        delay = self._next - time.perf_counter()
+        if delay > 0:
+            if stop is not None:
+                stop.wait(delay)
+            else:
+                time.sleep(delay)
+
+class StopControl:
+    """
+    Stop requests that need no window: SIGINT / SIGTERM (SIGBREAK on
+    Windows), and with stdin=True a line on standard input: 'q' quits,
+    other letters run the matching entry of `commands` (e.g. 's' to print
+    stats). Create it on the main thread (signal handlers).
+    """
+    def __init__(self, stdin=False, commands=None):
+        self.stop = threading.Event()
+        self.commands = dict(commands or {})
+        self.commands.setdefault('q', self.stop.set)
+        for name in ('SIGINT', 'SIGTERM', 'SIGBREAK'):
+            sig = getattr(signal, name, None)
+            if sig is not None:
+                signal.signal(sig, self._on_signal)
+        if stdin and sys.stdin is not None:
+            threading.Thread(target=self._read_stdin, name="stdin", daemon=True).start()
+
+    def _on_signal(self, signum, frame):
+        self.stop.set()
+
+    def _read_stdin(self):
+        for line in sys.stdin:
+            command = self.commands.get(line.strip().lower()[:1])
+            if command is not None:
+                command()
+            if self.stop.is_set():
+                break
+
+    @property
+    def requested(self):
+        return self.stop.is_set()
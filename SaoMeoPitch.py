@@ -0,0 +1,88 @@
+import numpy as np
+
+"""
+    Shared pitch model: integer note IDs and computed frequency tables.
+
+    A note is its MIDI number (C4 = 60, A4 = 69, equal temperament at
+    A4 = 440 Hz). The engines key their voices and events by note ID and
+    read the frequency from FREQS when a voice starts, so no two
+    hand-typed Hz tables can disagree: 'C3b' and 'B2' are both note 47.
+
+    Names are spelt as in the scores and gestures: letter, octave, then
+    'b' for flat ('E4b', 'C3b'); '#' for sharp is also understood.
+    'Rest' is REST, which never sounds.
+"""
+
+NUM_NOTES = 128
+A4 = 69
+A4_FREQ = 440.0
+REST = -1
+
+LETTERS = 'CDEFGAB'
+SEMITONES = (0, 2, 4, 5, 7, 9, 11)
+
+FREQS = A4_FREQ * 2.0 ** ((np.arange(NUM_NOTES) - A4) / 12.0)
+
+def _name(note):
+    # Naturals as 'C4', the rest as the flat of the next letter ('D4b')
+    octave, semitone = divmod(note, 12)
+    if semitone in SEMITONES:
+        return f"{LETTERS[SEMITONES.index(semitone)]}{octave - 1}"
+    return f"{LETTERS[SEMITONES.index(semitone + 1)]}{octave - 1}b"
+
+NAMES = tuple(_name(note) for note in range(NUM_NOTES))
+
+def _build_notes():
+    # Every natural / flat / sharp spelling in range -> note ID
+    table = {'Rest': REST}
+    for octave in range(-1, 10):
+        for letter, semitone in zip(LETTERS, SEMITONES):
+            note = 12 * (octave + 1) + semitone
+            for suffix, shift in (('', 0), ('b', -1), ('#', 1)):
+                if 0 <= note + shift < NUM_NOTES:
+                    table[f"{letter}{octave}{suffix}"] = note + shift
+    return table
+
+notes = _build_notes()
+
+def nearest_note(freq):
+    return int(round(A4 + 12 * np.log2(freq / A4_FREQ)))
+
+def to_notes(entry):
+    """
+    Score entry -> list of note IDs. An entry is a note name, a note ID
+    (int), a frequency in Hz (float, rounded to the nearest note), or a
+    list of those. Rests and unknown names are dropped.
+    """
+    if isinstance(entry, (str, int, float, np.integer)):
+        entry = [entry]
+    ids = []
+    for n in entry:
+        if isinstance(n, str):
+            note = notes.get(n, REST)
+        elif isinstance(n, (int, np.integer)):
+            note = int(n)
+        else:
+            note = nearest_note(n) if n > 0 else REST
+        if 0 <= note < NUM_NOTES:
+            ids.append(note)
+    return ids
+
+def note_ids(entries):
+    """
+    Held notes from the control thread -> set of note IDs. Like
+    to_notes() (names, Hz floats as update_notes took them before note
+    IDs), but an integer outside 0..127 raises ValueError instead of
+    being dropped: it would otherwise decode as another bus's key.
+    """
+    ids = set()
+    for entry in entries:
+        if isinstance(entry, (bool, np.bool_)):
+            raise ValueError(f"Not a note: {entry!r}")
+        if isinstance(entry, (int, np.integer)):
+            if not 0 <= entry < NUM_NOTES:
+                raise ValueError(f"Note ID {entry} outside 0..{NUM_NOTES - 1}")
+            ids.add(int(entry))
+        else:
+            ids.update(to_notes(entry))
+    return ids
@@ -0,0 +1,264 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import pyaudio
+import time
+from SaoMeoEngine import SaoMeoEngine
+from SaoMeoEvents import EventRing
+from SaoMeoStats import XRUN_MASK
+
+"""
+    Run SaoMeoEngine / SaoMeoMixer in a dedicated child process.
+
+    In main.py the camera, MediaPipe, drawing and imshow share one
+    interpreter with the PyAudio callback, and every NumPy call in the
+    callback has to win the GIL back from them. A busy vision frame then
+    turns into an audio dropout. EngineProcess moves the engine (and its
+    PyAudio stream) into a child process with its own GIL:
+
+        engine = EngineProcess(SaoMeoEngine)
+        engine.update_notes([60, 64])      # note IDs: C4, E4
+        ...
+        engine.close()
+
+    One multiprocessing.shared_memory segment holds two lock-free SPSC
+    rings (SaoMeoEvents.EventRing):
+    - control: parent -> child note events. The parent keeps a local
+      control_only instance of the engine class (buses and held notes,
+      no voices, wavetables or reverb) whose events ring is the shared
+      one, so the CONTROL_METHODS (update_notes, apply_step, set_bus,
+      ...) run their usual diffing here and only push events. The
+      child's callback drains them exactly as in the single-process
+      engine. Anything else (sequencer, recording, timbre, ...) would
+      only change the local copy, so reading or setting it on the proxy
+      raises AttributeError.
+    - output: child -> parent telemetry, one BLOCK record per callback
+      (load, active voices) plus XRUN records, a BUFFER record whenever
+      the block size changes (latency='adaptive'), a STOLEN record
+      whenever the polyphony cap steals voices and a RECORD_DROP record
+      whenever the session recorder (record=path) drops a block. poll()
+      drains it.
+
+    Neither side ever blocks on the other; a full ring drops (and counts)
+    instead of waiting.
+
+    device=False replaces the PyAudio stream with pace_callback(), which
+    pulls blocks on the wall clock and flags late ones as underflows, so
+    the isolation can be measured without a sound card
+    (benchmarks/process_isolation.py).
+"""
+
+BLOCK = 16      # key = callback load (render time / block time), value = active voices
+XRUN = 17       # key = PortAudio status flags
+BUFFER = 18     # key = frames per callback
+STOLEN = 19     # key = voices stolen so far
+RECORD_DROP = 20    # key = blocks the session recorder dropped so far
+
+# Engine methods that only push control events, forwarded to the child
+CONTROL_METHODS = frozenset((
+    'update_notes', 'apply_step', 'set_bus', 'set_melody', 'set_chords',
+    'set_bus_gain', 'set_bus_pan', 'set_pitch_bend', 'set_vibrato',
+))
+
+def pace_callback(callback, frames, sample_rate, stop):
+    """
+    Device-free stand-in for the PyAudio stream: call
+    callback(None, frames, None, status) once per block period until
+    `stop` is set. A block that is not ready before the previous one has
+    finished playing is reported as paOutputUnderflow on the next call,
+    and the clock restarts, as a real device would.
+    """
+    period = frames / sample_rate
+    status = 0
+    deadline = time.perf_counter() + period
+    while not stop.is_set():
+        callback(None, frames, None, status)
+        now = time.perf_counter()
+        status = 0
+        if now > deadline:
+            status = pyaudio.paOutputUnderflow
+            deadline = now
+        delay = deadline - now
+        if delay > 0:
+            time.sleep(delay)
+        deadline += period
+
+def _rings(buffer, capacity):
+    # Shared segment layout: [control ring][output ring]
+    size = EventRing.nbytes(capacity)
+    control = EventRing(capacity, buffer=buffer[:size])
+    output = EventRing(capacity, buffer=buffer[size:2 * size])
+    return control, output
+
+def _serve(engine_cls, engine_kwargs, buffer, capacity, device, record, ready, stop):
+    control, output = _rings(buffer, capacity)
+    engine = engine_cls(start_stream=False, **engine_kwargs)
+    engine.events = control
+    if record is not None:
+        # Recorded here, where the audio is rendered
+        engine.start_recording(record)
+
+    frames = [0]
+    stolen = [0]
+    dropped = [0]
+
+    def callback(in_data, frame_count, time_info, status):
+        start = time.perf_counter()
+        result = engine.callback(in_data, frame_count, time_info, status)
+        load = (time.perf_counter() - start) * engine.sample_rate / frame_count
+        if status & XRUN_MASK:
+            output.push(XRUN, status, 0.0, start)
+        if frame_count != frames[0]:
+            frames[0] = frame_count
+            output.push(BUFFER, frame_count, 0.0, start)
+        if engine.stolen_voices != stolen[0]:
+            stolen[0] = engine.stolen_voices
+            output.push(STOLEN, stolen[0], 0.0, start)
+        recorder = engine.recorder
+        if recorder is not None and recorder.dropped_blocks != dropped[0]:
+            dropped[0] = recorder.dropped_blocks
+            output.push(RECORD_DROP, dropped[0], 0.0, start)
+        output.push(BLOCK, load, engine.num_voices, start)
+        return result
+
+    try:
+        if device:
+            engine.open_stream(callback)
+            ready.set()
+            stop.wait()
+        else:
+            ready.set()
+            pace_callback(callback, engine.frames_per_buffer, engine.sample_rate, stop)
+    finally:
+        engine.close()
+
+def _engine_main(engine_cls, engine_kwargs, shm_name, capacity, device, record, ready, stop):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        _serve(engine_cls, engine_kwargs, shm.buf, capacity, device, record, ready, stop)
+    finally:
+        # The parent owns (and unlinks) the segment
+        shm.close()
+
+class EngineProcess:
+    __slots__ = ('engine_cls', 'capacity', 'shm', 'output', 'controller', 'blocks', 'xruns', 'load_sum',
+                 'load_max', 'active_voices', 'frames_per_buffer', 'stolen_voices', 'recorder_dropped',
+                 '_ready', '_stop', 'process')
+
+    def __init__(self, engine_cls=SaoMeoEngine, capacity=4096, device=True, timeout=10.0, record=None,
+                 **engine_kwargs):
+        self.engine_cls = engine_cls
+        self.capacity = capacity
+
+        # Local, device-free control side: its CONTROL_METHODS push into
+        # the shared ring. Built first, so bad engine arguments raise
+        # before there is a segment to leak.
+        self.controller = engine_cls(start_stream=False, control_only=True, **engine_kwargs)
+        self.process = None
+        self.output = None
+
+        self.blocks = 0
+        self.xruns = 0
+        self.load_sum = 0.0
+        self.load_max = 0.0
+        self.active_voices = 0
+        self.frames_per_buffer = 0
+        self.stolen_voices = 0
+        self.recorder_dropped = 0
+
+        self.shm = shared_memory.SharedMemory(create=True, size=2 * EventRing.nbytes(capacity))
+        try:
+            np.ndarray(self.shm.size, dtype=np.uint8, buffer=self.shm.buf).fill(0)
+            self.controller.events, self.output = _rings(self.shm.buf, capacity)
+
+            # spawn: a fresh interpreter, never a fork of a process that may
+            # already run camera / MediaPipe threads
+            ctx = multiprocessing.get_context('spawn')
+            self._ready = ctx.Event()
+            self._stop = ctx.Event()
+            self.process = ctx.Process(
+                target = _engine_main,
+                args = (engine_cls, engine_kwargs, self.shm.name, capacity, device, record, self._ready, self._stop),
+                name = "SaoMeoEngine",
+                daemon = True,
+            )
+            self.process.start()
+
+            started = time.perf_counter()
+            while not self._ready.wait(0.05):
+                if not self.process.is_alive() or time.perf_counter() - started > timeout:
+                    raise RuntimeError(f"{engine_cls.__name__} process failed to start")
+        except BaseException:
+            # Stop the child if there is one, close and unlink the segment
+            self.close()
+            raise
+
+    def __getattr__(self, name):
+        # Only reached for names that are not the proxy's own
+        if name in CONTROL_METHODS:
+            return getattr(self.controller, name)
+        raise AttributeError(f"EngineProcess has no {name!r}: only {', '.join(sorted(CONTROL_METHODS))} "
+                             f"reach the engine in the child process")
+
+    def __setattr__(self, name, value):
+        # e.g. proxy.sequencer = ... would never reach the child
+        if name not in EngineProcess.__slots__:
+            raise AttributeError(f"EngineProcess.{name} cannot be set: the engine runs in the child process")
+        object.__setattr__(self, name, value)
+
+    def update_notes(self, active_notes):
+        self.controller.update_notes(active_notes)
+
+    def apply_step(self, *args):
+        self.controller.apply_step(*args)
+
+    def _apply_telemetry(self, kind, key, value, timestamp):
+        if kind == BLOCK:
+            self.blocks += 1
+            self.load_sum += key
+            self.load_max = max(self.load_max, key)
+            self.active_voices = int(value)
+        elif kind == XRUN:
+            self.xruns += 1
+        elif kind == BUFFER:
+            self.frames_per_buffer = int(key)
+        elif kind == STOLEN:
+            self.stolen_voices = int(key)
+        elif kind == RECORD_DROP:
+            self.recorder_dropped = int(key)
+
+    def poll(self):
+        # Drain the child's telemetry; call from the control thread
+        if self.output is not None:
+            self.output.drain(self._apply_telemetry)
+        return {
+            'blocks': self.blocks,
+            'xruns': self.xruns,
+            'load_mean': self.load_sum / self.blocks if self.blocks else 0.0,
+            'load_max': self.load_max,
+            'active_voices': self.active_voices,
+            'stolen_voices': self.stolen_voices,
+            'recorder_dropped': self.recorder_dropped,
+            'buffer_ms': 1000 * self.frames_per_buffer / self.controller.sample_rate,
+            'dropped_events': self.controller.events.dropped,
+        }
+
+    def close(self):
+        if self.process is not None:
+            self._stop.set()
+            if self.process.pid is not None:
+                self.process.join(2.0)
+                if self.process.is_alive():
+                    self.process.terminate()
+                    self.process.join()
+            self.process = None
+        if self.shm is not None:
+            self.poll()
+            # Views into the segment must go before it can be closed
+            events = EventRing(self.capacity)
+            events.dropped = self.controller.events.dropped
+            self.controller.events = events
+            self.output = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
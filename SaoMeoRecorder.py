@@ -0,0 +1,231 @@
+import json
+import threading
+import wave
+import numpy as np
+from SaoMeoEvents import EventRing, NOTE_ON, NOTE_OFF, GAIN, BUS_GAIN, BUS_PAN, PITCH_BEND, VIBRATO
+
+"""
+    Session recorder: the engine's master output (and optionally its note
+    events) to disk, without any file I/O on the audio thread.
+
+        recorder = engine.start_recording("session.wav")
+        ...
+        engine.stop_recording()
+
+    The callback only copies each finished block into a preallocated
+    ring (at most two slice copies, whatever the block size) and moves a
+    counter; a writer thread wakes every poll_interval seconds and
+    streams what is there to the sink. If the writer falls so far behind
+    that a block does not fit, the block is dropped and counted
+    (dropped_blocks / dropped_frames) instead of waiting. The writer
+    fills the gap with silence, so the file keeps the session's timing
+    and the event log stays aligned with it.
+
+    Sinks, chosen by the file name:
+    - '.wav': 16-bit PCM through the wave module (the 4 GB WAV limit is
+      about 6 hours of 48 kHz stereo)
+    - anything else: raw float32 frames in a memory-mapped file that
+      grows a minute at a time, plus a '<path>.json' sidecar with rate
+      and channels; read_raw() maps it back. Suited to multi-hour runs.
+
+    With events=True every note event the callback applies (live or
+    sequencer) is pushed to a second ring with its sample position in
+    the recording, and written to '<path>.events.csv':
+        frame,event,key,value
+"""
+
+EVENT_NAMES = {NOTE_ON: 'note_on', NOTE_OFF: 'note_off', GAIN: 'gain', BUS_GAIN: 'bus_gain', BUS_PAN: 'bus_pan',
+               PITCH_BEND: 'pitch_bend', VIBRATO: 'vibrato'}
+
+class _WavSink:
+    def __init__(self, path, sample_rate, channels):
+        self.file = wave.open(path, 'wb')
+        self.file.setnchannels(channels)
+        self.file.setsampwidth(2)
+        self.file.setframerate(sample_rate)
+
+    def write(self, frames):
+        self.file.writeframes(np.round(np.clip(frames, -1.0, 1.0) * 32767).astype('<i2').tobytes())
+
+    def close(self):
+        self.file.close()
+
+class _RawSink:
+    def __init__(self, path, sample_rate, channels, grow_seconds=60.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.grow_frames = int(grow_seconds * sample_rate)
+        self.file = open(path, 'w+b')
+        self.map = None
+        self.capacity = 0
+        self.frames = 0
+
+    def _grow(self, needed):
+        if self.map is not None:
+            self.map.flush()
+            self.map = None
+        self.capacity = max(needed, self.capacity + self.grow_frames)
+        self.file.truncate(self.capacity * self.channels * 4)
+        self.map = np.memmap(self.file, dtype=np.float32, mode='r+', shape=(self.capacity, self.channels))
+
+    def write(self, frames):
+        count = len(frames)
+        if self.frames + count > self.capacity:
+            self._grow(self.frames + count)
+        self.map[self.frames:self.frames + count] = frames.reshape(count, self.channels)
+        self.frames += count
+
+    def close(self):
+        if self.map is not None:
+            self.map.flush()
+            self.map = None
+        self.file.truncate(self.frames * self.channels * 4)
+        self.file.close()
+        with open(self.path + '.json', 'w') as f:
+            json.dump({'sample_rate': self.sample_rate, 'channels': self.channels,
+                       'frames': self.frames, 'dtype': 'float32'}, f)
+
+def read_raw(path):
+    # (frames, channels) float32 memmap of a raw recording, and its rate
+    with open(path + '.json') as f:
+        info = json.load(f)
+    frames = np.memmap(path, dtype=np.float32, mode='r', shape=(info['frames'], info['channels']))
+    return frames, info['sample_rate']
+
+class SessionRecorder:
+    def __init__(self, path, sample_rate=48000, channels=2, seconds=2.0, events=True,
+                 event_capacity=4096, poll_interval=0.05):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.poll_interval = poll_interval
+        if path.lower().endswith('.wav'):
+            self.sink = _WavSink(path, sample_rate, channels)
+        else:
+            self.sink = _RawSink(path, sample_rate, channels)
+
+        # Audio ring: power-of-two frames, indexed by free-running counters
+        capacity = 1 << max(0, int(np.ceil(np.log2(max(1, seconds * sample_rate)))))
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.ring = np.zeros((capacity, channels) if channels > 1 else capacity, dtype=np.float32)
+        self.write_pos = 0      # frames stored (audio thread)
+        self.read_pos = 0       # frames written out (writer thread)
+
+        # Audio-thread clock: frames recorded + dropped; event positions
+        # and gaps are on this timeline
+        self.clock = 0
+        self.dropped_blocks = 0
+        self.dropped_frames = 0
+        # Runs of dropped blocks: (recorded position, frames) for the
+        # writer, pushed once recording resumes; _gap is the current run
+        self._gaps = EventRing(256)
+        self._pending_gaps = []
+        self._gap = 0
+
+        self.events = EventRing(event_capacity) if events else None
+        self._events_file = open(path + '.events.csv', 'w') if events else None
+        if self._events_file is not None:
+            self._events_file.write("frame,event,key,value\n")
+
+        self.frames_written = 0
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._run, name="SaoMeoRecorder", daemon=True)
+        self._writer.start()
+
+    # --- audio thread: constant time, never blocks ---
+
+    def record(self, block):
+        count = len(block)
+        write = self.write_pos
+        if write + count - self.read_pos > self.capacity:
+            self.dropped_blocks += 1
+            self.dropped_frames += count
+            self.clock += count
+            self._gap += count
+            return False
+        if self._gap:
+            # If even the gap ring is full, _gaps.dropped counts it and
+            # the file ends up that much short
+            self._gaps.push(0, self._gap, 0.0, write)
+            self._gap = 0
+        start = write & self.mask
+        first = min(count, self.capacity - start)
+        self.ring[start:start + first] = block[:first]
+        if first < count:
+            self.ring[:count - first] = block[first:]
+        self.write_pos = write + count
+        self.clock += count
+        return True
+
+    def log_event(self, kind, key, value, offset=0):
+        # offset: frames into the block being rendered
+        if self.events is not None:
+            self.events.push(kind, key, value, self.clock + offset)
+
+    # --- writer thread ---
+
+    def _queue_gap(self, kind, key, value, timestamp):
+        self._pending_gaps.append((int(timestamp), int(key)))
+
+    def _write_event(self, kind, key, value, timestamp):
+        name = EVENT_NAMES.get(kind, str(kind))
+        self._events_file.write(f"{int(timestamp)},{name},{key:g},{value:g}\n")
+
+    def _write_gaps(self, pos):
+        # Silence for the blocks dropped before recorded position `pos`
+        while self._pending_gaps and self._pending_gaps[0][0] <= pos:
+            _, count = self._pending_gaps.pop(0)
+            self.sink.write(np.zeros((count, self.channels), dtype=np.float32))
+            self.frames_written += count
+
+    def _flush(self):
+        # write_pos first: every gap before it has been pushed by then
+        end = self.write_pos
+        self._gaps.drain(self._queue_gap)
+        pos = self.read_pos
+        while pos < end:
+            self._write_gaps(pos)
+            stop = end
+            if self._pending_gaps:
+                stop = min(stop, self._pending_gaps[0][0])
+            start = pos & self.mask
+            stop = min(stop, pos + self.capacity - start)
+            self.sink.write(self.ring[start:start + stop - pos])
+            self.frames_written += stop - pos
+            pos = stop
+            # Frees the space for the audio thread
+            self.read_pos = pos
+        if self.events is not None:
+            self.events.drain(self._write_event)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            self._flush()
+        self._flush()
+        # Audio has stopped by now (see close): blocks dropped at the very
+        # end are still only in _gap
+        self._write_gaps(self.write_pos)
+        if self._gap:
+            self._pending_gaps.append((self.write_pos, self._gap))
+            self._write_gaps(self.write_pos)
+
+    def close(self):
+        # Call once record() can no longer run (see SaoMeoEngine.stop_recording)
+        if self._writer is not None:
+            self._stop.set()
+            self._writer.join()
+            self._writer = None
+            self.sink.close()
+            if self._events_file is not None:
+                self._events_file.close()
+
+    def stats(self):
+        return {
+            'frames_written': self.frames_written,
+            'dropped_blocks': self.dropped_blocks,
+            'dropped_frames': self.dropped_frames,
+            'dropped_events': self.events.dropped if self.events is not None else 0,
+            'lost_gaps': self._gaps.dropped,
+        }
@@ -0,0 +1,109 @@
+import numpy as np
+import time
+import wave
+from multiprocessing import Pool
+from SaoMeoEngine import SaoMeoEngine
+from SaoMeoPitch import to_notes
+
+"""
+    Offline (device-free) renderer for SaoMeoEngine / SaoMeoMixer.
+
+    The live engines are driven by a PyAudio stream that pulls one block
+    every ~21 ms, and the demos step through the score with time.sleep().
+    Here the engine is created with start_stream=False and callback() is
+    called directly, as fast as the CPU allows.
+
+    Score format (same shape as the demo lists):
+        SaoMeoEngine: [(notes, duration), ...]                e.g. melody
+        SaoMeoMixer:  [(melody_notes, chord_notes, duration), ...]  e.g. song_data
+
+    A "notes" entry may be a single note name ('C4'), a list of names, or
+    note IDs / frequencies (see SaoMeoPitch.to_notes). 'Rest' / unknown
+    names are silence.
+
+    Event boundaries are placed at exact sample offsets: a block is cut
+    short wherever a score step starts, so the output does not depend on
+    the buffer size the live stream happens to use.
+"""
+
+def render(score, engine_cls=SaoMeoEngine, block_size=1024, tail=1.0, engine=None):
+    if engine is None:
+        engine = engine_cls(start_stream=False)
+    sr = engine.sample_rate
+
+    # Absolute sample position of every step boundary (no drift from rounding)
+    boundaries = []
+    t = 0.0
+    for step in score:
+        t += step[-1]
+        boundaries.append(int(round(t * sr)))
+    total = (boundaries[-1] if boundaries else 0) + int(round(tail * sr))
+
+    # (samples, channels) for a stereo engine, (samples,) for a mono one
+    output = np.zeros((total, engine.channels) if engine.channels > 1 else total, dtype=np.float32)
+    pos = 0
+
+    def pull(end):
+        nonlocal pos
+        while pos < end:
+            n = min(block_size, end - pos)
+            block, _ = engine.callback(None, n, None, 0)
+            output[pos:pos + n] = block
+            pos += n
+
+    for step, end in zip(score, boundaries):
+        engine.apply_step(*[to_notes(part) for part in step[:-1]])
+        pull(end)
+
+    # Let the last notes release
+    parts = len(score[0]) - 1 if score else 1
+    engine.apply_step(*[[] for _ in range(parts)])
+    pull(total)
+    return output
+
+def write_wav(path, signal, sample_rate):
+    # sample_rate: the rendering engine's (engine.sample_rate)
+    pcm = (np.clip(signal, -1.0, 1.0) * 32767).astype('<i2')
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(pcm.shape[1] if pcm.ndim == 2 else 1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+
+def _render_job(job):
+    score, engine_cls, block_size, tail, path = job
+    engine = engine_cls(start_stream=False)
+    signal = render(score, block_size=block_size, tail=tail, engine=engine)
+    if path is None:
+        return signal
+    write_wav(path, signal, engine.sample_rate)
+    return path
+
+def render_batch(scores, engine_cls=SaoMeoEngine, paths=None, block_size=1024, tail=1.0, processes=None):
+    """
+    Render many scores on a process pool. Returns the rendered arrays, or
+    the written paths when `paths` is given (avoids shipping audio back
+    through the pool's pipe).
+    """
+    if paths is None:
+        paths = [None] * len(scores)
+    jobs = [(score, engine_cls, block_size, tail, path) for score, path in zip(scores, paths)]
+    with Pool(processes) as pool:
+        return pool.map(_render_job, jobs)
+
+if __name__ == "__main__":
+    import sys
+    from SaoMeoEngine import melody
+    from SaoMeoMixer import SaoMeoMixer, song_data
+
+    out_dir = sys.argv[1] if len(sys.argv) > 1 else "."
+
+    for name, score, cls in (("melody", melody, SaoMeoEngine), ("song", song_data, SaoMeoMixer)):
+        engine = cls(start_stream=False)
+        start = time.perf_counter()
+        signal = render(score, engine=engine)
+        elapsed = time.perf_counter() - start
+        path = f"{out_dir}/{name}.wav"
+        write_wav(path, signal, engine.sample_rate)
+        duration = len(signal) / engine.sample_rate
+        print(f"{path}: {duration:.1f} s of audio in {elapsed:.2f} s ({duration / elapsed:.1f}x real time)")
@@ -0,0 +1,206 @@
+import numpy as np
+import time
+from SaoMeoEvents import EventRing, NOTE_ON, NOTE_OFF, GAIN, bus_key
+from SaoMeoPitch import to_notes
+
+"""
+    Sample-accurate score playback inside the audio callback.
+
+    The demo players step through a score with time.sleep(duration) on the
+    main thread, so every note lands somewhere in the next ~21 ms block,
+    plus scheduler jitter. A Sequencer is attached to an engine instead:
+
+        seq = Sequencer(song_data, tempo=90, loop=True)
+        mixer.sequencer = seq
+        seq.play()
+
+    and the callback asks it, block by block, how many frames may be
+    rendered before the next score step. The block is cut there and the
+    step's notes are switched on/off before the rest is rendered, so
+    every step starts on its exact sample whatever the buffer size.
+
+    Score format is the demo one, durations in beats:
+        [(notes, beats), ...]                       one part (SaoMeoEngine)
+        [(melody_notes, chord_notes, beats), ...]   SaoMeoMixer layout
+    Part i plays on the engine bus buses[i] (name or index; default bus
+    i, or the last bus the engine has) at gains[i] (default 1.0; the bus
+    gain applies on top). The mapping is resolved once, on the control
+    thread, when the sequencer is attached (engine.sequencer = seq calls
+    prepare(engine)): an unknown bus, or fewer buses than the score has
+    parts, raises ValueError there instead of in every callback. Notes are names, lists of names, or note IDs
+    (see SaoMeoPitch.to_notes).
+
+    Sequencer voices use their own keys ('seq', bus_key(bus, note)), so
+    the live update_notes / set_bus calls never cut a backing note and
+    vice versa.
+
+    play / stop / seek / set_tempo / set_loop can be called from any
+    single control thread: they only push commands into an EventRing the
+    audio thread drains, as for note events.
+
+    Timing is kept as an anchor (beat, sample) plus a sample counter;
+    step boundaries are rounded from the anchor, so there is no drift,
+    and a tempo change only moves the anchor.
+"""
+
+PLAY = 1        # key unused
+STOP = 2
+SEEK = 3        # key = beat
+TEMPO = 4       # key = beats per minute
+LOOP = 5        # key = 1.0 / 0.0
+
+class Sequencer:
+    def __init__(self, score, tempo=60.0, loop=False, gains=(), buses=None):
+        self.steps = []
+        for step in score:
+            parts = [to_notes(part) for part in step[:-1]]
+            self.steps.append(parts)
+        beats = np.array([step[-1] for step in score], dtype=np.float64)
+        self.starts = np.concatenate(([0.0], np.cumsum(beats)))
+        self.length = float(self.starts[-1])
+        self.gains = tuple(gains)
+        self.buses = tuple(buses) if buses else None
+
+        self.commands = EventRing(256)
+
+        # Audio-thread state
+        self.tempo = float(tempo)
+        self.loop = loop
+        self.playing = False
+        self.anchor_beat = 0.0
+        self.position = 0       # samples since the anchor
+        self.step = 0           # next step to apply
+        self.active = {}        # key -> gain of sounding sequencer voices
+        self._engine = None     # engine of the current advance() call
+        self.part_buses = ()    # part -> bus index, from prepare()
+        self._prepared = None   # engine part_buses is for
+
+    def duration(self):
+        # Seconds for one pass at the starting tempo
+        return self.length * 60.0 / self.tempo
+
+    # --- control thread ---
+
+    def play(self):
+        self.commands.push(PLAY, 0.0)
+
+    def stop(self):
+        self.commands.push(STOP, 0.0)
+
+    def seek(self, beat):
+        self.commands.push(SEEK, beat)
+
+    def set_tempo(self, bpm):
+        self.commands.push(TEMPO, bpm)
+
+    def set_loop(self, loop):
+        self.commands.push(LOOP, 1.0 if loop else 0.0)
+
+    def prepare(self, engine):
+        # Part -> bus index for this engine, checked here rather than on
+        # the audio thread (the engine's sequencer setter calls it)
+        parts = max((len(step) for step in self.steps), default=0)
+        if self.buses is None:
+            self.part_buses = tuple(min(index, len(engine.buses) - 1) for index in range(parts))
+        else:
+            if parts > len(self.buses):
+                raise ValueError(f"The score has {parts} parts but only {len(self.buses)} buses are given")
+            self.part_buses = tuple(engine.bus_index(bus) for bus in self.buses)
+        self._prepared = engine
+
+    # --- audio thread ---
+
+    def beat(self, sample_rate):
+        return self.anchor_beat + self.position * self.tempo / (60.0 * sample_rate)
+
+    def _boundary(self, beat, sample_rate):
+        # Sample offset (from the anchor) at which `beat` starts
+        return int(round((beat - self.anchor_beat) * 60.0 * sample_rate / self.tempo))
+
+    def _reanchor(self, beat):
+        self.anchor_beat = beat
+        self.position = 0
+
+    def _set_notes(self, engine, parts):
+        gains = {}
+        part_gains = self.gains + (1.0,) * len(parts)
+        part_buses = self.part_buses
+        for index in reversed(range(len(parts))):
+            bus = part_buses[index]
+            gains.update((('seq', bus_key(bus, note)), part_gains[index]) for note in parts[index])
+
+        now = time.perf_counter()
+        for key in self.active.keys() - gains.keys():
+            engine._apply_event_unsafe(NOTE_OFF, key, 0.0, now)
+        for key, gain in gains.items():
+            old_gain = self.active.get(key)
+            if old_gain is None:
+                engine._apply_event_unsafe(NOTE_ON, key, gain, now, code=key[1])
+            elif old_gain != gain:
+                engine._apply_event_unsafe(GAIN, key, gain, now)
+        self.active = gains
+
+    def _apply_command(self, kind, key, value, timestamp):
+        engine = self._engine
+        sample_rate = engine.sample_rate
+        if kind == PLAY:
+            if not self.playing and self.step >= len(self.steps):
+                self._seek(0.0)
+            self.playing = True
+        elif kind == STOP:
+            self.playing = False
+            self._set_notes(engine, [])
+        elif kind == SEEK:
+            self._seek(key % self.length if self.length else 0.0)
+        elif kind == TEMPO:
+            self._reanchor(self.beat(sample_rate))
+            self.tempo = float(key)
+        elif kind == LOOP:
+            self.loop = bool(key)
+
+    def _seek(self, beat):
+        self._reanchor(beat)
+        # The step sounding at `beat` is due right away
+        self.step = max(0, int(np.searchsorted(self.starts, beat, side='right')) - 1)
+
+    def advance(self, engine, max_frames):
+        """
+        Called by the engine callback. Applies every step due at the
+        current sample, then returns how many frames (1..max_frames) can
+        be rendered before the next one, and moves the clock that far.
+        """
+        if self._prepared is not engine:
+            # Not prepared for this engine (see prepare()): play nothing
+            return max_frames
+        self._engine = engine
+        self.commands.drain(self._apply_command)
+
+        if not self.playing:
+            return max_frames
+
+        sample_rate = engine.sample_rate
+        while True:
+            if self.step < len(self.steps):
+                boundary = self._boundary(self.starts[self.step], sample_rate)
+                if boundary > self.position:
+                    break
+                self._set_notes(engine, self.steps[self.step])
+                self.step += 1
+                continue
+
+            # End of the score
+            boundary = self._boundary(self.length, sample_rate)
+            if boundary > self.position:
+                break
+            if self.loop and self.length > 0:
+                # Same clock, one score length earlier: step 0 lands exactly here
+                self.anchor_beat -= self.length
+                self.step = 0
+            else:
+                self._set_notes(engine, [])
+                self.playing = False
+                return max_frames
+
+        frames = min(max_frames, boundary - self.position)
+        self.position += frames
+        return frames
@@ -0,0 +1,64 @@
+import threading
+import time
+
+"""
+    Parallel start-up for main.py.
+
+    Opening the webcam, importing / initialising MediaPipe and starting
+    PyAudio each take from a few hundred ms to seconds (more in the
+    PyInstaller build, which unpacks and imports everything first), and
+    main.py used to do them one after the other. Most of that time is
+    spent in C code that releases the GIL (device drivers, model
+    loading), so running them on threads overlaps it:
+
+        timer = StartupTimer(START)
+        audio = BackgroundTask('audio', open_audio, timer)
+        camera = BackgroundTask('camera', open_camera, timer)
+        model = BackgroundTask('model', load_model, timer)
+        engine = audio.result()     # re-raises anything open_audio raised
+        ...
+        timer.mark('first_frame')
+
+    StartupTimer keeps the first time each milestone is reached, in
+    seconds since START (taken at the top of main.py, before the heavy
+    imports): when each task finished, time-to-first-sound (first audio
+    callback) and time-to-first-frame (first frame on screen).
+"""
+
+class StartupTimer:
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.marks = {}
+
+    def mark(self, name):
+        # Only the first time counts; later calls are cheap no-ops
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.start
+
+    def summary(self):
+        return "startup: " + ", ".join(f"{name} {seconds:.2f} s" for name, seconds in self.marks.items())
+
+class BackgroundTask(threading.Thread):
+    def __init__(self, name, target, timer=None):
+        super().__init__(name=f"startup-{name}", daemon=True)
+        self.task = name
+        self.target = target
+        self.timer = timer
+        self.value = None
+        self.error = None
+        self.start()
+
+    def run(self):
+        try:
+            self.value = self.target()
+        except BaseException as error:
+            self.error = error
+        finally:
+            if self.timer is not None:
+                self.timer.mark(self.task)
+
+    def result(self):
+        self.join()
+        if self.error is not None:
+            raise self.error
+        return self.value
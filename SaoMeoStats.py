@@ -0,0 +1,142 @@
+import numpy as np
+import pyaudio
+import time
+
+"""
+    Opt-in real-time instrumentation for the SaoMeoEngine callback.
+
+    engine.enable_stats() attaches a CallbackStats; the callback then
+    reports into it:
+
+    - render time of every block as a fraction of the buffer period
+      (frame_count / sample_rate), kept as a fixed-bin histogram
+    - deadline misses (load >= 1.0) and PortAudio status flags (xruns)
+    - time spent per DSP stage: events, envelope, oscillator, modulation,
+      reverb (SaoMeoReverb, when enabled), master (gain + tanh)
+
+    Recording is allocation-free (preallocated counters only). snapshot()
+    may be called from any thread; it copies the counters into a plain
+    dict, and a block finishing concurrently can make it off by one.
+
+    When stats are disabled the callback only pays a few `is None` checks.
+"""
+
+STAGES = ('events', 'envelope', 'oscillator', 'modulation', 'reverb', 'master')
+STAGE_EVENTS, STAGE_ENVELOPE, STAGE_OSCILLATOR, STAGE_MODULATION, STAGE_REVERB, STAGE_MASTER = range(len(STAGES))
+
+STATUS_FLAGS = (
+    ('input_underflow', pyaudio.paInputUnderflow),
+    ('input_overflow', pyaudio.paInputOverflow),
+    ('output_underflow', pyaudio.paOutputUnderflow),
+    ('output_overflow', pyaudio.paOutputOverflow),
+    ('priming_output', pyaudio.paPrimingOutput),
+)
+XRUN_MASK = pyaudio.paInputUnderflow | pyaudio.paInputOverflow | pyaudio.paOutputUnderflow | pyaudio.paOutputOverflow
+
+class CallbackStats:
+    def __init__(self, sample_rate, bin_width=0.02, max_load=2.0):
+        self.sample_rate = sample_rate
+        self.bin_width = bin_width
+        # Last bin collects everything >= max_load
+        self.histogram = np.zeros(int(round(max_load / bin_width)) + 1, dtype=np.int64)
+        self.stage_total = np.zeros(len(STAGES), dtype=np.float64)
+        self.stage_max = np.zeros(len(STAGES), dtype=np.float64)
+        self.stage_block = np.zeros(len(STAGES), dtype=np.float64)
+        self.status_counts = np.zeros(len(STATUS_FLAGS), dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        self.histogram[:] = 0
+        self.stage_total[:] = 0.0
+        self.stage_max[:] = 0.0
+        self.status_counts[:] = 0
+        self.blocks = 0
+        self.xruns = 0
+        self.deadline_misses = 0
+        self.load_total = 0.0
+        self.load_max = 0.0
+        self.last_load = 0.0
+        self.frame_count = 0
+        self._block_start = 0.0
+        self._mark = 0.0
+
+    # --- audio thread ---
+
+    def begin_block(self, status):
+        now = time.perf_counter()
+        self._block_start = now
+        self._mark = now
+        self.stage_block[:] = 0.0
+        if status:
+            for i, (_, flag) in enumerate(STATUS_FLAGS):
+                if status & flag:
+                    self.status_counts[i] += 1
+            if status & XRUN_MASK:
+                self.xruns += 1
+
+    def stage(self, stage):
+        # Time since the previous mark is charged to `stage`
+        now = time.perf_counter()
+        self.stage_block[stage] += now - self._mark
+        self._mark = now
+
+    def end_block(self, frame_count):
+        elapsed = time.perf_counter() - self._block_start
+        load = elapsed * self.sample_rate / frame_count
+
+        self.blocks += 1
+        self.frame_count = frame_count
+        self.last_load = load
+        self.load_total += load
+        if load > self.load_max:
+            self.load_max = load
+        if load >= 1.0:
+            self.deadline_misses += 1
+        self.histogram[min(int(load / self.bin_width), len(self.histogram) - 1)] += 1
+
+        self.stage_total += self.stage_block
+        np.maximum(self.stage_max, self.stage_block, out=self.stage_max)
+
+    # --- any thread ---
+
+    def load_percentile(self, q):
+        # Upper edge of the histogram bin holding the q-th percentile
+        counts = self.histogram.copy()
+        total = counts.sum()
+        if total == 0:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(counts), q / 100 * total))
+        return (index + 1) * self.bin_width
+
+    def snapshot(self):
+        blocks = max(self.blocks, 1)
+        return {
+            'blocks': self.blocks,
+            'frame_count': self.frame_count,
+            'buffer_ms': 1000 * self.frame_count / self.sample_rate,
+            'load_mean': self.load_total / blocks,
+            'load_max': self.load_max,
+            'load_last': self.last_load,
+            'load_p50': self.load_percentile(50),
+            'load_p99': self.load_percentile(99),
+            'deadline_misses': self.deadline_misses,
+            'xruns': self.xruns,
+            'status': {name: int(count) for (name, _), count in zip(STATUS_FLAGS, self.status_counts)},
+            'histogram': {
+                'bin_width': self.bin_width,
+                'counts': self.histogram.tolist(),
+            },
+            'stages_ms': {
+                name: {
+                    'mean': 1000 * self.stage_total[i] / blocks,
+                    'max': 1000 * self.stage_max[i],
+                }
+                for i, name in enumerate(STAGES)
+            },
+        }
+
+    def summary(self):
+        s = self.snapshot()
+        stages = ' '.join(f"{name} {v['mean']:.2f}" for name, v in s['stages_ms'].items())
+        return (f"load mean {s['load_mean']:.0%} p99 {s['load_p99']:.0%} max {s['load_max']:.0%} | "
+                f"xruns {s['xruns']} misses {s['deadline_misses']} | ms: {stages}")
@@ -0,0 +1,113 @@
+import numpy as np
+
+"""
+    Band-limited wavetable oscillator for the Sao Meo timbres.
+
+    Instead of calling np.sin once per harmonic per voice, each timbre is
+    summed once into a single-cycle table and read back with a phase
+    accumulator + linear interpolation, so the cost per sample is the same
+    whatever the number of harmonics.
+
+    Phases are the engine's uint32 accumulators (2**32 == one cycle): the
+    top bits are the table index, the low bits the interpolation fraction.
+
+    Anti-aliasing: one table per octave ("mip level"). Level k serves
+    fundamentals in [base_freq * 2^k, base_freq * 2^(k+1)) and only contains
+    the harmonics that stay below Nyquist for the top of that range, so
+    high notes (C7 and up) never fold back.
+
+    WavetableBank stacks the tables of several timbres (one per mixer
+    bus) into one flat array, so voices of every timbre are read by the
+    same np.take.
+"""
+
+def build_table(harmonics, size):
+    cycle = np.arange(size, dtype=np.float64) * (2 * np.pi / size)
+    table = np.zeros(size + 1, dtype=np.float64)
+    for harmonic, amp in harmonics:
+        table[:size] += amp * np.sin(cycle * harmonic)
+    # Guard point so index i+1 is always valid when interpolating
+    table[size] = table[0]
+    return table.astype(np.float32)
+
+class Wavetable:
+    def __init__(self, harmonics, sample_rate=48000, size=2048, base_freq=32.70):
+        if size & (size - 1):
+            raise ValueError(f"Wavetable size must be a power of two, got {size}")
+        self.harmonics = tuple(harmonics)
+        self.sample_rate = sample_rate
+        self.size = size
+        self.base_freq = base_freq
+
+        nyquist = sample_rate / 2
+        num_levels = max(1, int(np.ceil(np.log2(nyquist / base_freq))))
+        self.tables = np.empty((num_levels, size + 1), dtype=np.float32)
+        for level in range(num_levels):
+            top_freq = base_freq * 2 ** (level + 1)
+            partials = [(h, a) for h, a in self.harmonics if h * top_freq < nyquist]
+            self.tables[level] = build_table(partials, size)
+
+        # Flat views for np.take with (level * stride + index), plus the
+        # per-sample slope so interpolation needs a single extra gather
+        self.stride = size + 1
+        self.flat = self.tables.reshape(-1)
+        slopes = np.zeros_like(self.tables)
+        slopes[:, :size] = np.diff(self.tables, axis=1)
+        self.flat_slopes = slopes.reshape(-1)
+
+        self.shift = np.uint32(32 - int(np.log2(size)))
+        self.frac_mask = np.uint32((1 << int(self.shift)) - 1)
+        self.frac_scale = np.float32(1.0 / (1 << int(self.shift)))
+
+    def level_for(self, freqs):
+        freqs = np.maximum(np.asarray(freqs, dtype=np.float64), self.base_freq)
+        levels = np.floor(np.log2(freqs / self.base_freq)).astype(np.int64)
+        return np.minimum(levels, len(self.tables) - 1)
+
+    def table_offset(self, freqs):
+        # Start of the voice's mip level inside self.flat
+        return self.level_for(freqs) * self.stride
+
+    def lookup(self, phases, offsets, out, index, frac, bits):
+        """
+        phases:  (voices, frames) uint32 accumulator values.
+        offsets: (voices,) table_offset() per voice.
+        out:     (voices, frames) float32, receives the waveform.
+        index, frac, bits: (voices, frames) int64 / float32 / uint32 scratch.
+        Everything is computed in place; nothing is allocated.
+        """
+        np.bitwise_and(phases, self.frac_mask, out=bits)
+        np.copyto(frac, bits, casting='unsafe')
+        frac *= self.frac_scale
+
+        np.right_shift(phases, self.shift, out=bits)
+        np.copyto(index, bits, casting='unsafe')
+        index += offsets[:, None]
+
+        # wave = table[i] + frac * (table[i + 1] - table[i])
+        np.take(self.flat_slopes, index, out=out, mode='clip')
+        out *= frac
+        np.take(self.flat, index, out=frac, mode='clip')
+        out += frac
+        return out
+
+class WavetableBank:
+    def __init__(self, timbres, sample_rate=48000, size=2048, base_freq=32.70):
+        self.timbres = [Wavetable(harmonics, sample_rate, size, base_freq) for harmonics in timbres]
+        first = self.timbres[0]
+        self.sample_rate = sample_rate
+        self.size = size
+        self.base_freq = base_freq
+        self.stride = first.stride
+        self.shift = first.shift
+        self.frac_mask = first.frac_mask
+        self.frac_scale = first.frac_scale
+        # Timbre t, level k starts at (t * timbre_stride + k * stride)
+        self.timbre_stride = first.tables.size
+        self.flat = np.concatenate([table.flat for table in self.timbres])
+        self.flat_slopes = np.concatenate([table.flat_slopes for table in self.timbres])
+
+    def table_offset(self, freqs, timbres=0):
+        return self.timbres[0].table_offset(freqs) + np.asarray(timbres) * self.timbre_stride
+
+    lookup = Wavetable.lookup
@@ -0,0 +1,65 @@
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SaoMeoEngine import SaoMeoEngine
+from SaoMeoMixer import SaoMeoMixer
+
+"""
+    Steady-state allocation check for the audio callback.
+
+    After a warm-up (voice bank and scratch buffers sized), every block
+    must run on the preallocated buffers:
+    - the traced heap must not grow with the number of blocks (a few
+      hundred bytes of one-off interpreter caches are tolerated), and
+    - the per-block peak above the baseline must stay below the size of
+      the smallest array the callback could allocate (one mono block).
+      Only small Python objects remain: array views, the return tuple,
+      and NumPy's per-call iterator state.
+
+    Usage: python benchmarks/alloc_check.py [voices] [blocks]
+"""
+
+FRAMES = 1024
+
+def check(engine, voices, blocks):
+    engine.apply_step([45 + i for i in range(voices)])      # chromatic from A2
+    for _ in range(20):
+        engine.callback(None, FRAMES, None, 0)
+
+    tracemalloc.start()
+    # First traced blocks fill interpreter-level caches; not steady state
+    for _ in range(5):
+        engine.callback(None, FRAMES, None, 0)
+    start, _ = tracemalloc.get_traced_memory()
+    worst_peak = 0
+    for _ in range(blocks):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        engine.callback(None, FRAMES, None, 0)
+        _, peak = tracemalloc.get_traced_memory()
+        worst_peak = max(worst_peak, peak - before)
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_block = (end - start) / blocks
+    # One float32 mono buffer of the block is FRAMES * 4 bytes
+    limit = FRAMES * 4
+    ok = per_block < 8 and worst_peak < limit
+    print(f"{type(engine).__name__:>13} {engine.oscillator:>9}: heap growth {per_block:.2f} B/block, "
+          f"worst per-block peak {worst_peak} B (limit {limit} B) -> {'OK' if ok else 'FAIL'}")
+    return ok
+
+if __name__ == "__main__":
+    voices = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    blocks = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    ok = True
+    for cls in (SaoMeoEngine, SaoMeoMixer):
+        for oscillator in ('wavetable', 'additive'):
+            engine = cls(start_stream=False, oscillator=oscillator)
+            ok &= check(engine, voices, blocks)
+            engine.close()
+    sys.exit(0 if ok else 1)
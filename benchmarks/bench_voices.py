@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SaoMeoEngine import SaoMeoEngine
+from SaoMeoMixer import SaoMeoMixer
+
+"""
+    Callback cost against polyphony.
+
+    Renders blocks through callback() with no audio device and reports the
+    mean / worst time per block, and the mean as a fraction of the block
+    deadline (frames / sample_rate, ~21 ms at 1024 frames and 48 kHz).
+
+    Usage: python benchmarks/bench_voices.py [frames_per_buffer] [blocks] [additive|wavetable]
+"""
+
+VOICE_COUNTS = [1, 2, 4, 8, 16, 32, 64]
+
+def bench(engine, voices, frame_count, blocks):
+    engine.apply_step([45 + i for i in range(voices)])      # chromatic from A2
+
+    # Run past the attack so every voice is fully sounding
+    for _ in range(10):
+        engine.callback(None, frame_count, None, 0)
+
+    times = []
+    for _ in range(blocks):
+        start = time.perf_counter()
+        engine.callback(None, frame_count, None, 0)
+        times.append(time.perf_counter() - start)
+    return sum(times) / len(times), max(times)
+
+if __name__ == "__main__":
+    frame_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    blocks = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    oscillator = sys.argv[3] if len(sys.argv) > 3 else 'wavetable'
+
+    for cls in (SaoMeoEngine, SaoMeoMixer):
+        engine = cls(start_stream=False, oscillator=oscillator, max_voices=None)
+        deadline = frame_count / engine.sample_rate
+        print(f"{cls.__name__} {oscillator} ({frame_count} frames, deadline {deadline * 1000:.1f} ms)")
+        print(f"{'voices':>6} {'mean ms':>9} {'max ms':>9} {'load':>7}")
+        for voices in VOICE_COUNTS:
+            mean, worst = bench(engine, voices, frame_count, blocks)
+            print(f"{voices:>6} {mean * 1000:>9.3f} {worst * 1000:>9.3f} {mean / deadline:>7.1%}")
+        engine.close()
@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from SaoMeoEngine import SaoMeoEngine
+from SaoMeoMixer import SaoMeoMixer
+
+"""
+    Callback cost across block sizes and voice counts, saved as JSON so
+    runs from different versions can be compared.
+
+    For every engine class x block size x voice count, callback() is
+    called with no audio device (start_stream=False) for --rounds timed
+    blocks after a warm-up past the attack, and the timings are reduced
+    the way pytest-benchmark reports them: min / max / mean / stddev /
+    median / iqr (seconds) and ops (blocks per second), plus load (median
+    over the block deadline). The JSON also records the commit, Python,
+    NumPy and machine, so results are only compared like with like.
+
+    The JSON is only written with --save PATH; a plain run just prints
+    the table.
+
+    --compare BASELINE.json flags every configuration whose fastest block
+    (min: the least disturbed by the scheduler and CPU clock changes)
+    grew by more than --threshold (default 1.25x) and by more than
+    NOISE_FLOOR, and exits non-zero if there is any.
+
+    Usage: python benchmarks/callback_cost.py [--save callback_cost.json] [--compare old.json]
+                                              [--rounds 100] [--threshold 1.25]
+"""
+
+BLOCK_SIZES = (64, 128, 256, 512, 1024, 2048)
+VOICE_COUNTS = (1, 4, 16, 64)
+ENGINES = (SaoMeoEngine, SaoMeoMixer)
+NOISE_FLOOR = 20e-6
+
+def commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def measure(engine, voices, frames, rounds):
+    engine.apply_step([45 + i for i in range(voices)])
+    for _ in range(10):
+        engine.callback(None, frames, None, 0)
+    times = np.zeros(rounds)
+    for i in range(rounds):
+        start = time.perf_counter()
+        engine.callback(None, frames, None, 0)
+        times[i] = time.perf_counter() - start
+    engine.apply_step([])
+    q1, median, q3 = np.percentile(times, (25, 50, 75))
+    return {
+        'rounds': rounds,
+        'min': float(times.min()), 'max': float(times.max()),
+        'mean': float(times.mean()), 'stddev': float(times.std()),
+        'median': float(median), 'iqr': float(q3 - q1),
+        'ops': float(1.0 / times.mean()),
+        'load': float(median * engine.sample_rate / frames),
+    }
+
+def run(rounds):
+    results = []
+    for cls in ENGINES:
+        engine = cls(start_stream=False, max_voices=None)
+        for frames in BLOCK_SIZES:
+            for voices in VOICE_COUNTS:
+                stats = measure(engine, voices, frames, rounds)
+                results.append({'name': f"{cls.__name__}[{frames}x{voices}]", 'engine': cls.__name__,
+                                'frames': frames, 'voices': voices, 'stats': stats})
+        engine.close()
+    return results
+
+def regressions(results, baseline, threshold):
+    old = {entry['name']: entry['stats'] for entry in baseline['benchmarks']}
+    found = []
+    for entry in results:
+        before = old.get(entry['name'])
+        if before is None:
+            continue
+        now, then = entry['stats']['min'], before['min']
+        if now > then * threshold and now - then > NOISE_FLOOR:
+            found.append((entry['name'], then, now))
+    return found
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="callback cost across block sizes and voice counts")
+    parser.add_argument("--save", metavar="PATH", help="write the results here as JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="results of an earlier version to compare with")
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed slowdown factor of the fastest block")
+    options = parser.parse_args()
+
+    results = run(options.rounds)
+    print(f"{'configuration':<28} {'median ms':>10} {'iqr ms':>8} {'load':>7}")
+    for entry in results:
+        s = entry['stats']
+        print(f"{entry['name']:<28} {s['median'] * 1e3:>10.3f} {s['iqr'] * 1e3:>8.3f} {s['load']:>7.1%}")
+
+    if options.save:
+        report = {
+            'commit': commit(),
+            'datetime': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'machine_info': {'python': platform.python_version(), 'numpy': np.__version__,
+                             'machine': platform.machine(), 'processor': platform.processor(),
+                             'system': platform.system()},
+            'benchmarks': results,
+        }
+        with open(options.save, 'w') as f:
+            json.dump(report, f, indent=1)
+        print(f"results written to {options.save}")
+
+    ok = True
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, options.threshold)
+        ok = not found
+        for name, then, now in found:
+            print(f"  {name}: min {then * 1e3:.3f} ms -> {now * 1e3:.3f} ms ({now / then:.2f}x)")
+        print(f"against {options.compare} (commit {baseline.get('commit')}): {len(found)} regressions "
+              f"over {options.threshold:.2f}x -> {'OK' if ok else 'FAIL'}")
+
+    sys.exit(0 if ok else 1)
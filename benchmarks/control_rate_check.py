@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SaoMeoEngine import SaoMeoEngine, melody
+from SaoMeoMixer import SaoMeoMixer, song_data
+from SaoMeoRender import render
+
+"""
+    Control-rate vs audio-rate modulation.
+
+    Renders the demo scores with modulators evaluated every sample
+    (control_period=None) and every `period` samples, then compares
+    averaged magnitude spectra (Hann-windowed 4096-point frames). The
+    spectral error is the energy of the spectrum difference relative to
+    the reference, in dB; it must stay below THRESHOLD_DB. The control
+    path is forced here (control_rate_min_voices = 1): the demo scores
+    play fewer voices than the engines' threshold.
+
+    Callback time per block at 1..64 voices for audio rate, forced
+    control rate and the default (control rate from
+    control_rate_min_voices voices up). The engines are called in turn,
+    block by block, and the fastest call of each is kept, so machine
+    noise hits all three alike and the numbers repeat from run to run.
+    The default must stay within TOLERANCE of audio rate at every voice
+    count: below the threshold it is the same path.
+
+    Large blocks: the scores are rendered again in LARGE_BLOCKS-sample
+    blocks (same spectral limit), and the control-rate callback's cost
+    per sample at each large block must stay within SCALING of its cost
+    at 1024 frames -- the interpolation has to be linear in the block
+    length.
+
+    Usage: python benchmarks/control_rate_check.py [period]
+"""
+
+THRESHOLD_DB = -60.0
+FFT_SIZE = 4096
+LARGE_BLOCKS = (4096, 8192)
+SCALING = 1.5
+TOLERANCE = 1.10
+VOICE_COUNTS = (1, 2, 4, 8, 16, 32, 64)
+
+def spectrum(signal):
+    if signal.ndim == 2:
+        signal = signal[:, 0]       # left channel; the demo buses are centred
+    frames = len(signal) // FFT_SIZE
+    window = np.hanning(FFT_SIZE)
+    chunks = signal[:frames * FFT_SIZE].reshape(frames, FFT_SIZE) * window
+    return np.abs(np.fft.rfft(chunks, axis=1)).mean(axis=0)
+
+def spectral_error_db(reference, test):
+    ref = spectrum(reference)
+    diff = ref - spectrum(test)
+    return 10 * np.log10(np.sum(diff ** 2) / np.sum(ref ** 2))
+
+def make(cls, period, forced=False):
+    engine = cls(start_stream=False, control_period=period, max_voices=None)
+    if forced:
+        engine.control_rate_min_voices = 1
+    return engine
+
+def block_times(engines, voices, frame_count=1024, calls=300):
+    # Fastest callback of each engine, called in turn block by block
+    for engine in engines:
+        engine.apply_step([45 + i for i in range(voices)])
+        for _ in range(10):
+            engine.callback(None, frame_count, None, 0)
+    best = [float('inf')] * len(engines)
+    for _ in range(calls):
+        for i, engine in enumerate(engines):
+            start = time.perf_counter()
+            engine.callback(None, frame_count, None, 0)
+            best[i] = min(best[i], time.perf_counter() - start)
+    for engine in engines:
+        engine.apply_step([])
+        for _ in range(20):
+            engine.callback(None, frame_count, None, 0)
+    return best
+
+if __name__ == "__main__":
+    period = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+
+    ok = True
+    for cls, score in ((SaoMeoEngine, melody), (SaoMeoMixer, song_data)):
+        reference = render(score, engine=make(cls, None))
+        test = render(score, engine=make(cls, period, forced=True))
+        error = spectral_error_db(reference, test)
+        peak = np.abs(reference - test).max()
+        passed = error < THRESHOLD_DB
+        ok &= passed
+        print(f"{cls.__name__}: spectral error {error:.1f} dB (limit {THRESHOLD_DB:.0f} dB), "
+              f"peak sample diff {peak:.2e} -> {'OK' if passed else 'FAIL'}")
+
+        engines = (make(cls, None), make(cls, period, forced=True), make(cls, period))
+        print(f"    1024 frames, fastest block: audio-rate / control-rate / default "
+              f"(control rate from {cls.control_rate_min_voices} voices)")
+        for voices in VOICE_COUNTS:
+            audio, control, default = block_times(engines, voices)
+            passed = default < TOLERANCE * audio
+            ok &= passed
+            print(f"    {voices:>2} voices: {audio * 1e6:6.0f} / {control * 1e6:6.0f} / {default * 1e6:6.0f} us "
+                  f"(default {audio / default:.2f}x audio-rate) -> {'OK' if passed else 'FAIL'}")
+
+        forced = make(cls, period, forced=True)
+        base = block_times([forced], 32)[0] / 1024
+        for frames in LARGE_BLOCKS:
+            test = render(score, block_size=frames, engine=make(cls, period, forced=True))
+            error = spectral_error_db(reference, test)
+            audio, control = block_times((make(cls, None), forced), 32, frame_count=frames, calls=40)
+            scaling = control / frames / base
+            passed = error < THRESHOLD_DB and scaling < SCALING
+            ok &= passed
+            print(f"    {frames} frames, 32 voices: spectral error {error:.1f} dB, audio-rate "
+                  f"{audio * 1000:.3f} ms, control-rate {control * 1000:.3f} ms, per sample "
+                  f"{scaling:.2f}x the 1024-frame cost (limit {SCALING}x) -> {'OK' if passed else 'FAIL'}")
+    sys.exit(0 if ok else 1)
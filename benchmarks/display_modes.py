@@ -0,0 +1,83 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SaoMeoPipeline import DisplayThrottle, DISPLAY_MODES
+
+"""
+    Inference-loop FPS of main.py's serial loop under each --display mode.
+
+    The loop is main.py's: inference (landmarks -> update_notes) on every
+    frame, then the display path only when DisplayThrottle lets the frame
+    through. The stages are stand-ins so it runs without a camera or
+    MediaPipe: inference sleeps --inference ms; display draws the overlay
+    text on a 1280x720 frame with cv2.putText when cv2 is installed
+    (imshow is left out, it needs a screen), and sleeps --display ms on
+    top for imshow / waitKey.
+
+    Reported per mode: loop FPS, frames shown, and the longest gap
+    between two update_notes calls. Headless must run at the inference
+    rate, throttled must show no more than its FPS, and both must beat
+    full.
+
+    Usage: python benchmarks/display_modes.py [--seconds 3] [--inference 15] [--display 12] [--fps 15]
+"""
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+def draw(img):
+    if cv2 is not None:
+        for i in range(4):
+            cv2.putText(img, f"current notes: ['Do', 'Mi', 'Sol'] line {i}", (100, 100 + 40 * i),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 0), 2, cv2.LINE_AA)
+
+def run(mode, seconds, inference, display_cost, fps):
+    display = DisplayThrottle(mode, fps)
+    img = np.zeros((720, 1280, 3), dtype=np.uint8)
+    updates = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        time.sleep(inference)
+        updates.append(time.perf_counter())     # update_notes
+        if display.due():
+            draw(img)
+            time.sleep(display_cost)
+    elapsed = time.perf_counter() - start
+    gaps = np.diff(updates)
+    return len(updates) / elapsed, display.shown / elapsed, float(gaps.max()) if len(gaps) else 0.0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="main.py display modes")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--inference", type=float, default=15.0, help="ms per frame of hand inference")
+    parser.add_argument("--display", type=float, default=12.0, help="ms per shown frame for imshow / waitKey")
+    parser.add_argument("--fps", type=float, default=15.0, help="--display-fps for the throttled mode")
+    options = parser.parse_args()
+    ok = True
+
+    print(f"inference {options.inference:.0f} ms, display {options.display:.0f} ms"
+          f"{' + cv2 overlay' if cv2 is not None else ' (cv2 not installed: no overlay drawing)'}")
+    results = {}
+    for mode in DISPLAY_MODES:
+        loop_fps, shown_fps, gap = run(mode, options.seconds, options.inference / 1e3, options.display / 1e3,
+                                       options.fps)
+        results[mode] = loop_fps
+        print(f"{mode:>9}: inference loop {loop_fps:5.1f} fps, shown {shown_fps:5.1f} fps, "
+              f"longest update_notes gap {gap * 1e3:5.1f} ms")
+        if mode == 'throttled':
+            ok &= shown_fps <= options.fps * 1.05
+        if mode == 'headless':
+            ok &= loop_fps >= 0.8 * 1e3 / options.inference
+
+    good = results['headless'] > results['full'] and results['throttled'] > results['full']
+    ok &= good
+    print(f"throttled / headless faster than full: {good} -> {'OK' if ok else 'FAIL'}")
+    sys.exit(0 if ok else 1)
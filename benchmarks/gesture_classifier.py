@@ -0,0 +1,117 @@
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SaoMeoGestures import (CAM_WIDTH, CAM_HEIGHT, NOTE_NAMES, classify, hands_to_notes,
+                            thumb_threshold, general_threshold)
+from SaoMeoLandmarks import LandmarkRecording
+
+"""
+    Vectorised gesture classifier vs. the original per-landmark code.
+
+    Runs the same frames through
+    - legacy:  the get_distance / if-cnt chain main.py used to have,
+    - frame:   SaoMeoGestures.hands_to_notes, one frame at a time (live path),
+    - batch:   SaoMeoGestures.classify on all frames at once (replay path),
+    checks that all three pick the same note on every frame, and reports
+    throughput in frames per microsecond.
+
+    Frames come from a main.py --record file, or are synthetic (random
+    hand poses around the thresholds) when no file is given.
+
+    Usage: python benchmarks/gesture_classifier.py [recording.npz] [frames]
+"""
+
+def legacy_get_distance(lm1, lm2, w, h):
+    point1 = (int(lm1.x * w), int(lm1.y * h))
+    point2 = (int(lm2.x * w), int(lm2.y * h))
+    return math.hypot(point1[0] - point2[0], point1[1] - point2[1])
+
+def legacy_hands_to_notes(current_hands, w, h):
+    current_notes = []
+    increasing_half_octave = False
+    flat_sound = False
+    increased_octave = 0
+
+    if "Left" in current_hands:
+        hand_landmarks = current_hands["Left"]
+        if legacy_get_distance(hand_landmarks.landmark[13], hand_landmarks.landmark[4], w, h) > thumb_threshold:
+            flat_sound = True
+        for tip_id in [8, 12, 16, 20]:
+            if legacy_get_distance(hand_landmarks.landmark[tip_id], hand_landmarks.landmark[0], w, h) > general_threshold:
+                increased_octave += 1
+
+    if "Right" in current_hands:
+        hand_landmarks = current_hands["Right"]
+        if legacy_get_distance(hand_landmarks.landmark[13], hand_landmarks.landmark[4], w, h) > thumb_threshold:
+            increasing_half_octave = True
+        cnt = 0
+        for tip_id in [8, 12, 16, 20]:
+            if legacy_get_distance(hand_landmarks.landmark[tip_id], hand_landmarks.landmark[0], w, h) > general_threshold:
+                cnt += 1
+
+        note = ""
+        offset = 0
+        if cnt == 1:
+            note = "C" if not increasing_half_octave else "G"
+        elif cnt == 2:
+            note = "D" if not increasing_half_octave else "A"
+        elif cnt == 3:
+            note = "E" if not increasing_half_octave else "B"
+        elif cnt == 4:
+            if increasing_half_octave: offset = 1
+            note = "F" if not increasing_half_octave else "C"
+        if cnt: note += str(2 + offset + increased_octave) + ("b" if flat_sound else "")
+        current_notes.append(note)
+
+    return current_notes
+
+def synthetic(frames, seed=0):
+    # Spread tips around the wrist so distances straddle both thresholds
+    rng = np.random.default_rng(seed)
+    landmarks = rng.uniform(0.0, 1.0, (frames, 2, 21, 3)).astype(np.float32)
+    wrist = rng.uniform(0.3, 0.7, (frames, 2, 1, 2))
+    scale = np.array((general_threshold / CAM_WIDTH, general_threshold / CAM_HEIGHT))
+    landmarks[..., :2] = wrist + rng.normal(0.0, 1.0, (frames, 2, 21, 2)) * scale
+    landmarks[:, :, 0, :2] = wrist[:, :, 0]
+    present = rng.random((frames, 2)) < 0.85
+    return LandmarkRecording(landmarks, present, np.arange(frames) / 30.0, (CAM_WIDTH, CAM_HEIGHT))
+
+def per_frame(recording, fn):
+    w, h = recording.frame_size
+    frames = [recording.hands_at(i) for i in range(len(recording))]
+    start = time.perf_counter()
+    out = [tuple(fn(hands, w, h)) for hands in frames]
+    return out, time.perf_counter() - start
+
+def batch(recording):
+    w, h = recording.frame_size
+    start = time.perf_counter()
+    names = NOTE_NAMES[classify(recording.landmarks, recording.present, w, h)]
+    elapsed = time.perf_counter() - start
+    right = recording.present[:, 1].tolist()
+    return [(name,) if played else () for name, played in zip(names.tolist(), right)], elapsed
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1].endswith('.npz'):
+        recording = LandmarkRecording.load(sys.argv[1])
+    else:
+        recording = synthetic(int(sys.argv[-1]) if len(sys.argv) > 1 else 100000)
+    n = len(recording)
+
+    legacy, t_legacy = per_frame(recording, legacy_hands_to_notes)
+    frame, t_frame = per_frame(recording, hands_to_notes)
+    batched, t_batch = batch(recording)
+
+    for label, t in (("legacy", t_legacy), ("frame", t_frame), ("batch", t_batch)):
+        print(f"{label:>7}: {n / (t * 1e6):8.4f} frames/us  ({t / n * 1e6:7.3f} us/frame)")
+
+    mismatches = sum(a != b or a != c for a, b, c in zip(legacy, frame, batched))
+    played = sum(bool(a and a[0]) for a in legacy)
+    print(f"{n} frames, {played} with a note, {mismatches} decisions differ from legacy")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SaoMeoEngine import SaoMeoEngine, melody
+from SaoMeoMixer import SaoMeoMixer, song_data
+from SaoMeoRender import render
+
+"""
+    Golden-audio regression check for SaoMeoEngine / SaoMeoMixer.
+
+    Fixed scores are rendered through callback() with no audio device
+    (SaoMeoRender.render, start_stream=False), and each render is reduced
+    to a fingerprint:
+    - RMS per output channel
+    - power spectrum in BANDS log-spaced bands from 60 Hz to 16 kHz, in
+      dB relative to the total (Hann-windowed 4096-sample frames,
+      averaged over the render and the channels)
+    The fingerprints are compared with the reference in golden_audio.json:
+    RMS within RMS_TOLERANCE (relative), and every band louder than
+    FLOOR_DB within BAND_TOLERANCE_DB. Fingerprints, not samples, so
+    float rounding across NumPy versions and CPUs does not trip it, but a
+    changed timbre, envelope, mix, pan law or reverb does.
+
+    Every case is also rendered with an odd block size (333) and must
+    give the same fingerprint: output must not depend on the buffer size.
+
+    After an intended change to the sound, rewrite the references with
+    --update and commit golden_audio.json with the change.
+
+    The same checks run under pytest (test_golden_audio.py, more block
+    sizes): python -m pytest benchmarks
+
+    Usage: python benchmarks/golden_audio.py [--update] [--case NAME ...]
+"""
+
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_audio.json")
+BANDS = 24
+FRAME = 4096
+RMS_TOLERANCE = 0.02
+BAND_TOLERANCE_DB = 1.5
+FLOOR_DB = -60.0
+
+CHORDS = [(['C4', 'E4', 'G4', 'B4', 'D5', 'F5'], 0.5), (['A3', 'C4', 'E4', 'G4', 'B4', 'D5'], 0.5),
+          (['F3', 'A3', 'C4', 'E4', 'G4'], 0.5), ('Rest', 0.25), (['G3', 'B3', 'D4', 'F4', 'A4', 'C5'], 0.75)]
+
+# Chords enter on the held melody pitch off the block grid, then take it over
+SHARED_PITCH = [(['G3'], [], 0.37), (['G3'], ['G3', 'B3', 'D4'], 1.0), ([], ['G3'], 0.5)]
+
+# name -> (score, engine factory)
+CASES = {
+    'engine_melody': (melody[:24], lambda: SaoMeoEngine(start_stream=False)),
+    'engine_additive': (melody[:8], lambda: SaoMeoEngine(start_stream=False, oscillator='additive')),
+    'engine_stealing': (CHORDS, lambda: SaoMeoEngine(start_stream=False, max_voices=4)),
+    'mixer_song': (song_data[:16], lambda: SaoMeoMixer(start_stream=False)),
+    'mixer_shared_pitch': (SHARED_PITCH, lambda: SaoMeoMixer(start_stream=False)),
+    'mixer_reverb': (song_data[:8], lambda: SaoMeoMixer(start_stream=False, reverb=1.0)),
+}
+
+def band_edges(sample_rate):
+    edges = np.geomspace(60.0, 16000.0, BANDS + 1)
+    return np.round(edges * FRAME / sample_rate).astype(int)
+
+def fingerprint(signal, sample_rate):
+    frames = signal if signal.ndim == 2 else signal[:, None]
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=0))
+
+    count = len(frames) // FRAME
+    blocks = frames[:count * FRAME].astype(np.float64).reshape(count, FRAME, -1)
+    window = np.hanning(FRAME)[None, :, None]
+    power = np.mean(np.abs(np.fft.rfft(blocks * window, axis=1)) ** 2, axis=(0, 2))
+    edges = band_edges(sample_rate)
+    bands = np.array([power[lo:hi].sum() for lo, hi in zip(edges[:-1], edges[1:])])
+    bands_db = 10 * np.log10(np.maximum(bands, 1e-30) / max(power.sum(), 1e-30))
+    return {'rms': [round(float(x), 6) for x in rms], 'bands_db': [round(float(x), 2) for x in bands_db]}
+
+def render_case(name, block_size=1024):
+    score, make = CASES[name]
+    engine = make()
+    try:
+        return fingerprint(render(score, block_size=block_size, engine=engine), engine.sample_rate), engine.sample_rate
+    finally:
+        engine.close()
+
+def compare(got, want):
+    # Problems found, as text; empty when within tolerance
+    problems = []
+    if len(got['rms']) != len(want['rms']):
+        return [f"{len(got['rms'])} channels, reference has {len(want['rms'])}"]
+    for c, (a, b) in enumerate(zip(got['rms'], want['rms'])):
+        if abs(a - b) > RMS_TOLERANCE * max(b, 1e-6):
+            problems.append(f"channel {c} RMS {a:.5f}, reference {b:.5f}")
+    for i, (a, b) in enumerate(zip(got['bands_db'], want['bands_db'])):
+        if max(a, b) > FLOOR_DB and abs(a - b) > BAND_TOLERANCE_DB:
+            problems.append(f"band {i} {a:+.1f} dB, reference {b:+.1f} dB")
+    return problems
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="golden-audio regression check")
+    parser.add_argument("--update", action="store_true", help="rewrite the reference fingerprints")
+    parser.add_argument("--case", nargs="+", choices=sorted(CASES), help="only these cases")
+    options = parser.parse_args()
+    names = options.case or list(CASES)
+
+    reference = {'cases': {}}
+    if os.path.exists(REFERENCE):
+        with open(REFERENCE) as f:
+            reference = json.load(f)
+
+    ok = True
+    for name in names:
+        got, sample_rate = render_case(name)
+        odd, _ = render_case(name, block_size=333)
+        problems = [f"block size 333: {p}" for p in compare(odd, got)]
+        if options.update:
+            reference['cases'][name] = got
+        elif name not in reference['cases']:
+            problems.append("no reference (run with --update)")
+        else:
+            problems += compare(got, reference['cases'][name])
+        ok &= not problems
+        rms = " / ".join(f"{x:.4f}" for x in got['rms'])
+        print(f"{name:<16} RMS {rms}  -> {'OK' if not problems else 'FAIL'}")
+        for problem in problems[:8]:
+            print(f"    {problem}")
+
+    if options.update:
+        reference['sample_rate'] = sample_rate
+        reference['band_edges_hz'] = [round(float(x), 1) for x in band_edges(sample_rate) * sample_rate / FRAME]
+        with open(REFERENCE, 'w') as f:
+            json.dump(reference, f, indent=1)
+        print(f"references written to {REFERENCE}")
+
+    sys.exit(0 if ok else 1)
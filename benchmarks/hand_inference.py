@@ -0,0 +1,83 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+from main import make_hands, collect_hands
+from SaoMeoGestures import hands_to_notes
+from SaoMeoHands import HandTracker
+
+"""
+    Reduced-resolution / ROI hand inference vs. full-frame, on recorded
+    footage (any file cv2.VideoCapture reads, ideally 1280x720 webcam
+    video of someone playing).
+
+    Every configuration sees the same frames (flipped, as in main.py).
+    Reported per configuration:
+    - inference FPS (cvtColor + Hands.process + note mapping only),
+    - speed-up over full-frame inference,
+    - gesture agreement: fraction of frames whose notes match the
+      full-frame run,
+    - how many frames needed the full-frame fallback.
+
+    Exits non-zero if any configuration agrees on fewer than
+    --min-agreement of the frames.
+
+    Usage: python benchmarks/hand_inference.py video.mp4 [--scales 0.5 0.35] [--roi-margin 0.3]
+"""
+
+def load_frames(path, limit):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        success, img = cap.read()
+        if not success:
+            break
+        frames.append(cv2.flip(img, 1))
+    cap.release()
+    return frames
+
+def run(frames, hands):
+    decisions = []
+    start = time.perf_counter()
+    for img in frames:
+        h, w, c = img.shape
+        results = hands.process(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        decisions.append(tuple(hands_to_notes(collect_hands(results), w, h)))
+    elapsed = time.perf_counter() - start
+    hands.close()
+    return decisions, len(frames) / elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Downscaled / ROI hand inference vs. full frame")
+    parser.add_argument("video")
+    parser.add_argument("--scales", type=float, nargs="+", default=[0.5, 0.35])
+    parser.add_argument("--roi-margin", type=float, default=0.3)
+    parser.add_argument("--frames", type=int, default=1000)
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    if not frames:
+        sys.exit(f"could not read frames from {args.video}")
+    h, w = frames[0].shape[:2]
+    print(f"{len(frames)} frames at {w}x{h}")
+
+    reference, reference_fps = run(frames, make_hands())
+    print(f"{'full frame':>22}: {reference_fps:6.1f} fps")
+
+    ok = True
+    for scale in args.scales:
+        for roi in (False, True):
+            tracker = HandTracker(make_hands, scale=scale, roi=roi, roi_margin=args.roi_margin)
+            decisions, fps = run(frames, tracker)
+            agreement = sum(a == b for a, b in zip(decisions, reference)) / len(frames)
+            ok &= agreement >= args.min_agreement
+            label = f"scale {scale}" + (" + ROI" if roi else "")
+            print(f"{label:>22}: {fps:6.1f} fps ({fps / reference_fps:.2f}x), "
+                  f"agreement {agreement:.1%}, full-frame fallbacks {tracker.full_frames}/{len(frames)}")
+
+    sys.exit(0 if ok else 1)
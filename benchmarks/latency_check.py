@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SaoMeoEngine import SaoMeoEngine, notes
+from SaoMeoLatency import PROFILES, AdaptiveBuffer
+
+"""
+    Latency profiles: envelope timing at any rate / block size, callback
+    load per profile on this machine, and the adaptive growth policy.
+
+    1. Attack and release must take attack_time / release_time seconds
+       whatever the sample rate and buffer size: the first block end at
+       which the envelope reaches 1.0 (and the voice is retired after
+       note-off) must fall within one block of the ideal sample.
+    2. Callback load (render time / block period) of each fixed profile
+       with 8 and 32 held voices: a profile is only stable here if its
+       p99 load stays well below 1.
+    3. AdaptiveBuffer driven by a simulated callback that costs a fixed
+       2 ms plus 10 % of the block: it must grow 128 -> 256 and stay
+       there, and never grow when every block is cheap.
+
+    Usage: python benchmarks/latency_check.py
+"""
+
+RATES = (22050, 44100, 48000, 96000)
+BLOCKS = (64, 128, 333, 1024)
+
+def envelope_timing(sample_rate, block, control_period):
+    engine = SaoMeoEngine(start_stream=False, sample_rate=sample_rate, frames_per_buffer=block,
+                          control_period=control_period)
+    engine.update_notes([notes['A4']])
+    elapsed = 0
+    while engine.num_voices == 0 or engine.voice_envs[0] < 1.0 - 1e-6:
+        engine.callback(None, block, None, 0)
+        elapsed += block
+    attack = elapsed
+
+    engine.update_notes([])
+    elapsed = 0
+    while engine.num_voices:
+        engine.callback(None, block, None, 0)
+        elapsed += block
+    release = elapsed
+    return (0 <= attack - engine.attack_samples < block and 0 <= release - engine.release_samples < block,
+            attack / sample_rate, release / sample_rate)
+
+def profile_load(latency, voices, blocks=400):
+    engine = SaoMeoEngine(start_stream=False, latency=latency)
+    engine.update_notes(range(notes['A3'], notes['A3'] + voices))
+    frames = engine.frames_per_buffer
+    loads = []
+    for _ in range(blocks):
+        start = time.perf_counter()
+        engine.callback(None, frames, None, 0)
+        loads.append((time.perf_counter() - start) * engine.sample_rate / frames)
+    return frames, float(np.mean(loads)), float(np.percentile(loads, 99))
+
+def simulate(adaptive, cost, sample_rate=48000, seconds=10.0, poll_every=0.25):
+    # Simulated clock: blocks of adaptive.frames, poll() every poll_every
+    now = 0.0
+    next_poll = poll_every
+    adaptive.restart(now)
+    while now < seconds:
+        period = adaptive.frames / sample_rate
+        adaptive.block(cost(adaptive.frames, sample_rate), 0)
+        now += period
+        if now >= next_poll:
+            next_poll += poll_every
+            if adaptive.poll(now) is not None:
+                adaptive.restart(now)
+    return adaptive.frames, adaptive.growths
+
+if __name__ == "__main__":
+    ok = True
+
+    print("envelope timing (attack / release seconds):")
+    for control_period in (32, None):
+        for sample_rate in RATES:
+            row = []
+            for block in BLOCKS:
+                good, attack, release = envelope_timing(sample_rate, block, control_period)
+                ok &= good
+                row.append(f"{block:>4}: {attack:.3f}/{release:.3f}{'' if good else ' FAIL'}")
+            print(f"  control {str(control_period):>4} {sample_rate:>5} Hz  " + "  ".join(row))
+
+    print("callback load per profile:")
+    for latency, (sample_rate, frames, adaptive) in PROFILES.items():
+        if adaptive:
+            continue
+        for voices in (8, 32):
+            frames, mean, p99 = profile_load(latency, voices)
+            print(f"  {latency:>8} ({frames:>4} frames, {1000 * frames / sample_rate:5.1f} ms) "
+                  f"{voices:>2} voices: load mean {mean:.0%} p99 {p99:.0%}")
+
+    fixed_cost = lambda frames, sample_rate: 0.002 * sample_rate / frames + 0.1
+    frames, growths = simulate(AdaptiveBuffer(128), fixed_cost)
+    good = frames == 256 and len(growths) == 1
+    ok &= good
+    print(f"adaptive, 2 ms per block: settled at {frames} frames after {len(growths)} growth(s) "
+          f"-> {'OK' if good else 'FAIL'}")
+
+    frames, growths = simulate(AdaptiveBuffer(128), lambda frames, sample_rate: 0.3)
+    good = frames == 128 and not growths
+    ok &= good
+    print(f"adaptive, cheap blocks: stayed at {frames} frames -> {'OK' if good else 'FAIL'}")
+
+    sys.exit(0 if ok else 1)
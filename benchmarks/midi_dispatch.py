@@ -0,0 +1,269 @@
+import os
+import socket
+import struct
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SaoMeoEngine import SaoMeoEngine
+from SaoMeoEvents import NOTE_ON, PITCH_BEND, VIBRATO
+from SaoMeoMidi import MidiInput, MidiPlayer, read_midi
+from SaoMeoMixer import SaoMeoMixer, song_data
+from SaoMeoPitch import to_notes
+
+"""
+    MIDI input: file parsing, timing, pitch bend, and what dispatch costs
+    the callback.
+
+    1. File: song_data written as a two-track MIDI file (running status,
+       a tempo change halfway) must read back with every note at its
+       time under the tempo map.
+    2. Timing: played by a MidiPlayer, every note_on must reach the engine
+       on its sample, rounded to the 32-sample grid.
+    3. Pitch bend: a full-scale bend (+2 semitones) must move A4 to B4.
+    4. Live batching: 2000 bend / mod-wheel messages and 64 notes in one
+       block period reach the ring as one push_many of the newest event
+       per note / control, and cost the callback's event stage far less
+       than pushing every message.
+    5. UDP: OSC and raw MIDI datagrams on a localhost socket sound on the
+       engine within a few block periods.
+    6. Many engines: 8 mixers each playing a dense file (notes every
+       16th, a pitch-bend sweep at 1 kHz) through a MidiPlayer; mean
+       callback load next to the same mixers without MIDI.
+
+    Usage: python benchmarks/midi_dispatch.py
+"""
+
+DIVISION = 480
+FRAMES = 512
+
+def varlen(value):
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    return bytes(reversed(out))
+
+def write_midi(path, tracks):
+    # tracks: lists of (tick, message bytes); meta events as raw bytes too
+    chunks = [b'MThd' + struct.pack('>IHHH', 6, 1, len(tracks), DIVISION)]
+    for events in tracks:
+        body = b''
+        last = 0
+        running = None
+        for tick, message in sorted(events, key=lambda e: e[0]):
+            body += varlen(tick - last)
+            last = tick
+            if message[0] < 0xF0 and message[0] == running:
+                body += message[1:]
+            else:
+                body += message
+                running = message[0] if message[0] < 0xF0 else None
+        body += b'\x00\xff\x2f\x00'
+        chunks.append(b'MTrk' + struct.pack('>I', len(body)) + body)
+    with open(path, 'wb') as f:
+        f.write(b''.join(chunks))
+
+def song_file(path):
+    # Melody on channel 0, chords on channel 1; 120 bpm, then 60 bpm from the middle beat
+    tempo_track = []
+    tracks = [[], []]
+    expected = []
+    beats = np.concatenate(([0.0], np.cumsum([step[-1] for step in song_data])))
+    middle = float(beats[len(beats) // 2])
+    tempo_track.append((0, b'\xff\x51\x03' + (500000).to_bytes(3, 'big')))
+    tempo_track.append((int(middle * DIVISION), b'\xff\x51\x03' + (1000000).to_bytes(3, 'big')))
+
+    def seconds(beat):
+        return beat * 0.5 if beat <= middle else middle * 0.5 + (beat - middle)
+
+    for start, end, step in zip(beats[:-1], beats[1:], song_data):
+        for channel, part in enumerate(step[:-1]):
+            for note in to_notes(part):
+                tracks[channel].append((int(start * DIVISION), bytes((0x90 | channel, note, 100))))
+                tracks[channel].append((int(end * DIVISION) - 1, bytes((0x90 | channel, note, 0))))
+                expected.append((seconds(start), channel, note))
+    write_midi(path, [tempo_track] + tracks)
+    return sorted(expected)
+
+def check_file(path, expected):
+    messages = read_midi(path)
+    ons = messages[(messages['status'] & 0xF0 == 0x90) & (messages['data2'] > 0)]
+    got = sorted((round(float(m['time']), 6), int(m['status'] & 0x0F), int(m['data1'])) for m in ons)
+    want = sorted((round(t, 6), c, n) for t, c, n in expected)
+    return got == want, len(got)
+
+def check_timing(path):
+    engine = SaoMeoMixer(start_stream=False, max_voices=None)
+    player = MidiPlayer(path)
+    engine.sequencer = player
+    onsets = []
+    apply = engine._apply_event_unsafe
+    clock = [0]
+
+    def logged(kind, key, value, timestamp, code=None):
+        if kind == NOTE_ON:
+            onsets.append(clock[0] + engine._event_offset)
+        apply(kind, key, value, timestamp, code)
+
+    engine._apply_event_unsafe = logged
+    player.play()
+    total = int((player.duration() + 0.5) * engine.sample_rate)
+    while clock[0] < total:
+        engine.callback(None, FRAMES, None, 0)
+        clock[0] += FRAMES
+    messages = read_midi(path)
+    ons = messages[(messages['status'] & 0xF0 == 0x90) & (messages['data2'] > 0)]
+    want = sorted(int(round(t * engine.sample_rate / 32)) * 32 for t in ons['time'])
+    return sorted(onsets) == want, len(onsets)
+
+def check_bend():
+    engine = SaoMeoEngine(start_stream=False)
+    messages = np.array([(0.0, 0x90, 69, 100), (0.0, 0xE0, 0x7F, 0x7F), (1.0, 0x80, 69, 0)],
+                        dtype=[('time', 'f8'), ('status', 'u1'), ('data1', 'u1'), ('data2', 'u1')])
+    player = MidiPlayer(messages)
+    engine.sequencer = player
+    player.play()
+    out = np.concatenate([engine.callback(None, FRAMES, None, 0)[0][:, 0].copy() for _ in range(60)])
+    tail = out[9600:]
+    spectrum = np.abs(np.fft.rfft(tail * np.hanning(len(tail))))
+    return float(np.argmax(spectrum) * engine.sample_rate / len(tail))
+
+def drain_cost(engine, fill, repeats=20):
+    times = []
+    for _ in range(repeats):
+        fill()
+        start = time.perf_counter()
+        engine.events.drain(engine._apply_event_unsafe)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+def check_batching():
+    engine = SaoMeoEngine(start_stream=False, max_voices=None)
+    live = MidiInput(engine)
+    burst = []
+    for i in range(1000):
+        value = (i * 16) % 16384
+        burst.append((0xE0, value & 0x7F, value >> 7))
+        burst.append((0xB0, 1, i % 128))
+    for note in range(40, 104):
+        burst.append((0x90, note, 90))
+
+    def batched():
+        for message in burst:
+            live.feed(*message)
+        live.flush()
+
+    def naive():
+        for status, data1, data2 in burst:
+            kind = status & 0xF0
+            if kind == 0x90:
+                engine.events.push(NOTE_ON, float(data1), data2 / 127.0)
+            elif kind == 0xE0:
+                engine.events.push(PITCH_BEND, 0.0, ((data2 << 7 | data1) - 8192) / 4096.0)
+            else:
+                engine.events.push(VIBRATO, 0.0, 0.012 + data2 / 127.0 * 0.03)
+
+    batched()
+    pushed = len(engine.events)
+    engine.events.drain(engine._apply_event_unsafe)
+    return pushed, len(burst), drain_cost(engine, batched), drain_cost(engine, naive)
+
+def check_udp():
+    engine = SaoMeoEngine(start_stream=False)
+    live = MidiInput(engine, udp_port=0)
+    port = live.sock.getsockname()[1]
+    live.start()
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    osc = b'/note_on\0\0\0\0,iii\0\0\0\0' + struct.pack('>iii', 0, 69, 100)
+    sender.sendto(osc, ('127.0.0.1', port))
+    sender.sendto(bytes((0x90, 72, 100, 76, 100)), ('127.0.0.1', port))     # running status
+    deadline = time.perf_counter() + 1.0
+    while time.perf_counter() < deadline and engine.num_voices < 3:
+        time.sleep(live.interval)
+        engine.callback(None, FRAMES, None, 0)
+    live.close()
+    sender.close()
+    return sorted(key for key in engine.voice_keys)
+
+def dense_file(path, seconds=8.0):
+    events = [(0, b'\xff\x51\x03' + (500000).to_bytes(3, 'big'))]
+    ticks_per_second = 2 * DIVISION
+    for i in range(int(seconds * 8)):
+        tick = i * ticks_per_second // 8
+        note = 48 + (i * 7) % 36
+        events.append((tick, bytes((0x90, note, 100))))
+        events.append((tick + ticks_per_second // 8 - 1, bytes((0x80, note, 0))))
+    for i in range(int(seconds * 1000)):
+        value = int(8192 + 4000 * np.sin(2 * np.pi * i / 1000))
+        events.append((i * ticks_per_second // 1000, bytes((0xE0, value & 0x7F, value >> 7))))
+    write_midi(path, [events])
+
+def many_engines(path, count=8, blocks=300):
+    engines = [SaoMeoMixer(start_stream=False, max_voices=16) for _ in range(count)]
+    players = []
+    for engine in engines:
+        player = MidiPlayer(path, loop=True)
+        engine.sequencer = player
+        player.play()
+        players.append(player)
+    idle = [SaoMeoMixer(start_stream=False, max_voices=16) for _ in range(count)]
+    for engine in idle:
+        engine.apply_step([60, 64], [48])
+
+    def load(group):
+        for engine in group:
+            engine.callback(None, FRAMES, None, 0)
+        start = time.perf_counter()
+        for _ in range(blocks):
+            for engine in group:
+                engine.callback(None, FRAMES, None, 0)
+        return (time.perf_counter() - start) / (blocks * count) * engines[0].sample_rate / FRAMES
+
+    return load(engines), load(idle)
+
+if __name__ == "__main__":
+    ok = True
+    directory = tempfile.mkdtemp()
+
+    path = os.path.join(directory, "song.mid")
+    expected = song_file(path)
+    good, count = check_file(path, expected)
+    ok &= good
+    print(f"file: {count} note_on read back at their tempo-mapped times: {good} -> {'OK' if good else 'FAIL'}")
+
+    good, count = check_timing(path)
+    ok &= good
+    print(f"player: {count} note_on applied on their grid sample: {good} -> {'OK' if good else 'FAIL'}")
+
+    freq = check_bend()
+    target = 440.0 * 2 ** (2 / 12)
+    good = abs(freq - target) < 3.0
+    ok &= good
+    print(f"pitch bend +2 semitones: A4 at {freq:.1f} Hz (B4 {target:.1f} Hz) -> {'OK' if good else 'FAIL'}")
+
+    pushed, messages, batched, naive = check_batching()
+    good = pushed == 66 and batched * 5 < naive
+    ok &= good
+    print(f"live batching: {messages} messages -> {pushed} events in one push; callback event stage "
+          f"{batched * 1e3:.3f} ms vs {naive * 1e3:.3f} ms per message -> {'OK' if good else 'FAIL'}")
+
+    keys = check_udp()
+    good = keys == [69, 72, 76]
+    ok &= good
+    print(f"UDP: OSC + raw MIDI datagrams sounding as voices {keys} -> {'OK' if good else 'FAIL'}")
+
+    dense = os.path.join(directory, "dense.mid")
+    dense_file(dense)
+    with_midi, without = many_engines(dense)
+    good = with_midi < 1.5 * without + 0.02
+    ok &= good
+    print(f"8 mixers with dense MIDI (8 notes/s + 1 kHz pitch bend): mean load {with_midi:.1%} "
+          f"vs {without:.1%} without MIDI -> {'OK' if good else 'FAIL'}")
+
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SaoMeoEngine import SaoMeoEngine, Bus
+
+"""
+    Multi-bus mixer: all buses render in one vectorised pass.
+
+    1. Cost: 24 held voices on 1 bus, then spread over 3 and 8 buses with
+       different timbres and pans. The block time must stay within 1.5x of
+       the single-bus one (no per-bus Python loop, no per-bus render).
+    2. Timbre: a note on bus 1 of a three-bus engine must render exactly
+       as the same note on a one-bus engine with bus 1's harmonics.
+    3. Pan / gain: a bus panned hard left is silent on the right, a
+       centred one is equal on both sides, and set_bus_gain /
+       set_bus_pan take effect on the next block.
+    4. Voice limit: four notes held on a bus capped at 2 voices leave at
+       most 2 sounding there (the rest stolen), and the other bus is not
+       touched.
+
+    Usage: python benchmarks/mixer_buses.py
+"""
+
+FRAMES = 512
+VOICES = 24
+TIMBRES = (
+    ((1, 1.0), (2, 0.5), (3, 0.08), (4, 0.02)),
+    ((1, 1.0),),
+    ((1, 1.0), (3, 0.3), (5, 0.1), (7, 0.05)),
+)
+
+def make_buses(count):
+    return [Bus(f"bus{index}", TIMBRES[index % len(TIMBRES)], gain=0.8, pan=(index % 3 - 1) * 0.5)
+            for index in range(count)]
+
+def block_time(count, blocks=300):
+    engine = SaoMeoEngine(start_stream=False, max_voices=None, buses=make_buses(count))
+    for index in range(VOICES):
+        engine.set_bus(index % count, engine.bus_targets[index % count] | {45 + index})
+    for _ in range(20):
+        engine.callback(None, FRAMES, None, 0)
+    times = []
+    for _ in range(blocks):
+        start = time.perf_counter()
+        engine.callback(None, FRAMES, None, 0)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+def render(engine, blocks=20):
+    return np.concatenate([engine.callback(None, FRAMES, None, 0)[0].copy() for _ in range(blocks)])
+
+if __name__ == "__main__":
+    ok = True
+
+    single = block_time(1)
+    for count in (1, 3, 8):
+        elapsed = block_time(count)
+        good = elapsed < 1.5 * single
+        ok &= good
+        print(f"{VOICES} voices on {count} bus(es): {elapsed * 1000:.3f} ms per block "
+              f"({elapsed / single:.2f}x one bus) -> {'OK' if good else 'FAIL'}")
+
+    multi = SaoMeoEngine(start_stream=False, channels=1,
+                         buses=[Bus('a', TIMBRES[0]), Bus('b', TIMBRES[1]), Bus('c', TIMBRES[2])])
+    multi.set_bus('b', [69])
+    alone = SaoMeoEngine(start_stream=False, channels=1, buses=[Bus('b', TIMBRES[1])])
+    alone.update_notes([69])
+    diff = float(np.abs(render(multi) - render(alone)).max())
+    good = diff < 1e-6
+    ok &= good
+    print(f"bus timbre vs standalone engine: max diff {diff:.2e} -> {'OK' if good else 'FAIL'}")
+
+    engine = SaoMeoEngine(start_stream=False, buses=[Bus('left', pan=-1.0), Bus('centre')])
+    engine.set_bus('left', [60])
+    out = render(engine)
+    good = np.abs(out[:, 1]).max() == 0.0 and np.abs(out[:, 0]).max() > 0.1
+    engine.set_bus('left', [])
+    engine.set_bus('centre', [64])
+    out = render(engine, 40)[-FRAMES:]
+    good &= np.abs(out[:, 0] - out[:, 1]).max() < 1e-7
+    engine.set_bus_pan('centre', 0.5)
+    engine.set_bus_gain('centre', 0.5)
+    block = render(engine, 1)
+    # Balance law: +0.5 keeps the right side and halves the left; tanh
+    # is undone to compare the pre-master levels
+    pre = np.arctanh(block) / (engine.volume * engine.drive)
+    ratio = np.abs(pre[:, 0]).max() / np.abs(pre[:, 1]).max()
+    level = np.abs(pre[:, 1]).max() / (np.abs(np.arctanh(out[:, 1])).max() / (engine.volume * engine.drive))
+    good &= abs(ratio - 0.5) < 1e-3 and abs(level - 0.5) < 0.05
+    ok &= good
+    print(f"pan / gain: left/right {ratio:.3f} (0.5), right level {level:.3f} (0.5) -> {'OK' if good else 'FAIL'}")
+
+    engine = SaoMeoEngine(start_stream=False, buses=[Bus('lead', max_voices=2), Bus('pad')])
+    engine.set_bus('pad', [48, 52, 55])
+    engine.set_bus('lead', [72, 74, 76, 77])
+    render(engine, 2)
+    lead = [slot for slot in range(engine.num_voices) if engine.voice_bus[slot] == 0 and engine.voice_targets[slot]]
+    pad = [slot for slot in range(engine.num_voices) if engine.voice_bus[slot] == 1 and engine.voice_targets[slot]]
+    good = len(lead) == 2 and len(pad) == 3 and engine.stolen_voices == 2
+    ok &= good
+    print(f"bus voice limit: {len(lead)} lead / {len(pad)} pad voices held, {engine.stolen_voices} stolen "
+          f"-> {'OK' if good else 'FAIL'}")
+
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,94 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SaoMeoEngine import SaoMeoEngine, notes
+from SaoMeoProcess import EngineProcess, pace_callback
+from SaoMeoStats import XRUN_MASK
+
+"""
+    Audio isolation under a saturated vision loop.
+
+    CPU-burn threads stand in for OpenCV / MediaPipe / imshow: pure-Python
+    loops that hold the GIL, while the main thread sends note updates at
+    camera rate. The engine runs
+    - in-process: pace_callback() on a thread of this interpreter, i.e.
+      what the PyAudio callback sees in main.py today, and
+    - in a child process: EngineProcess(device=False), same pacing.
+    Late blocks are counted as underflows. The child-process engine must
+    not drop any; the in-process numbers are printed for comparison.
+
+    Usage: python benchmarks/process_isolation.py [burn_threads] [seconds]
+"""
+
+def burn(stop):
+    x = 0
+    while not stop.is_set():
+        for i in range(10000):
+            x += i * i
+
+def drive(engine, seconds):
+    # ~30 fps vision loop walking up and down a scale
+    pool = [f for name, f in notes.items() if name[-1] == '4']
+    frame = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        engine.update_notes([pool[frame // 10 % len(pool)]])
+        frame += 1
+        time.sleep(1 / 30)
+    engine.update_notes([])
+
+def run_in_process(burners, seconds):
+    engine = SaoMeoEngine(start_stream=False)
+    counts = {'blocks': 0, 'xruns': 0}
+
+    def callback(in_data, frame_count, time_info, status):
+        counts['blocks'] += 1
+        counts['xruns'] += bool(status & XRUN_MASK)
+        return engine.callback(in_data, frame_count, time_info, status)
+
+    stop = threading.Event()
+    audio = threading.Thread(target=pace_callback,
+                             args=(callback, engine.frames_per_buffer, engine.sample_rate, stop), daemon=True)
+    audio.start()
+    with_burners(burners, drive, engine, seconds)
+    stop.set()
+    audio.join()
+    engine.close()
+    return counts
+
+def run_child_process(burners, seconds):
+    engine = EngineProcess(SaoMeoEngine, device=False)
+    try:
+        with_burners(burners, drive, engine, seconds)
+        time.sleep(0.1)
+        return engine.poll()
+    finally:
+        engine.close()
+
+def with_burners(burners, fn, *args):
+    stop = threading.Event()
+    threads = [threading.Thread(target=burn, args=(stop,), daemon=True) for _ in range(burners)]
+    for t in threads:
+        t.start()
+    try:
+        fn(*args)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+if __name__ == "__main__":
+    burners = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+
+    local = run_in_process(burners, seconds)
+    print(f"   in-process: {local['blocks']} blocks, {local['xruns']} underflows")
+    child = run_child_process(burners, seconds)
+    print(f"child process: {child['blocks']} blocks, {child['xruns']} underflows, "
+          f"load mean {child['load_mean']:.1%} max {child['load_max']:.1%}")
+
+    sys.exit(0 if child['xruns'] == 0 else 1)
@@ -0,0 +1,140 @@
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SaoMeoMixer import SaoMeoMixer, song_data
+from SaoMeoRecorder import SessionRecorder, read_raw
+from SaoMeoSequencer import Sequencer
+
+"""
+    Session recorder: what lands on disk, and what it costs the callback.
+
+    1. Files: song_data is played through the sequencer in uneven blocks
+       while recording to WAV and to raw float32. The raw file must equal
+       the blocks the callback returned, the WAV must match them to 16-bit
+       precision, and every note_on in the event log must sit on the
+       sample where its score step starts.
+    2. Callback cost: record() time per block for 64..4096 frames (one or
+       two slice copies, so flat in the number of blocks) and no
+       allocations in steady state.
+    3. Drops: a writer that wakes only every 2 s behind a 0.1 s ring must
+       drop blocks and count them, and still write a file of the full
+       length with the kept blocks at their original positions.
+
+    Usage: python benchmarks/recorder_check.py
+"""
+
+TEMPO = 137.0
+SIZES = (333, 64, 1024, 17, 512)
+
+def play(path):
+    mixer = SaoMeoMixer(start_stream=False)
+    sequencer = Sequencer(song_data, tempo=TEMPO)
+    mixer.sequencer = sequencer
+    sequencer.play()
+    total = int(round(sequencer.duration() * mixer.sample_rate)) + mixer.sample_rate
+    # Rendered far faster than real time: a ring the length of the session
+    # keeps the writer's poll interval from dropping blocks
+    mixer.start_recording(path, seconds=total / mixer.sample_rate + 1.0)
+    blocks = []
+    pos = 0
+    while pos < total:
+        n = min(SIZES[len(blocks) % len(SIZES)], total - pos)
+        blocks.append(mixer.callback(None, n, None, 0)[0].copy())
+        pos += n
+    stats = mixer.stop_recording()
+    return np.concatenate(blocks), sequencer, mixer.sample_rate, stats
+
+def read_wav(path):
+    with wave.open(path, 'rb') as wf:
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype='<i2')
+        return pcm.reshape(-1, wf.getnchannels()) / 32767.0
+
+def onsets(path):
+    with open(path + '.events.csv') as f:
+        return [int(row['frame']) for row in csv.DictReader(f) if row['event'] == 'note_on']
+
+def record_cost(frames, seconds=4.0):
+    # The writer is held off (tracemalloc sees every thread), so only as
+    # many blocks as the ring holds are timed
+    recorder = SessionRecorder(os.path.join(tempfile.mkdtemp(), "cost.f32"), seconds=seconds, events=False,
+                               poll_interval=3600.0)
+    blocks = recorder.capacity // frames - 10
+    block = np.full((frames, 2), 0.1, dtype=np.float32)
+    for _ in range(10):
+        recorder.record(block)
+    tracemalloc.start()
+    worst = 0
+    times = np.zeros(blocks)
+    for i in range(blocks):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        recorder.record(block)
+        times[i] = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        worst = max(worst, peak - before)
+    tracemalloc.stop()
+    recorder.close()
+    return float(np.median(times)), float(np.max(times)), worst, recorder.dropped_blocks
+
+def drops():
+    path = os.path.join(tempfile.mkdtemp(), "drops.f32")
+    recorder = SessionRecorder(path, seconds=0.1, events=False, poll_interval=2.0)
+    frames = 512
+    count = 400
+    for i in range(count):
+        recorder.record(np.full((frames, 2), (i + 1) / count, dtype=np.float32))
+    recorder.close()
+    data, _ = read_raw(path)
+    # Each kept block must still be at its own position
+    levels = data[::frames, 0]
+    kept = np.flatnonzero(levels)
+    placed = np.allclose(levels[kept], (kept + 1) / count)
+    return recorder.dropped_blocks, len(data) == count * frames, placed
+
+if __name__ == "__main__":
+    ok = True
+    directory = tempfile.mkdtemp()
+
+    for name in ("session.f32", "session.wav"):
+        path = os.path.join(directory, name)
+        played, sequencer, sample_rate, stats = play(path)
+        if name.endswith('.wav'):
+            data = read_wav(path)
+            error = float(np.abs(data - np.clip(played, -1, 1)).max())
+            same = len(data) == len(played) and error <= 1.0 / 32767
+        else:
+            data, _ = read_raw(path)
+            same = len(data) == len(played) and np.array_equal(data, played)
+        samples_per_beat = 60.0 * sample_rate / TEMPO
+        starts = {int(round(start * samples_per_beat)) for start in sequencer.starts}
+        logged = onsets(path)
+        aligned = bool(logged) and set(logged) <= starts
+        good = same and aligned and stats['dropped_blocks'] == 0
+        ok &= good
+        print(f"{name}: {len(data)} frames, matches the callback output: {same}, "
+              f"{len(logged)} note_on events on their step samples: {aligned} -> {'OK' if good else 'FAIL'}")
+
+    for frames in (64, 256, 1024, 4096):
+        median, worst, peak, dropped = record_cost(frames)
+        good = peak < 1024 and dropped == 0
+        ok &= good
+        print(f"record() {frames:>4} frames: median {median * 1e6:6.2f} us, worst {worst * 1e6:7.2f} us, "
+              f"peak alloc {peak} B -> {'OK' if good else 'FAIL'}")
+
+    dropped, full_length, placed = drops()
+    good = dropped > 0 and full_length and placed
+    ok &= good
+    print(f"stalled writer: {dropped} blocks dropped and counted, full length: {full_length}, "
+          f"kept blocks in place: {placed} -> {'OK' if good else 'FAIL'}")
+
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SaoMeoEngine import SaoMeoEngine, UFUNC_BUFSIZE
+from SaoMeoReverb import ConvolutionReverb, synthetic_ir
+
+"""
+    Partitioned convolution reverb: accuracy, cost per block vs IR length,
+    allocations, and the tail cut-off in the engine.
+
+    1. Accuracy: random stereo input pushed through process() in blocks
+       of uneven sizes must match np.convolve of the mono send with each
+       IR channel (shifted by the reported latency) to float32 precision.
+    2. Cost: mean time per 512-frame block for IRs of 0.5 to 8 s and
+       partitions of 256 / 512 / 1024, as a share of the 10.7 ms block
+       period, next to a time-domain np.convolve of the same block.
+    3. Allocations: steady-state process() calls must not allocate
+       anything the size of a block.
+    4. Engine: with reverb=2.0 the tail keeps sounding after the last
+       voice is gone, and once it has died away silent blocks skip the
+       reverb again.
+
+    Usage: python benchmarks/reverb_cost.py
+"""
+
+SAMPLE_RATE = 48000
+FRAMES = 512
+LENGTHS = (0.5, 1.0, 2.0, 4.0, 8.0)
+PARTITIONS = (256, 512, 1024)
+
+def accuracy(partition, ir):
+    rng = np.random.default_rng(1)
+    dry = (rng.standard_normal((20000, 2)) * 0.1).astype(np.float32)
+    reverb = ConvolutionReverb(ir, partition=partition, wet=1.0)
+    out = dry.copy()
+    pos = 0
+    sizes = (333, 64, 1024, 17, 4096)
+    for i in range(len(out)):
+        if pos >= len(out):
+            break
+        n = min(sizes[i % len(sizes)], len(out) - pos)
+        reverb.process(out[pos:pos + n])
+        pos += n
+    send = dry.astype(np.float64).sum(axis=1)
+    expected = np.stack([np.convolve(send, ir[:, c])[:len(out)] for c in range(ir.shape[1])], axis=1)
+    expected = np.roll(expected, reverb.latency, axis=0)
+    expected[:reverb.latency] = 0.0
+    return float(np.abs((out - dry) - expected).max() / np.abs(expected).max())
+
+def block_cost(reverb, blocks=200):
+    block = np.zeros((FRAMES, reverb.channels), dtype=np.float32)
+    noise = np.random.default_rng(2).standard_normal(block.shape).astype(np.float32) * 0.1
+    times = []
+    for _ in range(blocks):
+        block[:] = noise
+        start = time.perf_counter()
+        reverb.process(block)
+        times.append(time.perf_counter() - start)
+    return float(np.mean(times))
+
+def naive_cost(ir, blocks=20):
+    block = np.random.default_rng(3).standard_normal(FRAMES)
+    start = time.perf_counter()
+    for _ in range(blocks):
+        for c in range(ir.shape[1]):
+            np.convolve(block, ir[:, c])
+    return (time.perf_counter() - start) / blocks
+
+def allocations(reverb, blocks=100):
+    # As on the audio thread (see SaoMeoEngine.callback)
+    np.setbufsize(UFUNC_BUFSIZE)
+    block = np.full((FRAMES, reverb.channels), 0.01, dtype=np.float32)
+    for _ in range(10):
+        reverb.process(block)
+    tracemalloc.start()
+    worst = 0
+    for _ in range(blocks):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        block[:] = 0.01
+        reverb.process(block)
+        _, peak = tracemalloc.get_traced_memory()
+        worst = max(worst, peak - before)
+    tracemalloc.stop()
+    return worst
+
+def engine_tail():
+    engine = SaoMeoEngine(start_stream=False, reverb=2.0)
+    engine.update_notes([69])
+    for _ in range(40):
+        engine.callback(None, FRAMES, None, 0)
+    engine.update_notes([])
+    blocks = 0
+    tail = 0.0
+    while engine.num_voices:
+        engine.callback(None, FRAMES, None, 0)
+    while not engine.reverb.idle():
+        out, _ = engine.callback(None, FRAMES, None, 0)
+        tail = max(tail, float(np.abs(out).max())) if blocks < 10 else tail
+        blocks += 1
+    return tail, blocks * FRAMES / engine.sample_rate
+
+if __name__ == "__main__":
+    ok = True
+    period = FRAMES / SAMPLE_RATE
+    ir = synthetic_ir(1.0, SAMPLE_RATE)
+
+    for partition in PARTITIONS:
+        error = accuracy(partition, ir)
+        good = error < 1e-5
+        ok &= good
+        print(f"partition {partition:>4}: relative error vs np.convolve {error:.1e} -> {'OK' if good else 'FAIL'}")
+
+    print(f"cost per {FRAMES}-frame block (share of the {period * 1000:.1f} ms period):")
+    for seconds in LENGTHS:
+        ir = synthetic_ir(seconds, SAMPLE_RATE)
+        row = []
+        for partition in PARTITIONS:
+            cost = block_cost(ConvolutionReverb(ir, partition=partition))
+            row.append(f"B={partition:>4}: {cost * 1000:6.3f} ms ({cost / period:4.1%})")
+        naive = naive_cost(ir) if seconds <= 2.0 else None
+        direct = f"{naive * 1000:8.2f} ms" if naive is not None else "       -"
+        print(f"  IR {seconds:>3} s  " + "  ".join(row) + f"  time-domain {direct}")
+
+    # Below one (stereo, float32) block: only NumPy's per-call FFT state
+    limit = FRAMES * 2 * 4
+    worst = allocations(ConvolutionReverb(synthetic_ir(4.0, SAMPLE_RATE)))
+    good = worst < limit
+    ok &= good
+    print(f"allocations: worst per-block peak {worst} B (limit {limit} B) -> {'OK' if good else 'FAIL'}")
+
+    tail, seconds = engine_tail()
+    good = tail > 0.01 and seconds < 3.0
+    ok &= good
+    print(f"engine: tail peak {tail:.3f} after the last voice, skipped again after {seconds:.2f} s "
+          f"-> {'OK' if good else 'FAIL'}")
+
+    sys.exit(0 if ok else 1)
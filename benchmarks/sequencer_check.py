@@ -0,0 +1,77 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SaoMeoEvents import NOTE_ON, bus_key
+from SaoMeoMixer import SaoMeoMixer, song_data
+from SaoMeoSequencer import Sequencer
+
+"""
+    Sample accuracy of the in-callback sequencer.
+
+    song_data is played looped (tempo 137, two passes) at several buffer
+    sizes. For every note-on the sequencer's sample clock is logged, and
+    must equal the ideal onset round(beat * 60 * sample_rate / tempo)
+    exactly, at every buffer size. The rendered audio must also be the
+    same whatever the buffer size (audio-rate modulators, so only float
+    rounding differs).
+
+    Usage: python benchmarks/sequencer_check.py
+"""
+
+TEMPO = 137.0
+BLOCK_SIZES = (64, 333, 1024, 4096)
+
+def play(block_size, passes=2):
+    mixer = SaoMeoMixer(start_stream=False, control_period=None)
+    sequencer = Sequencer(song_data, tempo=TEMPO, loop=True)
+    mixer.sequencer = sequencer
+    sequencer.play()
+
+    onsets = []
+    apply_event = mixer._apply_event_unsafe
+
+    def logged(kind, key, value, timestamp, code=None):
+        if kind == NOTE_ON:
+            onsets.append((sequencer.position, key))
+        apply_event(kind, key, value, timestamp, code)
+
+    mixer._apply_event_unsafe = logged
+
+    total = int(round(passes * sequencer.duration() * mixer.sample_rate))
+    out = np.zeros((total, mixer.channels), dtype=np.float32)
+    pos = 0
+    while pos < total:
+        n = min(block_size, total - pos)
+        block, _ = mixer.callback(None, n, None, 0)
+        out[pos:pos + n] = block
+        pos += n
+    return sorted(onsets), out, sequencer, mixer.sample_rate
+
+if __name__ == "__main__":
+    ok = True
+    reference = None
+    for block_size in BLOCK_SIZES:
+        onsets, out, sequencer, sample_rate = play(block_size)
+        samples_per_beat = 60.0 * sample_rate / TEMPO
+        ideal = sorted(
+            (int(round((p * sequencer.length + start) * samples_per_beat)), ('seq', bus_key(bus, note)))
+            for p in range(2)
+            for start, parts in zip(sequencer.starts, sequencer.steps)
+            for bus, part in enumerate(parts)
+            for note in set(part)
+        )
+        # A note held across steps is only switched on once, hence <=
+        exact = set(onsets) <= set(ideal)
+
+        if reference is None:
+            reference = out
+        diff = float(np.max(np.abs(out - reference)))
+        good = exact and diff < 1e-4
+        ok &= good
+        print(f"block {block_size:>4}: {len(onsets)} note-ons, all on their ideal sample: {exact}, "
+              f"max diff vs block {BLOCK_SIZES[0]}: {diff:.2e} -> {'OK' if good else 'FAIL'}")
+    sys.exit(0 if ok else 1)
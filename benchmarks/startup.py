@@ -0,0 +1,96 @@
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+"""
+    Start-up time of main.py: the parallel path against the old serial one.
+
+    1. Import: seconds for a fresh interpreter to `import main` (what the
+       --process audio child pays again on spawn). cv2 and MediaPipe are
+       no longer imported at module level, so this is numpy + the engine.
+    2. Start-up: main.py --startup-check, with and without
+       --serial-startup, each run `--runs` times in a fresh process. Each
+       run prints its milestones (seconds since the top of main.py):
+           startup: audio 0.31 s, camera 0.92 s, model 1.40 s, first_sound 0.33 s, first_frame 1.48 s
+       Reported as medians; the parallel path must reach the first frame
+       no later than the serial one. Needs cv2, mediapipe, a camera and an
+       audio device; skipped (and reported so) when any is missing.
+
+    Usage: python benchmarks/startup.py [--runs 5] [--process]
+"""
+
+MILESTONES = ('audio', 'camera', 'model', 'first_sound', 'first_frame')
+
+def import_time(runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import main"], cwd=ROOT, check=True)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+def parse(output):
+    for line in output.splitlines():
+        if line.startswith("startup: "):
+            marks = {}
+            for item in line[len("startup: "):].split(", "):
+                name, seconds, _ = item.split(" ")
+                marks[name] = float(seconds)
+            return marks
+    return None
+
+def startup(flags, runs):
+    results = []
+    for _ in range(runs):
+        done = subprocess.run([sys.executable, "main.py", "--startup-check", *flags], cwd=ROOT,
+                              capture_output=True, text=True, timeout=120)
+        marks = parse(done.stdout)
+        if marks is None:
+            return None, (done.stderr.strip().splitlines() or ["no startup line"])[-1]
+        results.append(marks)
+    return {name: float(np.median([r[name] for r in results if name in r]))
+            for name in MILESTONES if any(name in r for r in results)}, None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="main.py start-up time, parallel vs. serial")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--process", action="store_true", help="audio engine in its own process")
+    options = parser.parse_args()
+    ok = True
+
+    print(f"import main: {import_time(options.runs):.2f} s (median of {options.runs})")
+
+    missing = [name for name in ("cv2", "mediapipe") if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"start-up comparison skipped: {', '.join(missing)} not installed")
+        sys.exit(0)
+
+    extra = ["--process"] if options.process else []
+    serial, error = startup(["--serial-startup", *extra], options.runs)
+    if serial is None:
+        print(f"start-up comparison skipped: main.py did not show a frame ({error})")
+        sys.exit(0)
+    parallel, error = startup(extra, options.runs)
+    if parallel is None:
+        print(f"parallel start-up failed: {error} -> FAIL")
+        sys.exit(1)
+
+    print(f"{'milestone':<12} {'serial':>8} {'parallel':>9}")
+    for name in MILESTONES:
+        if name in serial and name in parallel:
+            print(f"{name:<12} {serial[name]:>7.2f}s {parallel[name]:>8.2f}s")
+    good = parallel['first_frame'] <= serial['first_frame']
+    ok &= good
+    print(f"time to first frame {serial['first_frame']:.2f} s -> {parallel['first_frame']:.2f} s, "
+          f"time to first sound {serial['first_sound']:.2f} s -> {parallel['first_sound']:.2f} s "
+          f"-> {'OK' if good else 'FAIL'}")
+
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,88 @@
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SaoMeoEngine import SaoMeoEngine, notes
+from SaoMeoMixer import SaoMeoMixer
+
+"""
+    Stress test for the lock-free note-event ring.
+
+    A fake audio thread calls callback() at the real block rate while the
+    main thread hammers update_notes / set_melody+set_chords thousands of
+    times per second. At the end every pushed event must have been
+    consumed, none dropped, and the voice bank must hold exactly the notes
+    the control thread last asked for.
+
+    Usage: python benchmarks/stress_events.py [updates_per_second] [seconds]
+"""
+
+def audio_thread(engine, stop):
+    period = engine.frames_per_buffer / engine.sample_rate
+    next_block = time.perf_counter()
+    while not stop.is_set():
+        engine.callback(None, engine.frames_per_buffer, None, 0)
+        next_block += period
+        delay = next_block - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+def stress(engine, rate, seconds):
+    pool = [f for name, f in notes.items() if name[-1] in '345' and f > 0]
+    rng = random.Random(0)
+
+    stop = threading.Event()
+    audio = threading.Thread(target=audio_thread, args=(engine, stop), daemon=True)
+    audio.start()
+
+    updates = 0
+    worst_call = 0.0
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    next_update = start
+    while time.perf_counter() - start < seconds:
+        melody = rng.sample(pool, rng.randint(0, 3))
+        t0 = time.perf_counter()
+        if isinstance(engine, SaoMeoMixer):
+            engine.set_melody(melody[:1])
+            engine.set_chords(melody[1:])
+        else:
+            engine.update_notes(melody)
+        worst_call = max(worst_call, time.perf_counter() - t0)
+        updates += 1
+
+        next_update += interval
+        while time.perf_counter() < next_update:
+            pass
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    audio.join()
+    # One last block to drain whatever was pushed after the final callback
+    engine.callback(None, engine.frames_per_buffer, None, 0)
+
+    ring = engine.events
+    n = engine.num_voices
+    held = {engine.voice_keys[slot] for slot in range(n) if engine.voice_targets[slot]}
+    ok = ring.dropped == 0 and ring.pushed == ring.consumed and held == engine.target_notes
+
+    print(f"{type(engine).__name__}: {updates / elapsed:.0f} updates/s, {ring.pushed} events, "
+          f"{ring.dropped} dropped, {ring.pushed - ring.consumed} unconsumed, "
+          f"state {'matches' if held == engine.target_notes else 'MISMATCH'}, "
+          f"worst update call {worst_call * 1e6:.0f} us")
+    return ok
+
+if __name__ == "__main__":
+    rate = float(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+
+    ok = True
+    for cls in (SaoMeoEngine, SaoMeoMixer):
+        engine = cls(start_stream=False)
+        ok &= stress(engine, rate, seconds)
+        engine.close()
+    sys.exit(0 if ok else 1)
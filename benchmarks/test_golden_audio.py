@@ -0,0 +1,70 @@
+import json
+
+import numpy as np
+import pytest
+
+from SaoMeoMixer import SaoMeoMixer
+from golden_audio import CASES, REFERENCE, compare, render_case
+
+"""
+    pytest form of golden_audio.py: every case must match its reference
+    fingerprint in golden_audio.json, and must not depend on the block
+    size it is rendered with.
+
+    Usage: python -m pytest benchmarks
+"""
+
+BLOCK_SIZES = (64, 333, 2048)
+
+@pytest.fixture(scope='module')
+def reference():
+    with open(REFERENCE) as f:
+        return json.load(f)
+
+@pytest.fixture(scope='module')
+def renders():
+    # name -> fingerprint at the default block size, rendered once
+    cache = {}
+
+    def get(name):
+        if name not in cache:
+            cache[name] = render_case(name)[0]
+        return cache[name]
+    return get
+
+@pytest.mark.parametrize('name', sorted(CASES))
+def test_matches_reference(name, reference, renders):
+    assert name in reference['cases'], "no reference (run golden_audio.py --update)"
+    assert compare(renders(name), reference['cases'][name]) == []
+
+@pytest.mark.parametrize('block_size', BLOCK_SIZES)
+@pytest.mark.parametrize('name', sorted(CASES))
+def test_block_size_invariance(name, block_size, renders):
+    got, _ = render_case(name, block_size=block_size)
+    assert compare(got, renders(name)) == []
+
+def test_reference_sample_rate(reference):
+    engine = CASES['engine_melody'][1]()
+    try:
+        assert reference['sample_rate'] == engine.sample_rate
+    finally:
+        engine.close()
+
+@pytest.mark.parametrize('delay', (0, 1, 5))
+def test_shared_pitch_in_phase(delay):
+    # G3 on the melody bus, joined on the chords bus `delay` blocks later:
+    # the two voices start in phase, so the level does not depend on when
+    peaks = []
+    for offset in (0, delay):
+        mixer = SaoMeoMixer(start_stream=False)
+        try:
+            mixer.set_melody(['G3'])
+            for _ in range(offset):
+                mixer.callback(None, 1000, None, 0)
+            mixer.set_chords(['G3'])
+            mixer.callback(None, 1000, None, 0)
+            out = np.concatenate([mixer.callback(None, 1000, None, 0)[0].copy() for _ in range(20)])
+            peaks.append(float(np.abs(out).max()))
+        finally:
+            mixer.close()
+    assert peaks[1] == pytest.approx(peaks[0], rel=1e-3)
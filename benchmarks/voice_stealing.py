@@ -0,0 +1,91 @@
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SaoMeoEngine import SaoMeoEngine, STEAL_POLICIES, notes
+
+"""
+    Polyphony cap and voice stealing under gesture flicker.
+
+    1. Flicker: update_notes with 0-6 random notes every 40 ms (a chord
+       change per camera frame or so, each leaving a 0.2 s release tail)
+       for 5 s of 256-frame blocks, capped and uncapped. For every steal
+       policy the voice count must never exceed max_voices + steal_reserve;
+       p99 / worst block times are reported. With 'releasing' every note
+       the control thread holds must still be sounding at the end ('oldest'
+       and 'quietest' may legitimately steal held notes).
+    2. Click: one voice cap, a held note stolen by the next note-on. The
+       largest sample-to-sample step around the steal must stay close to
+       the steady-state one (a hard cut would jump by the full amplitude).
+
+    Usage: python benchmarks/voice_stealing.py [max_voices]
+"""
+
+BLOCK = 256
+
+def flicker(max_voices, policy, seconds=5.0, seed=0):
+    engine = SaoMeoEngine(start_stream=False, max_voices=max_voices, steal_policy=policy)
+    pool = sorted({note for name, note in notes.items() if name[-1] in '345'})
+    rng = random.Random(seed)
+    blocks = int(seconds * engine.sample_rate / BLOCK)
+    update_every = round(0.04 * engine.sample_rate / BLOCK)
+
+    peak = 0
+    times = []
+    for block in range(blocks):
+        if block % update_every == 0:
+            engine.update_notes(rng.sample(pool, rng.randint(0, 6)))
+        start = time.perf_counter()
+        engine.callback(None, BLOCK, None, 0)
+        times.append(time.perf_counter() - start)
+        peak = max(peak, engine.num_voices)
+
+    held = {engine.voice_keys[slot] for slot in range(engine.num_voices) if engine.voice_targets[slot]}
+    return peak, np.percentile(times, 99), max(times), engine.stolen_voices, held == engine.target_notes
+
+def click(policy):
+    engine = SaoMeoEngine(start_stream=False, max_voices=1, steal_policy=policy, control_period=None)
+    out = []
+    engine.update_notes([notes['A4']])
+    for _ in range(60):
+        out.append(engine.callback(None, BLOCK, None, 0)[0][:, 0].copy())
+    steal_at = len(out) * BLOCK
+    engine.update_notes([notes['E5']])
+    for _ in range(4):
+        out.append(engine.callback(None, BLOCK, None, 0)[0][:, 0].copy())
+    signal = np.concatenate(out)
+    steps = np.abs(np.diff(signal))
+    steady = steps[steal_at - 20 * BLOCK:steal_at - 1].max()
+    around = steps[steal_at - 1:steal_at + engine.steal_samples + 1].max()
+    return around / steady, engine.stolen_voices
+
+if __name__ == "__main__":
+    max_voices = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    deadline = BLOCK / 48000
+
+    peak, p99, worst, _, _ = flicker(None, 'releasing')
+    print(f"uncapped: peak {peak} voices, block p99 {p99 * 1000:.2f} ms ({p99 / deadline:.0%} of deadline), "
+          f"worst {worst * 1000:.2f} ms")
+
+    ok = True
+    bound = max_voices + SaoMeoEngine.steal_reserve
+    for policy in STEAL_POLICIES:
+        peak, p99, worst, stolen, held = flicker(max_voices, policy)
+        good = peak <= bound and (held or policy != 'releasing')
+        ok &= good
+        print(f"{policy:>9}: peak {peak}/{bound} voices, {stolen} stolen, block p99 {p99 * 1000:.2f} ms "
+              f"({p99 / deadline:.0%}), worst {worst * 1000:.2f} ms, held notes intact: {held} "
+              f"-> {'OK' if good else 'FAIL'}")
+
+    for policy in STEAL_POLICIES:
+        ratio, stolen = click(policy)
+        good = stolen == 1 and ratio < 2.0
+        ok &= good
+        print(f"{policy:>9} steal: largest step {ratio:.2f}x steady state -> {'OK' if good else 'FAIL'}")
+
+    sys.exit(0 if ok else 1)
@@ -1,25 +1,14 @@
-import cv2, mediapipe as mp
-import math
-from SaoMeoEngine import SaoMeoEngine
-
-notes = {
-    'Rest': 0,
-    'C2': 65.41, 'D2': 73.42, 'E2': 82.41, 'F2': 87.31, 'G2': 98.00, 'A2': 110.00, 'B2': 123.47,
-    'C2b': 61.74, 'D2b': 69.30, 'E2b': 77.78, 'F2b': 82.41, 'G2b': 92.50, 'A2b': 103.83, 'B2b': 116.54,
-    'C3': 130.81, 'D3': 146.83, 'E3': 164.81, 'F3': 174.61, 'G3': 196.00, 'A3': 220.00, 'B3': 246.94,
-    'C3b': 123.47, 'D3b': 138.59, 'E3b': 155.56, 'F3b': 164.81, 'G3b': 185.00, 'A3b': 207.65, 'B3b': 233.08,
-    'C4': 261.63, 'D4': 293.66, 'E4': 329.63, 'F4': 349.23, 'G4': 392.00, 'A4': 440.00, 'B4': 493.88,
-    'C4b': 246.94, 'D4b': 277.18, 'E4b': 311.13, 'F4b': 329.63, 'G4b': 369.99, 'A4b': 415.30, 'B4b': 466.16,
-    'C5': 523.25, 'D5': 587.33, 'E5': 659.25, 'F5': 698.46, 'G5': 783.99, 'A5': 880.00, 'B5': 987.77,
-    'C5b': 493.88, 'D5b': 554.37, 'E5b': 622.25, 'F5b': 659.25, 'G5b': 739.99, 'A5b': 830.61, 'B5b': 932.33,
-    'C6': 1046.50, 'D6': 1174.66, 'E6': 1318.51, 'F6': 1396.91, 'G6': 1567.98, 'A6': 1760.00, 'B6': 1975.53,
-    'C6b': 987.77, 'D6b': 1108.73, 'E6b': 1244.51, 'F6b': 1318.51, 'G6b': 1479.98, 'A6b': 1661.22, 'B6b': 1864.66,
-    'C7': 2093.00,
-    'C7b': 1975.53
-}
-
-# Initialize SaoMeo sound engine and define musical notes
-my_sao_meo = SaoMeoEngine()
+import time
+START = time.perf_counter()
+import argparse
+import multiprocessing
+import numpy as np
+from SaoMeoEngine import SaoMeoEngine, STEAL_POLICIES
+from SaoMeoLatency import PROFILES
+from SaoMeoPipeline import (LatestSlot, PipelineStats, CaptureThread, InferenceWorker, DisplayThrottle, StopControl,
+                            DISPLAY_MODES)
+from SaoMeoGestures import CAM_WIDTH, CAM_HEIGHT, hands_to_notes, notes_to_ids
+from SaoMeoStartup import StartupTimer, BackgroundTask
 
 def hex_to_bgr(hex_color):
     hex_color = hex_color.lstrip('#')
@@ -28,116 +17,303 @@ def hex_to_bgr(hex_color):
     b = int(hex_color[4:6], 16)
     return (b, g, r)
 
-mp_hands = mp.solutions.hands
-mp_hands_drawing = mp.solutions.drawing_utils
-hands = mp_hands.Hands(static_image_mode = False,
-                       max_num_hands = 2,
-                       min_detection_confidence = 0.8,
-                       min_tracking_confidence = 0.7)
+# cv2 and MediaPipe are most of the start-up time: imported by load_cv2() /
+# load_mediapipe() on the start-up threads (see start_parallel), not here
+cv2 = None
+mp_hands = None
+mp_hands_drawing = None
 
-def get_distance(lm1, lm2):
-    point1 = (int(lm1.x * w), int(lm1.y * h))
-    point2 = (int(lm2.x * w), int(lm2.y * h))
-    return math.hypot(point1[0] - point2[0], point1[1] - point2[1])
+def load_cv2():
+    global cv2
+    import cv2
 
-if __name__ == "__main__":
+def load_mediapipe():
+    global mp_hands, mp_hands_drawing
+    import mediapipe as mp
+    mp_hands = mp.solutions.hands
+    mp_hands_drawing = mp.solutions.drawing_utils
+
+def make_hands():
+    if mp_hands is None:
+        load_mediapipe()
+    return mp_hands.Hands(static_image_mode = False,
+                          max_num_hands = 2,
+                          min_detection_confidence = 0.8,
+                          min_tracking_confidence = 0.7)
+
+def collect_hands(results):
+    current_hands = {}
+    if results.multi_hand_landmarks:
+        for hand_landmarks, handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
+            label = handedness.classification[0].label
+            current_hands[label] = hand_landmarks
+    return current_hands
+
+def process_frame(img):
+    # Landmarks -> notes -> engine. Runs on the inference worker with --pipeline.
+    h, w, c = img.shape
+    imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    results = hands.process(imgRGB)
+
+    current_hands = collect_hands(results)
+    current_notes = hands_to_notes(current_hands, w, h)
+
+    my_sao_meo.update_notes(notes_to_ids(current_notes))
+    if recorder is not None:
+        recorder.add(current_hands, w, h, current_notes=current_notes)
+    return current_hands, current_notes
+
+def draw_frame(img, current_hands, current_notes):
+    for hand_landmarks in current_hands.values():
+        mp_hands_drawing.draw_landmarks(img, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+    if "Right" in current_hands:
+        cv2.putText(img, f"current notes: {current_notes}", (100, 100),
+        cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 0), 2, cv2.LINE_AA)
+
+def draw_stats(img, stats, stolen_voices):
+    # Callback load / xrun overlay (main.py --stats)
+    s = stats.snapshot()
+    lines = [
+        f"audio load: mean {s['load_mean']:.0%}  p99 {s['load_p99']:.0%}  max {s['load_max']:.0%}  "
+        f"stolen voices: {stolen_voices}",
+        f"xruns: {s['xruns']}  deadline misses: {s['deadline_misses']}  buffer: {s['buffer_ms']:.1f} ms",
+        "stage ms: " + "  ".join(f"{name} {v['mean']:.2f}" for name, v in s['stages_ms'].items()),
+    ]
+    for i, line in enumerate(lines):
+        cv2.putText(img, line, (20, img.shape[0] - 90 + 30 * i),
+        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2, cv2.LINE_AA)
+
+def draw_process_stats(img, status):
+    # Telemetry from the audio process (main.py --process --stats)
+    line = (f"audio process load: mean {status['load_mean']:.0%}  max {status['load_max']:.0%}  "
+            f"xruns: {status['xruns']}  voices: {status['active_voices']}  stolen: {status['stolen_voices']}  "
+            f"buffer: {status['buffer_ms']:.1f} ms")
+    cv2.putText(img, line, (20, img.shape[0] - 30),
+    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2, cv2.LINE_AA)
+
+def draw_pipeline_stats(img, pipeline_stats):
+    # Per-stage FPS / latency (main.py --stats), serial or --pipeline
+    for i, line in enumerate(pipeline_stats.lines()):
+        cv2.putText(img, line, (20, 150 + 30 * i),
+        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2, cv2.LINE_AA)
+
+def open_audio(args, timer):
+    stream_kwargs = dict(latency=args.latency, sample_rate=args.sample_rate, frames_per_buffer=args.buffer,
+                         max_voices=args.max_voices or None, steal_policy=args.steal, reverb=args.reverb or None)
+    if args.process:
+        from SaoMeoProcess import EngineProcess
+        # Returns once the child's stream is running
+        engine = EngineProcess(SaoMeoEngine, record=args.record_audio, **stream_kwargs)
+        timer.mark('first_sound')
+        return engine
+    engine = SaoMeoEngine(start_stream=False, **stream_kwargs)
+    callback = engine.callback
+
+    def first_sound(in_data, frame_count, time_info, status):
+        timer.mark('first_sound')
+        return callback(in_data, frame_count, time_info, status)
+
+    engine.open_stream(first_sound)
+    return engine
+
+def open_camera():
+    load_cv2()
     cap = cv2.VideoCapture(0)
-    CAM_WIDTH = 1280
-    CAM_HEIGHT = 720
-    thumb_threshold = (1 / 10) * CAM_WIDTH
-    general_threshold = (1 / 5) * CAM_WIDTH
     cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAM_WIDTH)
     cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAM_HEIGHT)
-    print("Opening camera... Press 'q' to exit.")
-
-    while True:
-        success, img = cap.read()
-        if not success:
-            print("Failed to read from camera")
-            break
-        img = cv2.flip(img, 1)
-        imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        results = hands.process(imgRGB)
-
-        h, w, c = img.shape
-
-        current_notes = []
-        current_hands = {}
-
-        if results.multi_hand_landmarks:
-            for hand_landmarks, handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
-                label = handedness.classification[0].label
-                current_hands[label] = hand_landmarks
-                mp_hands_drawing.draw_landmarks(img, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-
-        increasing_half_octave = False
-        flat_sound = False
-        increased_octave = 0
-
-        if "Left" in current_hands:
-            hand_landmarks = current_hands["Left"]
-
-            lm_ring_finger_mcp = hand_landmarks.landmark[13]
-            lm_thumb = hand_landmarks.landmark[4]
-            lm_wrist = hand_landmarks.landmark[0]
-
-            if get_distance(lm_ring_finger_mcp, lm_thumb) > thumb_threshold:
-                flat_sound = True
-            
-            finger_tips_ids = [8, 12, 16, 20]
-
-            for tip_id in finger_tips_ids:
-                lm = hand_landmarks.landmark[tip_id]
-                if get_distance(lm, lm_wrist) > general_threshold:
-                    increased_octave += 1
-            
-        if "Right" in current_hands:
-            hand_landmarks = current_hands["Right"]
-
-            lm_ring_finger_mcp = hand_landmarks.landmark[13]
-            lm_thumb = hand_landmarks.landmark[4]
-            lm_wrist = hand_landmarks.landmark[0]
-
-            if get_distance(lm_ring_finger_mcp, lm_thumb) > thumb_threshold:
-                increasing_half_octave = True
-
-            finger_tips_ids = [8, 12, 16, 20]
-            cnt = 0
-
-            for tip_id in finger_tips_ids:
-                lm = hand_landmarks.landmark[tip_id]
-                if get_distance(lm, lm_wrist) > general_threshold:
-                    cnt += 1
-            
-            note = ""
-            offset = 0
-
-            if cnt == 1:
-                note = "C" if not increasing_half_octave else "G"
-            elif cnt == 2:
-                note = "D" if not increasing_half_octave else "A"
-            elif cnt == 3:
-                note = "E" if not increasing_half_octave else "B"
-            elif cnt == 4:
-                if increasing_half_octave: offset = 1
-                note = "F" if not increasing_half_octave else "C"
-
-            # print(increased_octave)
-
-            if cnt: note += str(2 + offset + increased_octave) + ("b" if flat_sound else "")
-
-            current_notes.append(note)
-
-            cv2.putText(img, f"current notes: {current_notes}", (100, 100),
-            cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 0), 2, cv2.LINE_AA)
-
-        freq_list = [notes[note] for note in current_notes if note in notes]
-        my_sao_meo.update_notes(freq_list)
-
-        cv2.imshow("Play Sao Meo with hands", img)
-        if (cv2.waitKey(1) & 0xFF) == ord('q'):
-            break
-    
+    # The first read waits for the driver to start streaming
+    cap.read()
+    return cap
+
+def load_model(args):
+    if args.infer_scale != 1.0 or args.roi:
+        load_cv2()
+        from SaoMeoHands import HandTracker
+        model = HandTracker(make_hands, scale=args.infer_scale, roi=args.roi, roi_margin=args.roi_margin)
+        model.warm_up(CAM_HEIGHT, CAM_WIDTH)
+    else:
+        model = make_hands()
+        model.process(np.zeros((CAM_HEIGHT, CAM_WIDTH, 3), dtype=np.uint8))
+    return model
+
+def start_parallel(args, timer):
+    # Audio, camera and hand model at once; their waits are mostly in C
+    # code that releases the GIL
+    audio = BackgroundTask('audio', lambda: open_audio(args, timer), timer)
+    camera = BackgroundTask('camera', open_camera, timer)
+    model = BackgroundTask('model', lambda: load_model(args), timer)
+    return audio.result(), model.result(), camera.result()
+
+def start_serial(args, timer):
+    # The old order, one after the other (--serial-startup)
+    load_cv2()
+    load_mediapipe()
+    engine = open_audio(args, timer)
+    timer.mark('audio')
+    model = load_model(args)
+    timer.mark('model')
+    cap = open_camera()
+    timer.mark('camera')
+    return engine, model, cap
+
+def show_frame(img, current_hands, current_notes):
+    draw_frame(img, current_hands, current_notes)
+    if stats is not None:
+        draw_stats(img, stats, my_sao_meo.stolen_voices)
+    elif args.process and args.stats:
+        draw_process_stats(img, my_sao_meo.poll())
+    if args.stats:
+        draw_pipeline_stats(img, pipeline_stats)
+
+    cv2.imshow("Play Sao Meo with hands", img)
+    return (cv2.waitKey(1) & 0xFF) == ord('q')
+
+def present(img, current_hands, current_notes):
+    # Display path, after update_notes has run for this frame: drawing and
+    # imshow only for the frames the --display mode lets through
+    quit_requested = control.requested
+    if display.due():
+        start = time.perf_counter()
+        quit_requested |= show_frame(img, current_hands, current_notes)
+        pipeline_stats.record('display', time.perf_counter() - start)
+    if 'first_frame' not in timer.marks:
+        # Headless: the first processed frame
+        timer.mark('first_frame')
+        print(timer.summary())
+        quit_requested |= args.startup_check
+    return quit_requested
+
+if __name__ == "__main__":
+    # Needed for the --process child in the PyInstaller build (main.spec)
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="Play Sao Meo with hands")
+    parser.add_argument("--stats", action="store_true", help="show audio callback load / xrun overlay")
+    parser.add_argument("--process", action="store_true", help="run the audio engine in its own process")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="capture / hand inference / display on separate threads, newest frame only")
+    parser.add_argument("--infer-scale", type=float, default=1.0,
+                        help="run hand inference on a frame downscaled by this factor (e.g. 0.5)")
+    parser.add_argument("--roi", action="store_true",
+                        help="crop hand inference to the previous hand boxes, full frame only when tracking is lost")
+    parser.add_argument("--roi-margin", type=float, default=0.3,
+                        help="ROI growth on each side, as a fraction of the hand box size")
+    parser.add_argument("--record", metavar="PATH",
+                        help="save per-frame hand landmarks and notes (.npz) for SaoMeoLandmarks.py replay")
+    parser.add_argument("--latency", choices=sorted(PROFILES), default="adaptive",
+                        help="audio buffer profile; 'adaptive' starts at 128 frames and grows on overruns")
+    parser.add_argument("--sample-rate", type=int, help="override the profile's sample rate")
+    parser.add_argument("--max-voices", type=int, default=16,
+                        help="polyphony cap; further note-ons steal a voice (0 = unlimited)")
+    parser.add_argument("--steal", choices=STEAL_POLICIES, default="releasing",
+                        help="which voice a note-on steals once --max-voices are sounding")
+    parser.add_argument("--buffer", type=int, metavar="FRAMES", help="override the profile's (starting) buffer size")
+    parser.add_argument("--record-audio", metavar="PATH",
+                        help="record the audio output (.wav, or raw float32 for long sessions) and its note events")
+    parser.add_argument("--reverb", type=float, default=0.0, metavar="SECONDS",
+                        help="convolution reverb with a synthetic impulse response this long (0 = off)")
+    parser.add_argument("--serial-startup", action="store_true",
+                        help="open audio, hand model and camera one after the other (the old start-up path)")
+    parser.add_argument("--startup-check", action="store_true",
+                        help="exit after the first frame, printing the start-up times")
+    parser.add_argument("--display", choices=DISPLAY_MODES, default="full",
+                        help="show every frame, at most --display-fps frames per second, or no window at all "
+                             "(stop with 'q' + Enter or Ctrl+C)")
+    parser.add_argument("--display-fps", type=float, default=15.0, help="frame rate of --display throttled")
+    args = parser.parse_args()
+
+    # Created here, not at import: with --process the audio child re-imports
+    # this module and must not open a second stream or load the hand model
+    if args.display == 'headless':
+        print("Opening camera... Type 'q' + Enter (or 's' for stats) to exit.")
+    else:
+        print("Opening camera... Press 'q' to exit.")
+    timer = StartupTimer(START)
+    start = start_serial if args.serial_startup else start_parallel
+    my_sao_meo, hands, cap = start(args, timer)
+    stats = None
+    if not args.process:
+        stats = my_sao_meo.enable_stats() if args.stats else None
+        if args.record_audio:
+            my_sao_meo.start_recording(args.record_audio)
+
+    if args.record:
+        from SaoMeoLandmarks import LandmarkRecorder
+        recorder = LandmarkRecorder()
+    else:
+        recorder = None
+
+    pipeline_stats = PipelineStats()
+    display = DisplayThrottle(args.display, args.display_fps)
+    control = StopControl(stdin=args.display == 'headless',
+                          commands={'s': lambda: print(pipeline_stats.summary())})
+    loop_start = time.perf_counter()
+
+    if args.pipeline:
+        frames = LatestSlot()
+        processed = LatestSlot()
+        pipeline_stats.slots = [frames, processed]
+        capture = CaptureThread(cap, frames, pipeline_stats, transform=lambda img: cv2.flip(img, 1))
+        inference = InferenceWorker(frames, processed, process_frame, pipeline_stats)
+        capture.start()
+        inference.start()
+
+        while not control.requested:
+            # Throttled: sleep to the next display slot, then take the newest frame
+            display.wait(control.stop)
+            item = processed.get(timeout=0.5)
+            if item is None:
+                if processed.closed:
+                    print("Failed to read from camera")
+                    break
+                continue
+            img, (current_hands, current_notes), _ = item
+            if present(img, current_hands, current_notes):
+                break
+
+        capture.stop()
+        inference.stop()
+        capture.join()
+        inference.join()
+    else:
+        while True:
+            start = time.perf_counter()
+            success, img = cap.read()
+            captured = time.perf_counter()
+            if not success:
+                print("Failed to read from camera")
+                break
+            img = cv2.flip(img, 1)
+            flipped = time.perf_counter()
+            pipeline_stats.record('capture', flipped - start)
+
+            current_hands, current_notes = process_frame(img)
+            done = time.perf_counter()
+            pipeline_stats.record('inference', done - flipped)
+            pipeline_stats.record('latency', done - captured)
+
+            if present(img, current_hands, current_notes):
+                break
+
+    elapsed = time.perf_counter() - loop_start
+    print(f"display {args.display}: inference loop {pipeline_stats.stages['inference'].count / elapsed:.1f} fps, "
+          f"{display.shown} frames shown, {display.skipped} skipped")
+    if stats is not None:
+        print(stats.summary())
+    if args.stats:
+        print(pipeline_stats.summary())
+    if recorder is not None:
+        recorder.save(args.record)
+        print(f"Saved {recorder.frames} frames of landmarks to {args.record}")
+    if args.record_audio:
+        if args.process:
+            dropped = my_sao_meo.poll()['recorder_dropped']
+        else:
+            dropped = my_sao_meo.stop_recording()['dropped_blocks']
+        print(f"Saved audio to {args.record_audio} ({dropped} blocks dropped)")
     my_sao_meo.close()
+    hands.close()
     cap.release()
-    cv2.destroyAllWindows()
\ No newline at end of file
+    if display.shown:
+        # Only if a window was ever opened: opencv-python-headless (and
+        # --display headless there) has no GUI backend to call
+        cv2.destroyAllWindows()
\ No newline at end of file